@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark the comment creation path before and after structured logging.
+
+"previous" replays the old flow: print() of the whole comment dict and of
+collection sizes in create_comment and DataManager.save_comment, plus the
+comments.json re-read that only fed the "saved successfully" print.
+The other rows call the real create_comment endpoint with debug logging
+off, sampled at 1% (the default) and fully on. All output goes to a pipe
+drained by another thread, unbuffered as with PYTHONUNBUFFERED=1 in a
+container. Files are reset before every batch so each mode sees the
+same store; figures are the median call of the best batch.
+
+Usage: python benchmarks/bench_comment_logging.py [--comments 300] [--creates 200]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def pipe_stream():
+    """A text stream into a pipe whose reader just drains it, like a container log collector"""
+    read_fd, write_fd = os.pipe()
+    
+    def drain():
+        while os.read(read_fd, 1 << 16):
+            pass
+    
+    threading.Thread(target=drain, daemon=True).start()
+    return io.TextIOWrapper(open(write_fd, 'wb', buffering=0), write_through=True, line_buffering=True)
+
+def previous_save_comment(data_manager, comment_data):
+    """DataManager.save_comment as it was, prints included"""
+    print(f"save_comment called with: {comment_data}")
+    comments = data_manager.load_comments()
+    print(f"Loaded {len(comments)} existing comments")
+    comment_id = comment_data.get('id')
+    comment_found = False
+    if comment_id:
+        for i, comment in enumerate(comments):
+            if comment.get('id') == comment_id:
+                comments[i] = comment_data
+                comment_found = True
+                print(f"Updated existing comment at index {i}")
+                break
+    if not comment_found:
+        comments.append(comment_data)
+        print(f"Added new comment. Total comments now: {len(comments)}")
+    data_manager._save_comments(comments)
+    print(f"Saved {len(comments)} comments to file")
+
+async def previous_create_comment(main, post_id, comment):
+    """The create_comment endpoint as it was (no parent_id, so no reply handling)"""
+    data_manager = main.data_manager
+    print(f"Creating comment for post: {post_id}")
+    print(f"Comment data: {comment.model_dump()}")
+    posts = data_manager.load_posts()
+    assert any(post.get("id") == post_id for post in posts)
+    comment.id = str(uuid.uuid4())
+    comment.post_id = post_id
+    comment.created_at = datetime.now()
+    comment_dict = comment.model_dump()
+    comment_dict.update({"id": comment.id, "post_id": comment.post_id, "created_at": comment.created_at,
+                         "replies_count": 0, "reactions_count": 0, "user_reacted": False})
+    print(f"Saving comment: {comment_dict}")
+    previous_save_comment(data_manager, comment_dict)
+    all_comments = data_manager.load_comments()
+    saved_comment = next((c for c in all_comments if c.get("id") == comment.id), None)
+    print(f"Comment saved successfully: {saved_comment is not None}")
+    posts = data_manager.load_posts()
+    post = next((p for p in posts if p.get("id") == post_id), None)
+    post["comments_count"] = (post.get("comments_count") or 0) + 1
+    data_manager.save_post(post)
+    return comment
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--comments", type=int, default=300, help="comments already in the store")
+    parser.add_argument("--creates", type=int, default=200, help="comments created per batch")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    # main.py's DataManager uses relative paths, so import it inside a scratch directory
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    stream = pipe_stream()
+    sys.stdout = sys.stderr = stream
+    import main as api
+    from data.structured_logging import configure_logging
+    
+    post_id = api.data_manager.load_posts()[0]["id"]
+    text = "Some days are harder than others, and that's okay. " * 10
+    api.data_manager._save_comments([
+        {"id": str(uuid.uuid4()), "post_id": post_id, "user_id": f"user-{i}", "content": text,
+         "parent_id": None, "created_at": datetime.now(), "replies_count": 0, "reactions_count": 0,
+         "user_reacted": False}
+        for i in range(args.comments)
+    ])
+    snapshot = os.path.join(workdir, "snapshot")
+    shutil.copytree("database", snapshot)
+    
+    modes = [
+        ("previous (print)", None, lambda comment: previous_create_comment(api, post_id, comment)),
+        ("debug off", {"level": "INFO", "levels": {"api": "INFO", "data": "INFO"}},
+         lambda comment: api.create_comment(post_id, comment)),
+        ("debug 1% sampled", {"level": "INFO", "levels": {"api": "DEBUG", "data": "DEBUG"}, "debug_sample_rate": 0.01},
+         lambda comment: api.create_comment(post_id, comment)),
+        ("debug 100%", {"level": "INFO", "levels": {"api": "DEBUG", "data": "DEBUG"}},
+         lambda comment: api.create_comment(post_id, comment)),
+    ]
+    
+    loop = asyncio.new_event_loop()
+    best = {name: float("inf") for name, _, _ in modes}
+    for _ in range(args.repeat):
+        for name, logging_config, create in modes:
+            if logging_config:
+                configure_logging(stream=stream, **logging_config)
+            shutil.rmtree("database")
+            shutil.copytree(snapshot, "database")
+            timings = []
+            for _ in range(args.creates):
+                comment = api.Comment(post_id=post_id, user_id="bench", content=text)
+                start = time.perf_counter()
+                loop.run_until_complete(create(comment))
+                timings.append(time.perf_counter() - start)
+            best[name] = min(best[name], statistics.median(timings) * 1e3)
+    
+    # The same pieces in isolation: end to end, JSON storage dominates and
+    # is noisy, so also time just what changed
+    comment_dict = api.data_manager.load_comments()[-1]
+    statements = {}
+    
+    def old_prints():
+        print(f"Creating comment for post: {post_id}")
+        print(f"Comment data: {comment_dict}")
+        print(f"Saving comment: {comment_dict}")
+        print(f"save_comment called with: {comment_dict}")
+        print(f"Loaded {len(comment_dict)} existing comments")
+        print(f"Added new comment. Total comments now: {len(comment_dict)}")
+        print(f"Saved {len(comment_dict)} comments to file")
+        print(f"Comment saved successfully: {True}")
+    
+    api_logger, storage_logger = api.logger, logging.getLogger("data.data_manager")
+    
+    def new_logging():
+        storage_logger.debug("Saved comment", extra={'comment_id': comment_dict['id'], 'updated': False,
+                                                     'total_comments': args.comments})
+        api_logger.debug("Comment created", extra={'post_id': post_id, 'comment_id': comment_dict['id'],
+                                                   'is_reply': False})
+    
+    def time_us(fn, count=2000):
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        return (time.perf_counter() - start) / count * 1e6
+    
+    statements["previous (print)"] = time_us(old_prints)
+    for name, logging_config, _ in modes[1:]:
+        configure_logging(stream=stream, **logging_config)
+        time.sleep(0.5)  # let the writer thread drain the previous mode's records
+        statements[name] = time_us(new_logging)
+    reload_us = time_us(api.data_manager.load_comments, count=50)
+    
+    sys.stdout = sys.__stdout__
+    print(f"create_comment with {args.comments}-{args.comments + args.creates} comments stored, "
+          f"median of the best of {args.repeat} batches of {args.creates}")
+    print(f"{'mode':<18} {'ms/comment':>11} {'vs previous':>12} {'logging us':>11}")
+    for name, _, _ in modes:
+        print(f"{name:<18} {best[name]:>11.2f} {best[name] / best['previous (print)'] - 1:>+11.0%} "
+              f"{statements[name]:>11.1f}")
+    print(f"re-reading comments.json to verify the save (removed): {reload_us / 1e3:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare the completion_dates list with the CompletionBitmap format.
+
+Builds synthetic histories (daily, 70% of days, sparse weekly) and reports
+the serialized size in streak.json and the time of the streak queries:
+is a day completed, longest run, and completions in a 30-day range. The
+list timings include the parse and sort every read used to do.
+
+Usage: python benchmarks/bench_completion_bitmap.py [--years 5] [--queries 2000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.completion_bitmap import CompletionBitmap
+
+def histories(years: int):
+    rng = random.Random(42)
+    start = date.today() - timedelta(days=365 * years)
+    days = [start + timedelta(days=i) for i in range(365 * years)]
+    return {
+        'daily': days,
+        '70% of days': [d for d in days if rng.random() < 0.7],
+        'weekly': days[::7],
+    }
+
+def list_queries(dates_json, probes):
+    dates = sorted(date.fromisoformat(d) for d in dates_json)
+    day_set = set(dates)
+    hits = sum(1 for d in probes if d in day_set)
+    longest = run = 0
+    for i, d in enumerate(dates):
+        run = run + 1 if i and (d - dates[i - 1]).days == 1 else 1
+        longest = max(longest, run)
+    in_range = sum(1 for d in dates if probes[0] <= d <= probes[0] + timedelta(days=29))
+    return hits, longest, in_range
+
+def bitmap_queries(bitmap_json, probes):
+    bitmap = CompletionBitmap.from_json(bitmap_json)
+    hits = sum(1 for d in probes if d in bitmap)
+    return hits, bitmap.longest_run(), bitmap.count_in_range(probes[0], probes[0] + timedelta(days=29))
+
+def per_read_us(query, stored, probe_sets):
+    start = time.perf_counter()
+    for probes in probe_sets:
+        query(stored, probes)
+    return (time.perf_counter() - start) / len(probe_sets) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    
+    rng = random.Random(7)
+    print(f"{'history':<12} {'days':>6} {'list bytes':>11} {'bitmap bytes':>13} {'ratio':>6} "
+          f"{'list us/read':>13} {'bitmap us/read':>15}")
+    for name, days in histories(args.years).items():
+        as_list = [d.isoformat() for d in days]
+        as_bitmap = CompletionBitmap.from_dates(days).to_json()
+        assert list_queries(as_list, days[:5]) == bitmap_queries(as_bitmap, days[:5])
+        
+        list_bytes = len(json.dumps({'completion_dates': as_list}))
+        bitmap_bytes = len(json.dumps({'completion_bitmap': as_bitmap}))
+        
+        # Each read: 5 membership probes, longest run and a 30-day count
+        probe_sets = [[days[0] + timedelta(days=rng.randrange(365 * args.years)) for _ in range(5)]
+                      for _ in range(args.queries)]
+        list_us = per_read_us(list_queries, as_list, probe_sets)
+        bitmap_us = per_read_us(bitmap_queries, as_bitmap, probe_sets)
+        
+        print(f"{name:<12} {len(days):>6} {list_bytes:>11} {bitmap_bytes:>13} "
+              f"{list_bytes / bitmap_bytes:>5.0f}x {list_us:>13.1f} {bitmap_us:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark rewrite latency with and without request hedging.
+
+Runs CompassionateRewriter.rewrite_compassionate against a local stub that
+injects a slow tail (a small fraction of calls take much longer), and
+reports p50/p99 latency for both modes.
+
+Usage: python benchmarks/bench_hedging.py [--requests 400]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from llm_stub import StubGroqClient
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def run(enable_hedging: bool, requests: int, concurrency: int, warmup: int) -> dict:
+    rewriter = CompassionateRewriter(enable_hedging=enable_hedging)
+    rewriter.client = StubGroqClient(latency_seconds=0.02, slow_probability=0.03,
+                                     slow_latency_seconds=0.4, seed=42)
+    # Keep the breaker and rewrite reuse out of the way; we only measure hedging here
+    rewriter.circuit_breaker.slow_call_seconds = 60
+    rewriter.similarity_index = None
+    
+    def one(_):
+        start = time.perf_counter()
+        rewriter.rewrite_compassionate("I feel so lazy and useless today")
+        return time.perf_counter() - start
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up so the hedger has a steady-state p95 before we measure
+        list(pool.map(one, range(warmup)))
+        calls_before = rewriter.client.calls
+        latencies = list(pool.map(one, range(requests)))
+    
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'upstream_calls': rewriter.client.calls - calls_before,
+        'hedging': rewriter.hedger.get_stats() if rewriter.hedger else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+    logging.getLogger("data.compassionate_rewriter").setLevel(logging.ERROR)
+    
+    baseline = run(False, args.requests, args.concurrency, args.warmup)
+    hedged = run(True, args.requests, args.concurrency, args.warmup)
+    
+    print(f"{'mode':<10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'upstream calls':>16}")
+    for name, result in (("baseline", baseline), ("hedged", hedged)):
+        print(f"{name:<10} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f} {result['upstream_calls']:>16}")
+    print(f"Hedging stats: {hedged['hedging']}")
+    print(f"p99 improvement: {baseline['p99_ms'] / hedged['p99_ms']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark the negative-word lexicon: compile time and match throughput.
+
+Compares the compiled lexicon automaton against the original approach of
+one regex search per word.
+
+Usage: python benchmarks/bench_lexicon.py [--texts 20000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.lexicon import Lexicon
+
+SAMPLE_TEXTS = [
+    "Went for a short walk after lunch and drank plenty of water today.",
+    "I keep hating myself for skipping the gym, I feel lazy and useless.",
+    "Yikes, that was a rough morning but the afternoon turned out fine.",
+    "My failures keep ruining my plans and I messed up my sleep schedule again.",
+    "Trying a new recipe tonight with lots of vegetables and some rice.",
+]
+
+def per_word_scan(words, text):
+    """The original detection: one regex search per lexicon word"""
+    text_lower = text.lower()
+    return [w for w in words if re.search(r'\b' + re.escape(w) + r'\b', text_lower)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=20000)
+    args = parser.parse_args()
+    
+    rng = random.Random(3)
+    texts = [rng.choice(SAMPLE_TEXTS) for _ in range(args.texts)]
+    total_mb = sum(len(t) for t in texts) / 1e6
+    
+    start = time.perf_counter()
+    for _ in range(20):
+        re.purge()
+        lexicon = Lexicon.load()
+    compile_ms = (time.perf_counter() - start) / 20 * 1000
+    print(f"Lexicon: {len(lexicon.terms)} terms, {len(lexicon.surface_forms)} surface forms, "
+          f"compiled in {compile_ms:.2f} ms")
+    
+    start = time.perf_counter()
+    for text in texts:
+        lexicon.score(text)
+    automaton_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for text in texts:
+        per_word_scan(lexicon.surface_forms, text)
+    per_word_s = time.perf_counter() - start
+    
+    print(f"{'matcher':<12} {'texts/s':>10} {'MB/s':>8}")
+    print(f"{'automaton':<12} {len(texts) / automaton_s:>10.0f} {total_mb / automaton_s:>8.2f}")
+    print(f"{'per-word':<12} {len(texts) / per_word_s:>10.0f} {total_mb / per_word_s:>8.2f}")
+    print(f"Speedup: {per_word_s / automaton_s:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the rate limiter with many distinct keys.
+
+Sends one request each for N distinct keys (default 1M), then measures
+memory held by the limiter, check throughput, and how much is reclaimed
+once the keys go idle. Compares the sliding-window counter with the
+previous timestamp-list limiter, which never forgets a key.
+
+Usage: python benchmarks/bench_rate_limiter.py [--keys 1000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.rate_limiter import RateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class PreviousRateLimiter:
+    """The original limiter: a list of timestamps per user, rebuilt on every check"""
+    def __init__(self, clock, max_requests=10, window_seconds=60):
+        self.clock = clock
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.requests = {}
+    
+    def is_allowed(self, user_id):
+        now = self.clock()
+        if user_id in self.requests:
+            self.requests[user_id] = [t for t in self.requests[user_id] if now - t < self.window_seconds]
+        else:
+            self.requests[user_id] = []
+        if len(self.requests[user_id]) >= self.max_requests:
+            return False
+        self.requests[user_id].append(now)
+        return True
+
+def run(name, make_limiter, keys, evict):
+    # Throughput, without tracemalloc slowing it down
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    start = time.perf_counter()
+    for key in keys:
+        limiter.is_allowed(key)
+    keys_per_second = len(keys) / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for _ in range(100000):
+        limiter.is_allowed("hot-user")
+    hot_us = (time.perf_counter() - start) / 100000 * 1e6
+    
+    # Two windows later every one-off key is idle
+    clock.now += 2 * 60 + 1
+    start = time.perf_counter()
+    evict(limiter)
+    evict_ms = (time.perf_counter() - start) * 1e3
+    del limiter
+    
+    # Memory held for the keys, and after they went idle
+    gc.collect()
+    tracemalloc.start()
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for key in keys:
+        limiter.is_allowed(key)
+    held = tracemalloc.get_traced_memory()[0]
+    clock.now += 2 * 60 + 1
+    evict(limiter)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    print(f"{name:<16} {keys_per_second / 1e6:>8.2f} {hot_us:>8.2f} {held / len(keys):>7.0f} "
+          f"{held / 2**20:>8.0f} {after / 2**20:>13.1f} {evict_ms:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keys", type=int, default=1000000)
+    args = parser.parse_args()
+    
+    keys = [f"user-{i}" for i in range(args.keys)]
+    print(f"{args.keys} distinct keys (key strings themselves not counted)")
+    print(f"{'limiter':<16} {'Mkeys/s':>8} {'hot us':>8} {'B/key':>7} {'held MB':>8} "
+          f"{'MB after idle':>13} {'evict ms':>9}")
+    
+    run("previous", PreviousRateLimiter, keys, lambda limiter: None)
+    run("sliding window", lambda clock: RateLimiter(clock=clock), keys, lambda limiter: limiter.evict_idle())
+
+if __name__ == "__main__":
+    main()
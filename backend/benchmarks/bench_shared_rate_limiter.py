@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-check cost of the cross-process rate limiter.
+
+Times SharedRateLimiter.check for one hot key and for many distinct keys
+in a single process, then with several processes hammering the same file
+at once (the multi-worker case), next to the in-process RateLimiter.
+
+Usage: python benchmarks/bench_shared_rate_limiter.py [--checks 200000] [--processes 4]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.rate_limiter import RateLimiter, SharedRateLimiter
+
+LIMIT = 10 ** 9  # never block, so every check does the full read-modify-write
+
+def time_checks(limiter, keys):
+    start = time.perf_counter()
+    for key in keys:
+        limiter.check(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+def worker(path, keys, start, results):
+    limiter = SharedRateLimiter(path, max_requests=LIMIT)
+    start.wait()
+    results.put(time_checks(limiter, keys))
+    limiter.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    
+    hot = ["hot-user"] * args.checks
+    distinct = [f"user-{i}" for i in range(args.checks)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits")
+        shared = SharedRateLimiter(path, max_requests=LIMIT)
+        local = RateLimiter(max_requests=LIMIT)
+        print(f"{'case':<36} {'us/check':>9}")
+        print(f"{'in-process, hot key':<36} {time_checks(local, hot):>9.2f}")
+        print(f"{'shared, hot key':<36} {time_checks(shared, hot):>9.2f}")
+        print(f"{'shared, distinct keys':<36} {time_checks(shared, distinct):>9.2f}")
+        shared.close()
+        
+        context = multiprocessing.get_context("spawn")
+        start, results = context.Event(), context.Queue()
+        per_process = [distinct[i::args.processes] for i in range(args.processes)]
+        workers = [context.Process(target=worker, args=(path, keys, start, results)) for keys in per_process]
+        for process in workers:
+            process.start()
+        time.sleep(1)  # let every process open the file before the clock starts
+        began = time.perf_counter()
+        start.set()
+        latencies = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - began
+        for process in workers:
+            process.join()
+        
+        label = f"shared, {args.processes} processes contending"
+        print(f"{label:<36} {sum(latencies) / len(latencies):>9.2f}"
+              f"   ({args.checks / elapsed / 1e3:.0f}k checks/s in total)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark streak updates for users with long daily histories.
+
+Compares StreakManager.update_streak_for_completion with the previous
+implementation (full sort plus list-membership walk on every update).
+Storage is an in-memory dict so only the streak computation is measured.
+
+Usage: python benchmarks/bench_streak.py [--years 5] [--updates 200]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.streak_manager import StreakManager
+
+class InMemoryDataManager:
+    def __init__(self, streak_data):
+        self.streak_data = streak_data
+    
+    def load_streak(self, user_id):
+        return self.streak_data
+    
+    def save_streak(self, user_id, streak_data):
+        self.streak_data = streak_data
+
+def previous_update(streak_data, completion_date):
+    """The original update: list membership, full sort and O(n^2) backwards walk"""
+    completion_date_str = completion_date.isoformat()
+    if completion_date_str in streak_data.get('completion_dates', []):
+        return streak_data
+    completion_dates = streak_data.get('completion_dates', [])
+    completion_dates.append(completion_date_str)
+    completion_dates.sort()
+    dates = [date.fromisoformat(d) for d in completion_dates]
+    dates.sort()
+    last_date = dates[-1]
+    consecutive_count = 0
+    current_date = last_date
+    while current_date in dates:
+        consecutive_count += 1
+        current_date -= timedelta(days=1)
+    streak_data['current_streak'] = consecutive_count
+    return streak_data
+
+def history(years: int):
+    start = date.today() - timedelta(days=365 * years)
+    return [(start + timedelta(days=i)).isoformat() for i in range(365 * years)]
+
+def time_updates(update, days):
+    start = time.perf_counter()
+    for d in days:
+        update(d)
+    return (time.perf_counter() - start) / len(days) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+    
+    dates = history(args.years)
+    last = date.fromisoformat(dates[-1])
+    appends = [last + timedelta(days=i + 1) for i in range(args.updates)]
+    print(f"History: {len(dates)} daily completions ({args.years} years)")
+    
+    old_data = {'completion_dates': list(dates)}
+    old_us = time_updates(lambda d: previous_update(old_data, d), appends)
+    
+    manager = StreakManager(InMemoryDataManager({'completion_dates': list(dates)}))
+    manager.update_streak_for_completion("user", last)  # one-off migration of the legacy record
+    new_us = time_updates(lambda d: manager.update_streak_for_completion("user", d), appends)
+    
+    # Backfills: remove some old days first so each update inserts mid-history
+    holes = [date.fromisoformat(dates[i]) for i in range(10, len(dates) - 10, max(1, len(dates) // args.updates))]
+    hole_strs = {d.isoformat() for d in holes}
+    manager = StreakManager(InMemoryDataManager({'completion_dates': [
+        d for d in dates if d not in hole_strs
+    ]}))
+    manager.update_streak_for_completion("user", last)
+    backfill_us = time_updates(lambda d: manager.update_streak_for_completion("user", d), holes)
+    
+    print(f"{'operation':<22} {'us/update':>10}")
+    print(f"{'append (previous)':<22} {old_us:>10.1f}")
+    print(f"{'append (incremental)':<22} {new_us:>10.1f}")
+    print(f"{'backfill (incremental)':<22} {backfill_us:>10.1f}")
+    print(f"Append speedup: {old_us / new_us:.0f}x")
+
+if __name__ == "__main__":
+    main()
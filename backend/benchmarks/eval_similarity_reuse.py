@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of near-duplicate rewrite reuse.
+
+Generates a synthetic stream of analysis requests where most texts are
+small edits (one or two words changed, added or dropped) of texts seen
+earlier, runs them through SimilarityIndex at several thresholds and
+reports the reuse rate, the upstream LLM calls avoided, and how often a
+reused rewrite came from a different original text (false reuse).
+
+Usage: python benchmarks/eval_similarity_reuse.py [--requests 5000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.similarity_index import SimilarityIndex
+
+OPENERS = ["I feel", "Honestly I feel", "Today I felt", "Lately I have been feeling", "I keep feeling"]
+NEGATIVE = ["lazy", "useless", "like a failure", "stupid", "hopeless", "pathetic", "worthless", "ashamed"]
+BECAUSE = [
+    "because I skipped my morning walk again",
+    "since I forgot to drink water all day",
+    "after I missed my workout for the third time this week",
+    "because I stayed up way too late scrolling",
+    "since I ate junk food instead of cooking",
+    "because I could not focus on my reading",
+    "after I cancelled plans with my friends",
+    "because my room is a mess and I ignored it",
+]
+CLOSERS = ["", "and I hate it", "and nothing seems to help", "and I do not know what to do", "again"]
+DETAILS = [
+    "My sister says I should rest more", "Work has been nonstop since Monday",
+    "The weather has been grey all week", "I wanted to start journaling this month",
+    "My sleep schedule is all over the place", "I signed up for a yoga class last spring",
+    "The kids have been sick and I am exhausted", "I promised myself this would be the week",
+    "My therapist suggested smaller goals", "I keep comparing myself to my coworkers",
+    "I moved to a new city two months ago", "My knee still hurts from running",
+    "I have exams coming up next Thursday", "My partner has been really supportive",
+    "I tried a meal planning app yesterday", "My phone screen time is over six hours",
+]
+FILLERS = ["really", "just", "so", "totally", "kind of", "honestly"]
+
+def base_text(rng: random.Random) -> str:
+    parts = [rng.choice(OPENERS), rng.choice(NEGATIVE), rng.choice(BECAUSE), rng.choice(CLOSERS),
+             ". " + rng.choice(DETAILS), ". " + rng.choice(DETAILS)]
+    return ' '.join(p for p in parts if p)
+
+def tweak(text: str, rng: random.Random) -> str:
+    """Apply one or two small word-level edits, like a user re-running analysis"""
+    words = text.split()
+    for _ in range(rng.randint(1, 2)):
+        edit = rng.random()
+        position = rng.randrange(len(words))
+        if edit < 0.4:
+            words.insert(position, rng.choice(FILLERS))
+        elif edit < 0.7 and len(words) > 4:
+            del words[position]
+        else:
+            words[position] = rng.choice(FILLERS)
+    return ' '.join(words)
+
+def generate_requests(count: int, seed: int, repeat_ratio: float = 0.7):
+    rng = random.Random(seed)
+    bases = []
+    requests = []
+    for _ in range(count):
+        if bases and rng.random() < repeat_ratio:
+            base_id = rng.randrange(len(bases))
+            requests.append((bases[base_id], tweak(bases[base_id], rng)))
+        else:
+            bases.append(base_text(rng))
+            requests.append((bases[-1], bases[-1]))
+    return requests
+
+def evaluate(requests, threshold: float) -> dict:
+    index = SimilarityIndex(threshold=threshold)
+    upstream_calls = 0
+    false_reuse = 0
+    start = time.perf_counter()
+    for base, text in requests:
+        reused = index.lookup(text)
+        if reused:
+            if reused[0] != base:
+                false_reuse += 1
+            continue
+        # Stand-in for the LLM call; the "rewrite" records which text it came from
+        upstream_calls += 1
+        index.add(text, base)
+    elapsed = time.perf_counter() - start
+    reused_count = len(requests) - upstream_calls
+    return {
+        'threshold': threshold,
+        'reuse_rate': reused_count / len(requests),
+        'upstream_calls': upstream_calls,
+        'calls_avoided': reused_count,
+        'false_reuse': false_reuse,
+        'us_per_request': elapsed / len(requests) * 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    requests = generate_requests(args.requests, args.seed)
+    distinct_bases = len({base for base, _ in requests})
+    print(f"{len(requests)} requests over {distinct_bases} distinct texts "
+          f"(at most {len(requests) - distinct_bases} calls avoidable)")
+    print(f"{'threshold':>9} {'reuse rate':>11} {'upstream':>9} {'avoided':>8} {'false reuse':>12} {'us/req':>8}")
+    for threshold in (0.6, 0.7, 0.8, 0.9):
+        r = evaluate(requests, threshold)
+        print(f"{r['threshold']:>9.1f} {r['reuse_rate']:>10.1%} {r['upstream_calls']:>9} "
+              f"{r['calls_avoided']:>8} {r['false_reuse']:>12} {r['us_per_request']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Load test the API with a weighted mix of realistic requests.
+
+By default the FastAPI app is driven in-process, straight through its
+ASGI interface (no sockets, no server), on a scratch copy of a dataset
+with the LLM replaced by a local stub; startup and shutdown events run
+as under uvicorn. With --url the same traffic goes to a running server
+over HTTP/1.1 keep-alive connections, one per worker thread (the server
+then uses its own data and LLM settings).
+
+Traffic mix (--mix name=weight,...):
+  calendar  GET  /api/calendar/{date}        a day in the last month
+  feed      GET  /api/posts
+  streak    GET  /api/streak
+  react     POST /api/posts/{id}/react
+  comment   POST /api/posts/{id}/comments
+  analyze   POST /api/posts/analyze          negative text, so the (stub) LLM is called
+
+Reports throughput and p50/p95/p99 latency per route, with status codes;
+429/503 responses are the route and rate limits shedding load (use
+--no-limits to lift them in-process, or spread traffic over more --users).
+
+Workers are closed-loop: each sends its next request when the previous
+one is answered. In-process they share the app's event loop, so a handler
+that blocks the loop (e.g. a synchronous LLM call) shows up as lost
+throughput across all routes more than as latency on the others.
+
+Usage:
+  python benchmarks/load_test.py [--concurrency 16] [--duration 10] [--mix calendar=40,comment=10]
+  python benchmarks/load_test.py --data-dir /path/to/database --llm-latency 0.3 --output report.json
+  python benchmarks/load_test.py --url http://localhost:8080 --concurrency 32
+
+For production-like volumes, generate a dataset first (see data/synthetic_data.py):
+  python -m data.synthetic_data --output /tmp/dataset --users 5000 --posts 20000
+  python benchmarks/load_test.py --data-dir /tmp/dataset --users 5000
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "tests"))
+
+DEFAULT_MIX = "calendar=40,feed=15,streak=10,react=15,comment=10,analyze=10"
+
+COMMENTS = [
+    "This is so relatable, thank you for sharing.",
+    "Proud of you for sticking with it this week!",
+    "I tried the same thing and it really helped my mornings.",
+]
+# Analysis texts are assembled from these so most are new to the rewriter's
+# similarity cache and reach the (stub) LLM, as real posts would
+ANALYZE_TITLES = ["I failed again today", "Another bad day", "Ugh", "Week {n} update", "Day {n} of trying"]
+ANALYZE_SENTENCES = [
+    "I feel so lazy and useless after skipping {n} workouts in a row.",
+    "I'm such an idiot for forgetting my meds on day {n}.",
+    "I hate myself for eating junk again, {n} nights this week.",
+    "Everyone else manages it and I'm a total failure at this.",
+    "I went to bed at {n} am again and my whole morning was a mess.",
+    "My therapist says progress isn't linear but I still feel pathetic.",
+    "I only drank {n} glasses of water and got another headache.",
+    "I keep messing up the simplest habits.",
+]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def parse_mix(spec):
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+# Each scenario returns (route label, method, path, query parameters, JSON body or None)
+def calendar(rng, user, posts):
+    day = date.today() - timedelta(days=rng.randrange(30))
+    return "GET /api/calendar/{target_date}", "GET", f"/api/calendar/{day.isoformat()}", {"user_id": user}, None
+
+def feed(rng, user, posts):
+    return "GET /api/posts", "GET", "/api/posts", {}, None
+
+def streak(rng, user, posts):
+    return "GET /api/streak", "GET", "/api/streak", {"user_id": user}, None
+
+def react(rng, user, posts):
+    return "POST /api/posts/{post_id}/react", "POST", f"/api/posts/{rng.choice(posts)}/react", {}, None
+
+def comment(rng, user, posts):
+    post_id = rng.choice(posts)
+    body = {"post_id": post_id, "user_id": user, "content": rng.choice(COMMENTS)}
+    return "POST /api/posts/{post_id}/comments", "POST", f"/api/posts/{post_id}/comments", {}, body
+
+def analyze(rng, user, posts):
+    title = rng.choice(ANALYZE_TITLES).format(n=rng.randrange(1, 100))
+    sentences = [sentence.format(n=rng.randrange(2, 12)) for sentence in rng.sample(ANALYZE_SENTENCES, 3)]
+    body = {"content": title + "\n" + " ".join(sentences), "user_id": user}
+    return "POST /api/posts/analyze", "POST", "/api/posts/analyze", {}, body
+
+SCENARIOS = {
+    "calendar": calendar,
+    "feed": feed,
+    "streak": streak,
+    "react": react,
+    "comment": comment,
+    "analyze": analyze,
+}
+
+class Recorder:
+    """Latencies and status codes per route; shared by all workers"""
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.lock = threading.Lock()
+    
+    def record(self, route, status, seconds):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            counts = self.statuses.setdefault(route, {})
+            counts[status] = counts.get(status, 0) + 1
+    
+    def report(self, elapsed):
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            routes[route] = {
+                'requests': len(samples),
+                'throughput_rps': len(samples) / elapsed,
+                'p50_ms': percentile(samples, 50) * 1e3,
+                'p95_ms': percentile(samples, 95) * 1e3,
+                'p99_ms': percentile(samples, 99) * 1e3,
+                'max_ms': max(samples) * 1e3,
+                'statuses': {str(status): count for status, count in sorted(self.statuses[route].items())}
+            }
+        everything = [sample for samples in self.latencies.values() for sample in samples]
+        total = {
+            'requests': len(everything),
+            'throughput_rps': len(everything) / elapsed,
+            'p50_ms': percentile(everything, 50) * 1e3 if everything else 0.0,
+            'p95_ms': percentile(everything, 95) * 1e3 if everything else 0.0,
+            'p99_ms': percentile(everything, 99) * 1e3 if everything else 0.0,
+        }
+        return {'elapsed_seconds': elapsed, 'routes': routes, 'total': total}
+
+class AsgiClient:
+    """Sends requests straight into an ASGI app, as a server would"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def request(self, method, path, query, body, client_ip):
+        payload = json.dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": urlencode(query).encode(),
+            "headers": [(b"host", b"loadtest"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode())],
+            "client": (client_ip, 50000),
+            "server": ("loadtest", 80),
+        }
+        status = 0
+        body_sent = False
+        
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            # The client stays connected until the response is done
+            await asyncio.get_running_loop().create_future()
+        
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+        
+        await self.app(scope, receive, send)
+        return status
+
+class HttpClient:
+    """HTTP/1.1 keep-alive connection per thread to a running server"""
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+    
+    def request(self, method, path, query, body):
+        payload = json.dumps(body).encode() if body is not None else None
+        target = f"{path}?{urlencode(query)}" if query else path
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in range(2):
+            connection = getattr(self.local, "connection", None)
+            if connection is None:
+                connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, target, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (OSError, http.client.HTTPException):
+                # Server closed the kept-alive connection; reconnect once
+                connection.close()
+                self.local.connection = None
+        return 0
+
+def prepare_in_process(args):
+    """Import the app inside a scratch copy of the dataset, with the LLM stubbed"""
+    workdir = tempfile.mkdtemp(prefix="tendril-load-")
+    source = args.data_dir or os.path.join(BACKEND_DIR, "database")
+    if os.path.isdir(source):
+        shutil.copytree(source, os.path.join(workdir, "database"))
+    # main.py's DataManager uses relative paths
+    os.chdir(workdir)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    import main as api
+    from llm_stub import StubGroqClient
+    
+    api.compassionate_rewriter.client = StubGroqClient(latency_seconds=args.llm_latency, seed=args.seed)
+    if args.no_limits:
+        for limit in api.route_limits:
+            limit.limiter = None
+            limit.max_in_flight = limit.max_in_flight_per_key = None
+        api.rate_limiter = api.RateLimiter(max_requests=10 ** 9, window_seconds=60)
+    
+    posts = [post["id"] for post in api.data_manager.load_posts()]
+    with open(api.data_manager.tasks_file) as f:
+        users = sorted({task["user_id"] for task in json.load(f) if task.get("user_id")})
+    return api, workdir, users, posts
+
+def run_in_process(args, mix):
+    api, workdir, users, posts = prepare_in_process(args)
+    # Dataset users first, then made-up ones (with no tasks or streaks) up to --users
+    users += [f"load-user-{i}" for i in range(max(0, args.users - len(users)))]
+    client = AsgiClient(api.app)
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    
+    async def worker(number, deadline, budget):
+        rng = random.Random(args.seed * 1000 + number)
+        while time.perf_counter() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            user = rng.choice(users)
+            route, method, path, query, body = SCENARIOS[rng.choices(names, weights)[0]](rng, user, posts)
+            # The route limits key requests without user_id by address: one address per user
+            user_index = zlib.crc32(user.encode()) % 65536
+            start = time.perf_counter()
+            status = await client.request(method, path, query, body, f"10.0.{user_index // 256}.{user_index % 256}")
+            recorder.record(route, status, time.perf_counter() - start)
+    
+    async def run():
+        await api.app.router.startup()
+        try:
+            start = time.perf_counter()
+            deadline = start + args.duration
+            budget = [args.requests or float("inf")]
+            await asyncio.gather(*(worker(number, deadline, budget) for number in range(args.concurrency)))
+            return time.perf_counter() - start
+        finally:
+            await api.app.router.shutdown()
+    
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = recorder.report(elapsed)
+    rewriter_stats = api.compassionate_rewriter.get_stats()
+    report['llm'] = {'stub_calls': api.compassionate_rewriter.client.calls,
+                     'rewrite_requests': rewriter_stats['rewrite_requests'],
+                     'similarity_reuse': rewriter_stats['similarity_reuse']}
+    return report, len(users), len(posts)
+
+def run_against_server(args, mix):
+    client = HttpClient(args.url)
+    users = [f"user-{i}" for i in range(args.users)]
+    connection = http.client.HTTPConnection(client.host, client.port, timeout=30)
+    connection.request("GET", "/api/posts")
+    posts = [post["id"] for post in json.loads(connection.getresponse().read())]
+    connection.close()
+    if not posts:
+        raise SystemExit("The server has no posts to react to or comment on")
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    budget = [args.requests or float("inf")]
+    budget_lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    
+    def worker(number):
+        rng = random.Random(args.seed * 1000 + number)
+        while time.perf_counter() < deadline:
+            with budget_lock:
+                if budget[0] <= 0:
+                    return
+                budget[0] -= 1
+            route, method, path, query, body = SCENARIOS[rng.choices(names, weights)[0]](rng, rng.choice(users), posts)
+            request_start = time.perf_counter()
+            status = client.request(method, path, query, body)
+            recorder.record(route, status, time.perf_counter() - request_start)
+    
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.perf_counter() - start), len(users), len(posts)
+
+def print_report(report):
+    print(f"{'route':<38} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for route, stats in report['routes'].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in stats['statuses'].items())
+        print(f"{route:<38} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}  {statuses}")
+    total = report['total']
+    print(f"{'all':<38} {total['requests']:>7} {total['throughput_rps']:>8.1f} {total['p50_ms']:>8.1f} "
+          f"{total['p95_ms']:>8.1f} {total['p99_ms']:>8.1f}")
+    if 'llm' in report:
+        print(f"LLM: {report['llm']['stub_calls']} stub calls for {report['llm']['rewrite_requests']} rewrites "
+              f"(the rest reused from the similarity cache)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="load test a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: no limit)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted scenarios (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=200,
+                        help="user IDs to spread requests over, dataset users first (default 200)")
+    parser.add_argument("--data-dir", help="dataset to copy and run against in-process (default: backend/database)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds the stub LLM takes per call")
+    parser.add_argument("--no-limits", action="store_true", help="lift route and rate limits (in-process only)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    
+    if args.url:
+        report, users, posts = run_against_server(args, mix)
+        target = args.url
+    else:
+        report, users, posts = run_in_process(args, mix)
+        target = f"in-process app, stub LLM {args.llm_latency * 1000:.0f} ms"
+    print(f"{target}: {args.concurrency} concurrent, {report['elapsed_seconds']:.1f} s, "
+          f"{users} users, {posts} posts")
+    print_report(report)
+    if args.output:
+        report['config'] = {key: value for key, value in vars(args).items()}
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote report to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark suite for the data, streak, rewriter and rate limiter hot paths.
+
+Each case is timed with enough loops per repeat to run for --min-time
+seconds, over --repeats repeats; the median time per call is what gets
+compared. Results can be saved as JSON and compared with a saved
+baseline: cases slower than the baseline by more than --threshold are
+flagged as regressions and the exit status is 1.
+
+Cases:
+  data_manager.*[N]      load/save on tasks.json and posts.json holding N records
+  streak.*[Ny]           streak updates and full recalculation over N-year histories
+  rewriter.*[short|long] negative-word matching and LLM response cleanup
+  rate_limiter.*         checks across many distinct keys, in-process and shared
+
+Usage:
+  python benchmarks/suite.py [--output results.json]
+  python benchmarks/suite.py --baseline baseline.json [--threshold 0.25]
+  python benchmarks/suite.py --filter rewriter --sizes 1000,10000 --quick
+
+Typical workflow: save a baseline on the main branch, then compare a
+branch against it on the same machine.
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from data.completion_bitmap import CompletionBitmap
+from data.data_manager import DataManager
+from data.rate_limiter import RateLimiter, SharedRateLimiter
+from data.streak_manager import StreakManager
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+STREAK_YEARS = (1, 10, 40)
+
+SHORT_TEXT = "I feel so lazy today and I hate that I skipped my workout again."
+LONG_TEXT = " ".join([
+    "Went for a short walk after lunch and drank plenty of water today.",
+    "I keep hating myself for skipping the gym, I feel lazy and useless.",
+    "My failures keep ruining my plans and I messed up my sleep schedule again.",
+    "Trying a new recipe tonight with lots of vegetables and some rice.",
+] * 20)
+SHORT_RESPONSE = "Here's a rewritten version:\n\nI'm being gentle with myself today."
+LONG_RESPONSE = "\n".join([
+    "Here's a rewritten version:",
+    "",
+    "**Taking a rest day is part of caring for myself.**",
+    "I skipped my workout, and that's okay; tomorrow is a new chance.",
+    "",
+    "In this rewritten version, I've aimed to use kinder language.",
+    "By using supportive words the text feels more encouraging.",
+] * 10)
+
+def make_tasks(count, users):
+    """count tasks spread over users, each with a week of completion history"""
+    start = date(2024, 1, 1)
+    tasks = []
+    for i in range(count):
+        history = {(start + timedelta(days=(i + day) % 365)).isoformat(): day % 3 != 0 for day in range(7)}
+        tasks.append({
+            'id': f"task-{i}",
+            'user_id': f"user-{i % users}",
+            'title': f"Daily habit {i}",
+            'description': "Drink a glass of water before breakfast",
+            'completed': False,
+            'created_at': datetime(2024, 1, 1, 8, 0).isoformat(),
+            'is_recurring': True,
+            'recurrence_days': [0, 2, 4],
+            'completion_history': history
+        })
+    return tasks
+
+def make_posts(count):
+    return [{
+        'id': f"post-{i}",
+        'user_id': f"user-{i % 500}",
+        'title': f"Small win number {i}",
+        'content': "Managed to stretch for ten minutes this morning. " * 4,
+        'created_at': datetime(2024, 1, 1, 8, 0).isoformat(),
+        'likes': i % 17,
+        'reactions': {'heart': i % 5, 'hug': i % 3},
+        'comments_count': i % 7
+    } for i in range(count)]
+
+def make_data_manager(directory):
+    """A DataManager whose files live in directory (it only takes relative paths)"""
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        data_manager = DataManager()
+    finally:
+        os.chdir(cwd)
+    for attribute in ('tasks_file', 'posts_file', 'comments_file', 'streak_file', 'tips_file', 'jobs_file'):
+        setattr(data_manager, attribute, os.path.join(directory, getattr(data_manager, attribute)))
+    return data_manager
+
+def data_manager_cases(args, workdir):
+    for size in args.sizes:
+        def setup_files(size=size):
+            directory = tempfile.mkdtemp(dir=workdir)
+            data_manager = make_data_manager(directory)
+            tasks = make_tasks(size, users=max(1, size // 20))
+            data_manager._save_tasks(tasks)
+            data_manager._save_posts(make_posts(size))
+            return data_manager, tasks
+        
+        def load_tasks(setup_files=setup_files):
+            data_manager, _ = setup_files()
+            return lambda: data_manager.load_tasks("user-0")
+        
+        def save_task(setup_files=setup_files):
+            # Update an existing task in the middle of the file
+            data_manager, tasks = setup_files()
+            task = dict(tasks[len(tasks) // 2], completed=True)
+            return lambda: data_manager.save_task(task)
+        
+        def load_posts(setup_files=setup_files):
+            data_manager, _ = setup_files()
+            return data_manager.load_posts
+        
+        def save_post(setup_files=setup_files):
+            data_manager, _ = setup_files()
+            post = dict(make_posts(size)[size // 2], likes=99)
+            return lambda: data_manager.save_post(post)
+        
+        yield f"data_manager.load_tasks[{size}]", load_tasks
+        yield f"data_manager.save_task[{size}]", save_task
+        yield f"data_manager.load_posts[{size}]", load_posts
+        yield f"data_manager.save_post[{size}]", save_post
+
+class InMemoryDataManager:
+    """Streak storage in a dict, so only the streak computation is measured"""
+    def __init__(self, streak_data):
+        self.streak_data = streak_data
+    
+    def load_streak(self, user_id):
+        return self.streak_data
+    
+    def save_streak(self, user_id, streak_data):
+        self.streak_data = streak_data
+
+def streak_cases(args, workdir):
+    for years in args.streak_years:
+        days = 365 * years
+        first = date.today() - timedelta(days=days)
+        # Completed five days out of six, so there are many runs to scan
+        history = [first + timedelta(days=i) for i in range(days) if i % 6 != 5]
+        
+        def update(history=history):
+            # Each call completes the day after the history, like a daily check-in,
+            # starting from the same stored record so every call does the same work
+            record = {
+                'completion_bitmap': CompletionBitmap.from_dates(history).to_json(),
+                'rollover_date': date.today().isoformat()
+            }
+            storage = InMemoryDataManager(record)
+            manager = StreakManager(storage)
+            next_day = history[-1] + timedelta(days=1)
+            
+            def run():
+                storage.streak_data = dict(record)
+                manager.update_streak_for_completion("user", next_day)
+            return run
+        
+        def recalculate(history=history):
+            # Full recalculation from the completion days (the work of a rebuild)
+            manager = StreakManager(InMemoryDataManager({}))
+            completions = CompletionBitmap.from_dates(history)
+            today = date.today()
+            return lambda: manager.build_streak_record(completions, today)
+        
+        def load_legacy(history=history):
+            # A record still in the list-of-dates format, converted on read
+            manager = StreakManager(InMemoryDataManager({}))
+            record = {'completion_dates': [day.isoformat() for day in history]}
+            return lambda: manager._load_completions(record)
+        
+        yield f"streak.update_streak_for_completion[{years}y]", update
+        yield f"streak.build_streak_record[{years}y]", recalculate
+        yield f"streak.load_legacy_completions[{years}y]", load_legacy
+
+def rewriter_cases(args, workdir):
+    rewriter = []
+    
+    def get_rewriter():
+        # Built once, on first use; without GROQ_API_KEY no client is created
+        if not rewriter:
+            rewriter.append(CompassionateRewriter())
+        return rewriter[0]
+    
+    for length, text, response in (("short", SHORT_TEXT, SHORT_RESPONSE), ("long", LONG_TEXT, LONG_RESPONSE)):
+        yield (f"rewriter.contains_negative_words[{length}]",
+               lambda text=text: lambda: get_rewriter().contains_negative_words(text))
+        yield (f"rewriter.extract_rewritten_content[{length}]",
+               lambda response=response: lambda: get_rewriter().extract_rewritten_content(response))
+
+def rate_limiter_cases(args, workdir):
+    keys = [f"user-{i}" for i in range(args.keys)]
+    
+    def many_keys(make_limiter):
+        def setup():
+            limiter = make_limiter()
+            position = [0]
+            
+            def run():
+                limiter.is_allowed(keys[position[0]])
+                position[0] = (position[0] + 1) % len(keys)
+            # Every key has been seen once, so calls hit existing entries
+            for key in keys:
+                limiter.is_allowed(key)
+            return run
+        return setup
+    
+    yield (f"rate_limiter.is_allowed[{args.keys} keys]",
+           many_keys(lambda: RateLimiter(max_requests=10, window_seconds=60)))
+    yield (f"rate_limiter.shared_is_allowed[{args.keys} keys]",
+           many_keys(lambda: SharedRateLimiter(os.path.join(tempfile.mkdtemp(dir=workdir), "limits.bin"),
+                                               max_requests=10, window_seconds=60)))
+
+CASE_FAMILIES = (data_manager_cases, streak_cases, rewriter_cases, rate_limiter_cases)
+
+def measure(fn, min_time, repeats):
+    """Seconds per call for each repeat, with loops chosen so a repeat takes about min_time"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 24:
+            break
+        # Aim straight for min_time once there is a usable estimate
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+    times = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - start) / loops)
+    return times, loops
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline; return the names that regressed"""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp')} "
+          f"(commit {baseline['meta'].get('commit')}), threshold {threshold:.0%}")
+    print(f"{'case':<52} {'baseline us':>12} {'now us':>12} {'change':>8}")
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"{name:<52} {'-':>12} {result['median_us']:>12.2f} {'new':>8}")
+            continue
+        change = result['median_us'] / previous['median_us'] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<52} {previous['median_us']:>12.2f} {result['median_us']:>12.2f} {change:>+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="relative slowdown of the median flagged as a regression (default 0.25)")
+    parser.add_argument("--filter", action="append", default=[],
+                        help="only run cases matching this glob or substring (repeatable)")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="record counts for the data_manager cases")
+    parser.add_argument("--streak-years", default=",".join(map(str, STREAK_YEARS)),
+                        help="history lengths for the streak cases")
+    parser.add_argument("--keys", type=int, default=100000, help="distinct keys for the rate_limiter cases")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter repeats, for a smoke run")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",") if size]
+    args.streak_years = [int(years) for years in args.streak_years.split(",") if years]
+    if args.quick:
+        args.min_time, args.repeats = 0.05, 3
+    
+    # The rewriter warns about the missing API key; keep the table readable
+    logging.disable(logging.WARNING)
+    
+    def selected(name):
+        return not args.filter or any(pattern in name or fnmatch.fnmatch(name, pattern) for pattern in args.filter)
+    
+    results = {}
+    print(f"{'case':<52} {'median us':>12} {'min us':>12} {'loops':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for family in CASE_FAMILIES:
+            for name, setup in family(args, workdir):
+                if not selected(name):
+                    continue
+                fn = setup()
+                fn()  # warm up caches and lazy initialization
+                times, loops = measure(fn, args.min_time, args.repeats)
+                results[name] = {
+                    'median_us': statistics.median(times) * 1e6,
+                    'min_us': min(times) * 1e6,
+                    'max_us': max(times) * 1e6,
+                    'loops': loops,
+                    'repeats': len(times)
+                }
+                print(f"{name:<52} {results[name]['median_us']:>12.2f} {results[name]['min_us']:>12.2f} {loops:>8}")
+    
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'min_time': args.min_time,
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import time
+import threading
+from typing import Dict, Any, Optional
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to an unreliable upstream service.
+    
+    States:
+    - closed: calls go through; consecutive failures are counted
+    - open: calls are rejected until recovery_timeout has elapsed
+    - half_open: a single probe call is let through; success closes the
+      circuit, failure opens it again
+    
+    Calls slower than slow_call_seconds count as failures even if they
+    eventually succeed, so a sluggish upstream trips the breaker as well.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 slow_call_seconds: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        
+        # Counters for observability
+        self.total_calls = 0
+        self.total_failures = 0
+        self.total_slow_calls = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+    
+    def allow_request(self) -> bool:
+        """Return True if a call to the upstream should be attempted now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at >= self.recovery_timeout:
+                    # Let a single probe through to test recovery
+                    self.state = self.HALF_OPEN
+                    self._probe_in_flight = True
+                    return True
+                self.rejected_calls += 1
+                return False
+            
+            # Half-open: only one probe at a time
+            if self._probe_in_flight:
+                self.rejected_calls += 1
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self, elapsed_seconds: float = 0.0):
+        """Record a completed upstream call"""
+        if elapsed_seconds > self.slow_call_seconds:
+            with self._lock:
+                self.total_slow_calls += 1
+            self.record_failure()
+            return
+        
+        with self._lock:
+            self.total_calls += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self.opened_at = None
+    
+    def record_failure(self):
+        """Record a failed (or too slow) upstream call"""
+        with self._lock:
+            self.total_calls += 1
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the breaker state and counters"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+                'slow_call_seconds': self.slow_call_seconds,
+                'total_calls': self.total_calls,
+                'total_failures': self.total_failures,
+                'total_slow_calls': self.total_slow_calls,
+                'rejected_calls': self.rejected_calls,
+                'times_opened': self.times_opened
+            }
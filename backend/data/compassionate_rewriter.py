@@ -1,35 +1,173 @@
 import os
 import re
+import bisect
 import logging
-from typing import Optional, Tuple, List
+import queue
+import threading
+import time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Tuple, List, Dict, Iterator
 from groq import Groq
 from groq.types.chat import ChatCompletion
+from .circuit_breaker import CircuitBreaker
+from .rule_based_rewriter import RuleBasedRewriter
+from .request_hedger import RequestHedger
+from .similarity_index import SimilarityIndex
+from .lexicon import Lexicon
+from .tracing import traced, record_span, start_span, CLIENT
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Handlers and levels are set up by the application (see structured_logging)
 logger = logging.getLogger(__name__)
 
+# Lines containing any of these are explanations or labels, not rewrite text
+SKIP_PATTERNS = [
+    "here's a rewritten version:",
+    "here's the rewritten version:",
+    "rewritten version:",
+    "in this rewritten version",
+    "i've aimed to",
+    "i've tried to",
+    "the rewritten version",
+    "by using",
+    "by replacing",
+    "i've replaced",
+    "i've changed",
+    "this version",
+    "the new version",
+    "the compassionate version",
+    "here is the rewritten text:",
+    "title:",
+    "content:"
+]
+
+SENTENCE_END = re.compile(r'[.!?]["\')]?\s')
+
+
+class StreamingRewriteFilter:
+    """
+    Incremental version of CompassionateRewriter.extract_rewritten_content.
+    
+    Tokens are fed in as they arrive from the LLM. Text is released one
+    sentence at a time, once the sentence is known not to be a label or
+    explanation, so the client sees the rewrite while it is generated.
+    Because decisions are made per sentence rather than per full line the
+    output can differ slightly from the batch extractor; the final event of
+    a stream carries the authoritative batch result.
+    """
+    
+    def __init__(self, is_explanation_line):
+        self.is_explanation_line = is_explanation_line
+        self.line_buffer = ""
+        self.line_skipped = False
+        self.line_has_output = False
+        self.emitted_any = False
+    
+    def _release(self, text: str) -> str:
+        text = text.replace('**', '').replace('*', '')
+        if not self.line_has_output:
+            text = text.lstrip()
+            if not text:
+                return ""
+            if self.emitted_any:
+                text = '\n' + text
+        self.line_has_output = True
+        self.emitted_any = True
+        return text
+    
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of LLM output and return any text safe to emit"""
+        output = []
+        for piece in re.split(r'(\n)', chunk):
+            if piece == '\n':
+                output.append(self._finish_line())
+                continue
+            self.line_buffer += piece
+            # Release complete sentences from the current line
+            while not self.line_skipped:
+                match = SENTENCE_END.search(self.line_buffer)
+                if not match:
+                    break
+                sentence = self.line_buffer[:match.end()]
+                if self.is_explanation_line(sentence.strip()):
+                    # Treat the rest of the line as explanation too
+                    self.line_skipped = True
+                    break
+                self.line_buffer = self.line_buffer[match.end():]
+                output.append(self._release(sentence))
+        return ''.join(output)
+    
+    def _finish_line(self) -> str:
+        remainder = self.line_buffer.strip()
+        released = ""
+        if not self.line_skipped and remainder and not self.is_explanation_line(remainder):
+            released = self._release(remainder)
+        self.line_buffer = ""
+        self.line_skipped = False
+        self.line_has_output = False
+        return released
+    
+    def flush(self) -> str:
+        """Release whatever is left once the LLM stream has ended"""
+        return self._finish_line()
+
+
 class CompassionateRewriter:
-    def __init__(self):
+    def __init__(self, max_concurrent_rewrites: int = 4, request_timeout: float = 15.0,
+                 enable_hedging: Optional[bool] = None, max_concurrent_streams: int = 32):
         self.client = None
-        self.negative_words = {
-            'lazy', 'disgusting', 'hate', 'terrible', 'awful', 'horrible',
-            'stupid', 'idiot', 'worthless', 'useless', 'pathetic', 'failure',
-            'disgusted', 'sick', 'nasty', 'gross', 'filthy', 'dirty',
-            'embarrassed', 'ashamed', 'guilty', 'hopeless', 'helpless',
-            'weak', 'broken', 'damaged', 'ruined', 'destroyed', 'messed up',
-            'dumb', 'yikes', 'cringe', 'ridiculous', 'absurd', 'nonsense',
-            'terrible', 'awful', 'horrible', 'disgusting', 'gross', 'nasty',
-            'embarrassing', 'shameful', 'pathetic', 'useless', 'pointless',
-            'meaningless', 'hopeless', 'helpless', 'powerless', 'defeated',
-            'beaten', 'crushed', 'destroyed', 'ruined', 'wasted', 'squandered'
-        }
+        self.request_timeout = request_timeout
+        if enable_hedging is None:
+            enable_hedging = os.environ.get("REWRITER_HEDGING", "").lower() in ("1", "true", "yes")
+        # Optional: race a second request when the first is slower than the recent p95
+        self.hedger = RequestHedger(
+            hedge_budget=float(os.environ.get("REWRITER_HEDGE_BUDGET", 0.1))
+        ) if enable_hedging else None
+        # Title and content rewrites are dispatched concurrently so a post
+        # costs roughly one LLM round-trip instead of two.
+        self.rewrite_executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_rewrites,
+            thread_name_prefix="rewrite"
+        )
+        # A streamed part holds its thread for the whole LLM stream, so streams
+        # get their own pool (two parts per stream) and can't starve the one above
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=2 * max_concurrent_streams,
+            thread_name_prefix="rewrite-stream"
+        )
+        # Weighted lexicon with inflected variants, compiled once at startup.
+        # Text is only sent to the LLM when its severity score reaches the
+        # threshold, so mild wording ("yikes") doesn't cost a rewrite.
+        self.lexicon = Lexicon.load(os.environ.get("NEGATIVE_LEXICON_PATH"))
+        self.negative_words = set(self.lexicon.terms)
+        self.rewrite_threshold = float(
+            os.environ.get("REWRITER_SCORE_THRESHOLD", self.lexicon.rewrite_threshold)
+        )
+        
+        # Trip after repeated Groq failures or slow calls and serve rule-based
+        # suggestions until a half-open probe succeeds again
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get("REWRITER_BREAKER_FAILURES", 5)),
+            recovery_timeout=float(os.environ.get("REWRITER_BREAKER_RECOVERY_SECONDS", 30)),
+            slow_call_seconds=float(os.environ.get("REWRITER_SLOW_CALL_SECONDS", 8))
+        )
+        self.fallback_rewriter = RuleBasedRewriter(self.lexicon.surface_forms)
+        
+        # Reuse rewrites of the same user's near-identical earlier texts instead
+        # of calling Groq again; a threshold of 0 disables reuse
+        similarity_threshold = float(os.environ.get("REWRITER_SIMILARITY_THRESHOLD", 0.8))
+        self.similarity_index = SimilarityIndex(
+            threshold=similarity_threshold
+        ) if similarity_threshold > 0 else None
+        self.rewrite_requests = 0
+        self.fallback_rewrites = 0
+        self._stats_lock = threading.Lock()
         
         # Initialize Groq client if API key is available
         api_key = os.environ.get("GROQ_API_KEY")
         if api_key:
             try:
-                logger.info(f"Attempting to initialize Groq client with API key: {api_key[:10]}...")
+                logger.info("Initializing Groq client")
                 self.client = Groq(api_key=api_key)
                 logger.info("Groq client initialized successfully")
             except Exception as e:
@@ -41,6 +179,7 @@ class CompassionateRewriter:
         else:
             logger.warning("GROQ_API_KEY not found in environment variables")
     
+    @traced("CompassionateRewriter.contains_negative_words")
     def contains_negative_words(self, text: str) -> Tuple[bool, List[str]]:
         """
         Check if text contains negative words and return them.
@@ -57,16 +196,135 @@ class CompassionateRewriter:
         # Convert to lowercase for case-insensitive matching
         text_lower = text.lower()
         
-        # Find all negative words in the text
-        found_words = []
-        for word in self.negative_words:
-            # Use word boundaries to avoid partial matches
-            pattern = r'\b' + re.escape(word) + r'\b'
-            if re.search(pattern, text_lower):
-                found_words.append(word)
+        # Find all negative words (including inflections) in the text, each
+        # reported once under its base lexicon term
+        found_words = self.lexicon.find_terms(text_lower)
         
         return len(found_words) > 0, found_words
     
+    @traced("CompassionateRewriter.contains_negative_words_batch")
+    def contains_negative_words_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        Find negative words in many texts with a single regex pass.
+        
+        The texts are joined with a separator that can't be part of a word,
+        scanned once, and matches are mapped back to their text by offset.
+        
+        Args:
+            texts: The texts to analyze
+            
+        Returns:
+            List with the found words for each text, in input order
+        """
+        separator = '\n\x00\n'
+        # Lowercase each text before taking offsets: lower() can change a
+        # string's length (e.g. 'İ' becomes two code points)
+        lowered = [(text or "").lower() for text in texts]
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + len(separator)
+        joined = separator.join(lowered)
+        
+        found: List[Dict[str, None]] = [{} for _ in texts]
+        variant_to_term = self.lexicon.variant_to_term
+        for match in self.lexicon.pattern.finditer(joined):
+            index = bisect.bisect_right(starts, match.start()) - 1
+            found[index][variant_to_term[match.group(1)]] = None
+        return [list(words) for words in found]
+    
+    def detect_batch(self, items: List[Dict[str, str]]) -> List[dict]:
+        """
+        Negative-word detection for every item, as the 'analysis' results
+        analyze_batch yields. Items with contains_negative_words set are
+        the ones a rewrite would be requested for.
+        """
+        texts = [item.get('content') or "" for item in items]
+        analyses = []
+        for index, (item, found_words) in enumerate(zip(items, self.contains_negative_words_batch(texts))):
+            score = self.lexicon.score_terms(found_words)
+            analyses.append({
+                'type': 'analysis',
+                'index': index,
+                'id': item.get('id'),
+                'contains_negative_words': score >= self.rewrite_threshold,
+                'found_words': found_words,
+                'severity_score': score
+            })
+        return analyses
+    
+    def analyze_batch(self, items: List[Dict[str, str]], rewrite: bool = False,
+                      max_concurrent_rewrites: int = 4, analyses: Optional[List[dict]] = None,
+                      user_id: Optional[str] = None) -> Iterator[dict]:
+        """
+        Analyze many texts, optionally rewriting only the flagged ones.
+        
+        Negative-word detection for the whole batch is yielded first, one
+        result per item. If rewrite is True, flagged items are then rewritten
+        with at most max_concurrent_rewrites LLM calls in flight, and a
+        'rewrite' result is yielded for each as it completes.
+        
+        Args:
+            items: Dicts with 'content' and an optional caller-supplied 'id'
+            rewrite: Whether to request compassionate rewrites for flagged items
+            max_concurrent_rewrites: Upper bound on concurrent LLM calls
+            analyses: detect_batch(items), if the caller already ran it (e.g. to
+                charge the rate limit per flagged item)
+            user_id: Whose texts they are, scoping rewrite reuse
+        """
+        if analyses is None:
+            analyses = self.detect_batch(items)
+        yield from analyses
+        
+        flagged = [analysis['index'] for analysis in analyses if analysis['contains_negative_words']]
+        if not rewrite or not flagged:
+            return
+        
+        with ThreadPoolExecutor(max_workers=max_concurrent_rewrites,
+                                thread_name_prefix="batch-rewrite") as executor:
+            futures = {
+                executor.submit(self.analyze_and_suggest_rewrite, items[index].get('content') or "", user_id): index
+                for index in flagged
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    analysis = future.result()
+                except Exception as e:
+                    analysis = {'suggestion_available': False, 'rewritten_text': None, 'error': str(e)}
+                yield {
+                    'type': 'rewrite',
+                    'index': index,
+                    'id': items[index].get('id'),
+                    'suggestion_available': analysis.get('suggestion_available', False),
+                    'rewritten_text': analysis.get('rewritten_text'),
+                    'error': analysis.get('error')
+                }
+    
+    def is_explanation_line(self, line: str) -> bool:
+        """
+        Check whether a line of AI output is an explanation or label.
+        
+        Args:
+            line: A single stripped line of the AI response
+            
+        Returns:
+            True if the line should be dropped from the rewrite
+        """
+        line_lower = line.lower()
+        if any(pattern in line_lower for pattern in SKIP_PATTERNS):
+            return True
+        
+        # Also skip lines that start with common explanation patterns
+        if line_lower.startswith(("in this", "by ", "the ", "this ", "i've ")):
+            # Check if it's actually an explanation
+            if any(word in line_lower for word in ["aimed", "tried", "replaced", "changed", "version", "using"]):
+                return True
+        
+        return False
+    
+    @traced("CompassionateRewriter.extract_rewritten_content")
     def extract_rewritten_content(self, raw_response: str) -> str:
         """
         Extract only the rewritten content from the AI response, removing explanations.
@@ -90,35 +348,7 @@ class CompassionateRewriter:
             if not line:
                 continue
             
-            # Skip lines that are clearly explanations or prefixes
-            skip_patterns = [
-                "here's a rewritten version:",
-                "here's the rewritten version:",
-                "rewritten version:",
-                "in this rewritten version",
-                "i've aimed to",
-                "i've tried to",
-                "the rewritten version",
-                "by using",
-                "by replacing",
-                "i've replaced",
-                "i've changed",
-                "this version",
-                "the new version",
-                "the compassionate version",
-                "here is the rewritten text:",
-                "title:",
-                "content:"
-            ]
-            
-            line_lower = line.lower()
-            should_skip = any(pattern in line_lower for pattern in skip_patterns)
-            
-            # Also skip lines that start with common explanation patterns
-            if line_lower.startswith(("in this", "by ", "the ", "this ", "i've ")):
-                # Check if it's actually an explanation
-                if any(word in line_lower for word in ["aimed", "tried", "replaced", "changed", "version", "using"]):
-                    should_skip = True
+            should_skip = self.is_explanation_line(line)
             
             if not should_skip:
                 cleaned_lines.append(line)
@@ -142,12 +372,19 @@ class CompassionateRewriter:
         
         return result
     
-    def rewrite_compassionate(self, text: str) -> Optional[str]:
+    def rewrite_compassionate(self, text: str, user_id: Optional[str] = None) -> Optional[str]:
         """
         Rewrite text to sound more compassionate and self-kind.
         
+        Reuses the stored rewrite of a near-identical earlier text by the
+        same user when the similarity index has one; rewrites are never
+        shared between users, and texts without a user_id aren't reused.
+        Falls back to the rule-based rewriter when the Groq call fails or
+        the circuit breaker is open.
+        
         Args:
             text: The original text to rewrite
+            user_id: Whose text it is, scoping rewrite reuse
             
         Returns:
             Rewritten text or None if rewriting failed
@@ -159,56 +396,269 @@ class CompassionateRewriter:
         if not text.strip():
             return None
         
+        with self._stats_lock:
+            self.rewrite_requests += 1
+        
+        reused = self._reuse_rewrite(text, user_id)
+        if reused:
+            return reused
+        
+        if not self.circuit_breaker.allow_request():
+            logger.warning("Circuit breaker open, using rule-based fallback rewrite")
+            return self._fallback_rewrite(text)
+        
+        start = time.perf_counter()
         try:
-            prompt = f"""Rewrite this text to sound more compassionate and self-kind, while maintaining the original meaning and intent:
+            if self.hedger:
+                raw_response = self.hedger.call(lambda: self._request_llm_rewrite(text))
+            else:
+                raw_response = self._request_llm_rewrite(text)
+        except Exception as e:
+            self.circuit_breaker.record_failure()
+            logger.error(f"Failed to rewrite text: {e}")
+            return self._fallback_rewrite(text)
+        self.circuit_breaker.record_success(time.perf_counter() - start)
+        
+        rewritten_text = self.extract_rewritten_content(raw_response)
+        logger.debug("Rewrote text", extra={'input_chars': len(text), 'output_chars': len(rewritten_text)})
+        self._store_rewrite(text, rewritten_text, user_id)
+        return rewritten_text
+    
+    def _reuse_rewrite(self, text: str, user_id: Optional[str]) -> Optional[str]:
+        """The stored rewrite of this user's most similar earlier text, if any"""
+        if not self.similarity_index or not user_id:
+            return None
+        reused = self.similarity_index.lookup(text, scope=user_id)
+        if not reused:
+            return None
+        rewritten_text, similarity = reused
+        logger.debug("Reusing rewrite of a similar text", extra={'similarity': round(similarity, 3)})
+        return rewritten_text
+    
+    def _store_rewrite(self, text: str, rewritten_text: Optional[str], user_id: Optional[str]):
+        if rewritten_text and self.similarity_index and user_id:
+            self.similarity_index.add(text, rewritten_text, scope=user_id)
+    
+    def max_tokens_for(self, text: str) -> int:
+        """
+        Token budget for rewriting text, scaled to its length.
+        
+        A rewrite is roughly as long as the original (a little longer once
+        softened), at about 4 characters per token. Short titles no longer
+        reserve the full 500 tokens, which keeps generation bounded.
+        """
+        estimated_tokens = len(text) // 4
+        return max(48, min(500, estimated_tokens * 2 + 32))
+    
+    def _build_messages(self, text: str) -> List[Dict[str, str]]:
+        """Build the chat messages for a rewrite request"""
+        prompt = f"""Rewrite this text to sound more compassionate and self-kind, while maintaining the original meaning and intent:
 
 Original: {text}
 
 Provide ONLY the rewritten version without any explanations, labels, or additional text. Do not add "Title:" or "Content:" labels. Make it more supportive and understanding, as if speaking to a friend who needs encouragement."""
 
+        return [
+            {
+                "role": "system", 
+                "content": "You are a compassionate writing assistant. You help people rewrite their thoughts to be more kind and supportive to themselves, while preserving the original meaning and emotional intent. Provide ONLY the rewritten text without explanations, labels, or formatting."
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+    
+    def _request_llm_rewrite(self, text: str) -> str:
+        """
+        Send a single rewrite request to Groq and return the raw response.
+        
+        Raises on any upstream error so the caller can record the failure.
+        """
+        max_tokens = self.max_tokens_for(text)
+        with start_span("groq.chat.completions", CLIENT, **{'llm.model': "llama3-8b-8192",
+                                                          'llm.max_tokens': max_tokens}) as span:
             chat_completion = self.client.chat.completions.create(
                 model="llama3-8b-8192",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a compassionate writing assistant. You help people rewrite their thoughts to be more kind and supportive to themselves, while preserving the original meaning and emotional intent. Provide ONLY the rewritten text without explanations, labels, or formatting."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.7
+                messages=self._build_messages(text),
+                max_tokens=max_tokens,
+                temperature=0.7,
+                timeout=self.request_timeout
             )
-            
-            raw_response = chat_completion.choices[0].message.content.strip()
-            rewritten_text = self.extract_rewritten_content(raw_response)
-            logger.info(f"Successfully rewritten text: {len(text)} -> {len(rewritten_text)} characters")
-            return rewritten_text
-            
+            if getattr(chat_completion, 'usage', None):
+                span.set_attribute('llm.completion_tokens', chat_completion.usage.completion_tokens)
+        
+        return chat_completion.choices[0].message.content.strip()
+    
+    def stream_compassionate(self, text: str, user_id: Optional[str] = None) -> Iterator[Dict[str, Optional[str]]]:
+        """
+        Stream a compassionate rewrite as it is generated.
+        
+        Yields {'type': 'token', 'text': ...} events with filtered rewrite
+        text as it arrives, then a single {'type': 'final', 'text': ...}
+        event with the full rewrite as extract_rewritten_content produces
+        it (None if rewriting failed). Reuses and stores rewrites in the
+        similarity index, and falls back to the rule-based rewriter, under
+        the same conditions as rewrite_compassionate.
+        
+        If the LLM stream fails after tokens were sent, the cut-off text is
+        never used: the final event carries the rule-based rewrite instead,
+        with 'discard_tokens' set and the failure in 'error', so the client
+        replaces what it has shown.
+        
+        Args:
+            text: The original text to rewrite
+            user_id: Whose text it is, scoping rewrite reuse
+        """
+        if not self.client:
+            logger.warning("Groq client not available, cannot rewrite text")
+            yield {'type': 'final', 'text': None}
+            return
+        
+        if not text.strip():
+            yield {'type': 'final', 'text': None}
+            return
+        
+        with self._stats_lock:
+            self.rewrite_requests += 1
+        
+        reused = self._reuse_rewrite(text, user_id)
+        if reused:
+            yield {'type': 'token', 'text': reused}
+            yield {'type': 'final', 'text': reused}
+            return
+        
+        if not self.circuit_breaker.allow_request():
+            logger.warning("Circuit breaker open, using rule-based fallback rewrite")
+            fallback = self._fallback_rewrite(text)
+            if fallback:
+                yield {'type': 'token', 'text': fallback}
+            yield {'type': 'final', 'text': fallback}
+            return
+        
+        stream_filter = StreamingRewriteFilter(self.is_explanation_line)
+        raw_chunks = []
+        start = time.perf_counter()
+        # The stream is consumed across yields, so its span is recorded afterwards
+        start_ns = time.time_ns()
+        try:
+            stream = self.client.chat.completions.create(
+                model="llama3-8b-8192",
+                messages=self._build_messages(text),
+                max_tokens=self.max_tokens_for(text),
+                temperature=0.7,
+                timeout=self.request_timeout,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                raw_chunks.append(delta)
+                released = stream_filter.feed(delta)
+                if released:
+                    yield {'type': 'token', 'text': released}
         except Exception as e:
-            logger.error(f"Failed to rewrite text: {e}")
-            return None
+            self.circuit_breaker.record_failure()
+            record_span("groq.chat.completions", start_ns, CLIENT, error=f"{type(e).__name__}: {e}",
+                        **{'llm.model': "llama3-8b-8192", 'llm.stream': True})
+            logger.error(f"Failed to stream rewrite: {e}")
+            fallback = self._fallback_rewrite(text)
+            if not stream_filter.emitted_any:
+                if fallback:
+                    yield {'type': 'token', 'text': fallback}
+                yield {'type': 'final', 'text': fallback}
+            else:
+                yield {'type': 'final', 'text': fallback, 'discard_tokens': True,
+                       'error': "The rewrite stream was interrupted; the streamed text is incomplete"}
+            return
+        else:
+            self.circuit_breaker.record_success(time.perf_counter() - start)
+            record_span("groq.chat.completions", start_ns, CLIENT,
+                        **{'llm.model': "llama3-8b-8192", 'llm.stream': True, 'llm.chunks': len(raw_chunks)})
+        
+        released = stream_filter.flush()
+        if released:
+            yield {'type': 'token', 'text': released}
+        
+        rewritten_text = self.extract_rewritten_content(''.join(raw_chunks).strip())
+        self._store_rewrite(text, rewritten_text, user_id)
+        yield {'type': 'final', 'text': rewritten_text or None}
+    
+    def _fallback_rewrite(self, text: str) -> Optional[str]:
+        """Serve a rule-based rewrite when the LLM can't be used"""
+        with self._stats_lock:
+            self.fallback_rewrites += 1
+        rewritten_text = self.fallback_rewriter.rewrite(text)
+        return rewritten_text or None
     
-    def analyze_and_suggest_rewrite(self, text: str) -> dict:
+    def get_stats(self) -> Dict[str, object]:
         """
-        Analyze text and provide rewriting suggestions if needed.
+        Get rewriter health: circuit breaker state and fallback rate.
+        
+        Returns:
+            Dictionary with breaker stats and rewrite/fallback counters
+        """
+        with self._stats_lock:
+            requests = self.rewrite_requests
+            fallbacks = self.fallback_rewrites
+        return {
+            'llm_available': self.client is not None,
+            'circuit_breaker': self.circuit_breaker.get_stats(),
+            'hedging': self.hedger.get_stats() if self.hedger else None,
+            'similarity_reuse': self.similarity_index.get_stats() if self.similarity_index else None,
+            'rewrite_requests': requests,
+            'fallback_rewrites': fallbacks,
+            'fallback_rate': (fallbacks / requests) if requests else 0.0
+        }
+    
+    def rewrite_parts(self, parts: Dict[str, str], user_id: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """
+        Rewrite several independent pieces of text concurrently.
         
         Args:
-            text: The text to analyze (can contain title and content separated by newlines)
+            parts: Mapping of part name (e.g. 'title', 'content') to text
+            user_id: Whose text it is, scoping rewrite reuse
             
         Returns:
-            Dictionary with analysis results and suggestions
+            Mapping of the same part names to rewritten text (None on failure)
+        """
+        if not parts:
+            return {}
+        
+        # A single part gains nothing from the pool, so call it inline
+        if len(parts) == 1:
+            name, text = next(iter(parts.items()))
+            return {name: self.rewrite_compassionate(text, user_id)}
+        
+        futures = {
+            # Each in a copy of this context, so its spans and log records join the request's
+            name: self.rewrite_executor.submit(copy_context().run, self.rewrite_compassionate, text, user_id)
+            for name, text in parts.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+    
+    @traced("CompassionateRewriter.match")
+    def _analyze_negative_parts(self, text: str) -> Tuple[dict, str, str, Dict[str, str]]:
+        """
+        Split text into title and content and detect negative words in each.
+        
+        Returns:
+            Tuple of (initial result dict, title, content, parts_to_rewrite)
         """
         # Split text into title and content if it contains newlines
         lines = text.split('\n')
         title = lines[0].strip() if lines else ""
         content = '\n'.join(lines[1:]).strip() if len(lines) > 1 else ""
         
-        # Analyze title and content separately
-        title_contains_negative, title_found_words = self.contains_negative_words(title)
-        content_contains_negative, content_found_words = self.contains_negative_words(content)
+        # Analyze title and content separately; a part only needs rewriting
+        # when its severity score reaches the threshold
+        title_score, title_found_words = self.lexicon.score(title)
+        content_score, content_found_words = self.lexicon.score(content)
+        title_contains_negative = title_score >= self.rewrite_threshold
+        content_contains_negative = content_score >= self.rewrite_threshold
         
         # Combine results
         contains_negative = title_contains_negative or content_contains_negative
@@ -217,42 +667,130 @@ Provide ONLY the rewritten version without any explanations, labels, or addition
         result = {
             'contains_negative_words': contains_negative,
             'found_words': all_found_words,
+            'severity_score': title_score + content_score,
             'suggestion_available': False,
             'rewritten_text': None,
             'error': None
         }
         
+        # Only rewrite parts that contain negative words
+        parts_to_rewrite = {}
         if contains_negative:
-            logger.info(f"Negative words detected: Title={title_found_words}, Content={content_found_words}")
-            
-            # Only rewrite parts that contain negative words
-            final_title = title
-            final_content = content
-            
             if title_contains_negative:
-                # Only send the title for rewriting
-                logger.info(f"Rewriting title only: '{title}'")
-                rewritten_title = self.rewrite_compassionate(title)
-                if rewritten_title:
-                    final_title = rewritten_title
-                    logger.info(f"Title rewritten to: '{final_title}'")
-                else:
-                    result['error'] = "Unable to generate compassionate rewrite for title"
-                    return result
-            
+                parts_to_rewrite['title'] = title
             if content_contains_negative:
-                # Only send the content for rewriting
-                logger.info(f"Rewriting content only: '{content}'")
-                rewritten_content = self.rewrite_compassionate(content)
-                if rewritten_content:
-                    final_content = rewritten_content
-                    logger.info(f"Content rewritten to: '{final_content}'")
-                else:
-                    result['error'] = "Unable to generate compassionate rewrite for content"
-                    return result
+                parts_to_rewrite['content'] = content
+            # Counts only: the words and text are the user's own writing
+            logger.debug("Negative words detected", extra={
+                'title_matches': len(title_found_words),
+                'content_matches': len(content_found_words),
+                'parts_to_rewrite': list(parts_to_rewrite)
+            })
+        
+        return result, title, content, parts_to_rewrite
+    
+    def needs_rewrite(self, text: str) -> bool:
+        """
+        Whether analyze_and_suggest_rewrite would rewrite text: some part
+        scores at or over the rewrite threshold, not merely any match.
+        """
+        result, _, _, _ = self._analyze_negative_parts(text)
+        return result['contains_negative_words']
+    
+    def _apply_rewritten_parts(self, result: dict, title: str, content: str,
+                               rewritten_parts: Dict[str, Optional[str]]) -> dict:
+        """Fill the analysis result from the rewritten title/content"""
+        final_title = title
+        final_content = content
+        
+        if 'title' in rewritten_parts:
+            if rewritten_parts['title']:
+                final_title = rewritten_parts['title']
+            else:
+                result['error'] = "Unable to generate compassionate rewrite for title"
+                return result
+        
+        if 'content' in rewritten_parts:
+            if rewritten_parts['content']:
+                final_content = rewritten_parts['content']
+            else:
+                result['error'] = "Unable to generate compassionate rewrite for content"
+                return result
+        
+        # Combine the results
+        result['suggestion_available'] = True
+        result['rewritten_text'] = f"{final_title}\n\n{final_content}"
+        return result
+    
+    def analyze_and_suggest_rewrite(self, text: str, user_id: Optional[str] = None) -> dict:
+        """
+        Analyze text and provide rewriting suggestions if needed.
+        
+        Args:
+            text: The text to analyze (can contain title and content separated by newlines)
+            user_id: Whose text it is, scoping rewrite reuse
             
-            # Combine the results
-            result['suggestion_available'] = True
-            result['rewritten_text'] = f"{final_title}\n\n{final_content}"
+        Returns:
+            Dictionary with analysis results and suggestions
+        """
+        result, title, content, parts_to_rewrite = self._analyze_negative_parts(text)
+        
+        if result['contains_negative_words']:
+            rewritten_parts = self.rewrite_parts(parts_to_rewrite, user_id)
+            result = self._apply_rewritten_parts(result, title, content, rewritten_parts)
+        
+        return result
+    
+    def stream_analysis(self, text: str, user_id: Optional[str] = None) -> Iterator[Tuple[str, dict]]:
+        """
+        Analyze text and stream the compassionate rewrite as it is generated.
+        
+        Yields (event, data) pairs:
+        - ('analysis', {...}) immediately, with the negative-word detection
+        - ('token', {'part': 'title'|'content', 'text': ...}) as rewrite
+          text arrives; title and content are streamed concurrently
+        - ('reset', {'part': ..., 'error': ...}) if a part's LLM stream failed
+          after sending tokens; the tokens sent for that part so far are
+          incomplete and should be discarded in favour of 'done'
+        - ('done', {...}) with the same dictionary analyze_and_suggest_rewrite
+          returns
+        
+        Args:
+            text: The text to analyze (can contain title and content separated by newlines)
+            user_id: Whose text it is, scoping rewrite reuse
+        """
+        result, title, content, parts_to_rewrite = self._analyze_negative_parts(text)
+        yield 'analysis', {
+            'contains_negative_words': result['contains_negative_words'],
+            'found_words': result['found_words'],
+            'parts': list(parts_to_rewrite)
+        }
+        
+        if not parts_to_rewrite:
+            yield 'done', result
+            return
+        
+        events = queue.Queue()
+        
+        def stream_part(name: str, part_text: str):
+            try:
+                for event in self.stream_compassionate(part_text, user_id):
+                    events.put((name, event))
+            except Exception as e:
+                logger.error(f"Streaming rewrite for {name} failed: {e}")
+                events.put((name, {'type': 'final', 'text': None}))
+        
+        for name, part_text in parts_to_rewrite.items():
+            self.stream_executor.submit(copy_context().run, stream_part, name, part_text)
+        
+        rewritten_parts = {}
+        while len(rewritten_parts) < len(parts_to_rewrite):
+            name, event = events.get()
+            if event['type'] == 'token':
+                yield 'token', {'part': name, 'text': event['text']}
+            else:
+                if event.get('discard_tokens'):
+                    yield 'reset', {'part': name, 'error': event.get('error')}
+                rewritten_parts[name] = event['text']
         
-        return result 
\ No newline at end of file
+        yield 'done', self._apply_rewritten_parts(result, title, content, rewritten_parts)
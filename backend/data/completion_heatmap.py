@@ -0,0 +1,168 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+# Intensity levels shown in the heatmap (0 = no completions)
+HEATMAP_LEVELS = 4
+
+
+class CompletionHeatmap:
+    """
+    Yearly activity heatmaps built from task completion histories.
+    
+    A user's histories are turned, once, into two day-indexed NumPy arrays:
+    completions per day and tasks recorded per day (completed or not). Date
+    strings are parsed in bulk as datetime64 and counted with bincount; the
+    calendar grid, weekly totals and completion rates are then slices and
+    reductions of those arrays. The arrays are cached per user until
+    invalidate() is called for that user, e.g. when a completion changes.
+    """
+    
+    def __init__(self, data_manager, max_cached_users: int = 1000):
+        self.data_manager = data_manager
+        self.max_cached_users = max_cached_users
+        self.cache: "OrderedDict[str, Tuple[np.datetime64, np.ndarray, np.ndarray]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by invalidate() so arrays built from data read before it aren't cached
+        self.invalidations = 0
+    
+    def invalidate(self, user_id: str):
+        """Drop the cached arrays for a user after their completions changed"""
+        with self.lock:
+            self.cache.pop(user_id, None)
+            self.invalidations += 1
+    
+    def _day_counts(self, user_id: str) -> Tuple[np.datetime64, np.ndarray, np.ndarray]:
+        """(first day, completions per day, recorded tasks per day), cached"""
+        with self.lock:
+            cached = self.cache.get(user_id)
+            if cached is not None:
+                self.cache.move_to_end(user_id)
+                self.hits += 1
+                return cached
+            self.misses += 1
+            invalidations = self.invalidations
+        
+        recorded_days: List[str] = []
+        completed_flags: List[bool] = []
+        for task in self.data_manager.load_tasks(user_id):
+            history = task.get('completion_history') or {}
+            recorded_days.extend(history.keys())
+            completed_flags.extend(history.values())
+        
+        days, flags = self._parse_days(recorded_days, completed_flags)
+        if len(days):
+            origin = days.min()
+            offsets = (days - origin).astype(np.int64)
+            recorded = np.bincount(offsets)
+            completed = np.bincount(offsets, weights=flags).astype(np.int64)
+        else:
+            origin = np.datetime64('1970-01-01', 'D')
+            recorded = completed = np.zeros(0, dtype=np.int64)
+        
+        result = (origin, completed, recorded)
+        with self.lock:
+            if invalidations != self.invalidations:
+                return result
+            self.cache[user_id] = result
+            if len(self.cache) > self.max_cached_users:
+                self.cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _parse_days(recorded_days: List[str], completed_flags: List[bool]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Days as datetime64 and their completed flags, skipping malformed
+        dates like the streak rebuild does. The whole list is parsed at once;
+        only if that fails is each day parsed on its own to find the bad ones.
+        """
+        flags = np.array(completed_flags, dtype=bool)
+        try:
+            days = np.array(recorded_days, dtype='datetime64[D]')
+        except ValueError:
+            days = np.full(len(recorded_days), np.datetime64('NaT'), dtype='datetime64[D]')
+            for i, day in enumerate(recorded_days):
+                try:
+                    days[i] = np.datetime64(day, 'D')
+                except (ValueError, TypeError):
+                    pass
+        # Empty strings and "NaT" parse to NaT rather than failing
+        valid = ~np.isnat(days)
+        if not valid.all():
+            days, flags = days[valid], flags[valid]
+        return days, flags
+    
+    @staticmethod
+    def _window(origin: np.datetime64, counts: np.ndarray, start: np.datetime64, length: int) -> np.ndarray:
+        """counts re-indexed to [start, start + length), zero outside the data"""
+        window = np.zeros(length, dtype=np.int64)
+        offset = int((start - origin).astype(np.int64))
+        lo, hi = max(0, offset), min(len(counts), offset + length)
+        if lo < hi:
+            window[lo - offset:hi - offset] = counts[lo:hi]
+        return window
+    
+    def get_year(self, user_id: str, year: int) -> Dict[str, Any]:
+        """
+        Heatmap for one calendar year.
+        
+        Weeks run Monday to Sunday; days of the first and last week that
+        fall outside the year are None.
+        """
+        origin, completed_counts, recorded_counts = self._day_counts(user_id)
+        start = np.datetime64(f"{year:04d}-01-01", 'D')
+        num_days = int((np.datetime64(f"{year + 1:04d}-01-01", 'D') - start).astype(np.int64))
+        
+        completed = self._window(origin, completed_counts, start, num_days)
+        recorded = self._window(origin, recorded_counts, start, num_days)
+        
+        # 1970-01-01 was a Thursday (weekday 3 with Monday = 0)
+        first_weekday = int((start.astype(np.int64) + 3) % 7)
+        num_weeks = -(-(first_weekday + num_days) // 7)
+        grid = np.full(num_weeks * 7, -1, dtype=np.int64)
+        grid[first_weekday:first_weekday + num_days] = completed
+        grid = grid.reshape(num_weeks, 7)
+        recorded_grid = np.zeros(num_weeks * 7, dtype=np.int64)
+        recorded_grid[first_weekday:first_weekday + num_days] = recorded
+        recorded_grid = recorded_grid.reshape(num_weeks, 7)
+        
+        # Intensity levels from the quartiles of the active days
+        levels = np.zeros_like(grid)
+        active = completed[completed > 0]
+        if active.size:
+            thresholds = np.percentile(active, [25, 50, 75])
+            levels = np.where(grid > 0, np.searchsorted(thresholds, grid, side='left') + 1, 0)
+            levels = np.minimum(levels, HEATMAP_LEVELS)
+        
+        weekly_totals = np.where(grid > 0, grid, 0).sum(axis=1)
+        weekly_recorded = recorded_grid.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weekly_rates = np.where(weekly_recorded > 0, weekly_totals / weekly_recorded, np.nan)
+        
+        padding = grid < 0
+        
+        def to_rows(values: np.ndarray) -> List[List[Optional[int]]]:
+            rows = values.astype(object)
+            rows[padding] = None
+            return rows.tolist()
+        
+        total_recorded = int(recorded.sum())
+        return {
+            'year': year,
+            'start_weekday': first_weekday,
+            'weeks': to_rows(grid),
+            'levels': to_rows(levels),
+            'weekly_totals': weekly_totals.tolist(),
+            'weekly_completion_rates': [None if np.isnan(r) else round(float(r), 3) for r in weekly_rates],
+            'total_completions': int(completed.sum()),
+            'active_days': int(np.count_nonzero(completed)),
+            'max_daily_completions': int(completed.max()) if num_days else 0,
+            'completion_rate': round(int(completed.sum()) / total_recorded, 3) if total_recorded else None
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {'cached_users': len(self.cache), 'hits': self.hits, 'misses': self.misses}
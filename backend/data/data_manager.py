@@ -1,7 +1,16 @@
+import fcntl
 import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, date
-from typing import Dict, List, Any
-from .dummy_data import DUMMY_TASKS, DUMMY_POSTS, DUMMY_STREAK, DUMMY_TIPS
+from typing import Callable, Dict, List, Any, Iterator, Optional
+from .dummy_data import DUMMY_TASKS, DUMMY_POSTS, DUMMY_TIPS
+from .storage_stats import StorageStats, instrumented
+
+logger = logging.getLogger(__name__)
 
 class DataManager:
     def __init__(self):
@@ -10,6 +19,16 @@ class DataManager:
         self.comments_file = "database/comments.json"
         self.streak_file = "database/streak.json"
         self.tips_file = "database/tips.json"
+        self.jobs_file = "database/jobs.json"
+        # Serialize read-modify-write cycles on streak.json and jobs.json, with
+        # an fcntl lock on a sidecar file (see _locked) against other workers:
+        # request handlers and the bulk jobs (rollover, rebuild) run on
+        # different threads, and every worker process runs its own rollover
+        self.streak_lock = threading.RLock()
+        self.jobs_lock = threading.RLock()
+        # Lock files held by this process (fcntl locks belong to the process) and how deeply
+        self._held_file_locks: Dict[str, List[int]] = {}
+        self.stats = StorageStats()
         self._ensure_data_directory()
         self._initialize_data_files()
     
@@ -32,10 +51,14 @@ class DataManager:
             self._save_comments([])
         
         if not os.path.exists(self.streak_file):
-            self._save_streak(DUMMY_STREAK)
+            # streak.json maps user IDs to records shaped like DUMMY_STREAK
+            self._save_streak({})
         
         if not os.path.exists(self.tips_file):
             self._save_tips(DUMMY_TIPS)
+        
+        if not os.path.exists(self.jobs_file):
+            self._save_jobs([])
     
     def _serialize_datetime(self, obj):
         """Custom JSON serializer for datetime objects"""
@@ -75,87 +98,203 @@ class DataManager:
                     pass
         return data
     
+    @contextmanager
+    def _locked(self, path: str, thread_lock: threading.RLock):
+        """
+        Hold thread_lock and an exclusive fcntl lock on path + ".lock", so a
+        read-modify-write cycle on path excludes other threads and other
+        worker processes. Re-entrant within the thread holding it.
+        """
+        import os
+        
+        with thread_lock:
+            held = self._held_file_locks.get(path)
+            if held is None:
+                fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                # Closing any descriptor of the file drops the process's lock, so open it once
+                held = self._held_file_locks[path] = [fd, 0]
+            held[1] += 1
+            try:
+                yield
+            finally:
+                held[1] -= 1
+                if not held[1]:
+                    del self._held_file_locks[path]
+                    os.close(held[0])
+    
+    def _read_json(self, path: str) -> Any:
+        """Read and parse a JSON file, counting bytes, parse time and records into self.stats"""
+        with open(path, 'r') as f:
+            text = f.read()
+        start = time.perf_counter()
+        data = json.loads(text)
+        # json.dump escapes non-ASCII, so characters and bytes are the same count
+        self.stats.record_read(len(text), time.perf_counter() - start, len(data))
+        return data
+    
+    def _write_json(self, path: str, data: Any):
+        """Serialize and write a JSON file, counting bytes, dump time and records into self.stats"""
+        start = time.perf_counter()
+        text = json.dumps(data, default=self._serialize_datetime, indent=2)
+        dump_seconds = time.perf_counter() - start
+        with open(path, 'w') as f:
+            f.write(text)
+        self.stats.record_write(len(text), dump_seconds, len(data))
+    
+    @instrumented
     def _save_tasks(self, tasks_data: List[Dict[str, Any]]):
         """Save tasks data to JSON file"""
-        with open(self.tasks_file, 'w') as f:
-            json.dump(tasks_data, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.tasks_file, tasks_data)
     
 
     
+    @instrumented
     def _save_posts(self, posts_data: List[Dict[str, Any]]):
         """Save posts data to JSON file"""
-        with open(self.posts_file, 'w') as f:
-            json.dump(posts_data, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.posts_file, posts_data)
     
+    @instrumented
     def _save_comments(self, comments_data: List[Dict[str, Any]]):
         """Save comments data to JSON file"""
-        with open(self.comments_file, 'w') as f:
-            json.dump(comments_data, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.comments_file, comments_data)
     
+    @instrumented
     def _save_streak(self, streak_data: Dict[str, Any]):
         """Save streak data to JSON file"""
-        with open(self.streak_file, 'w') as f:
-            json.dump(streak_data, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.streak_file, streak_data)
     
+    @instrumented
     def _save_tips(self, tips_data: List[Dict[str, Any]]):
         """Save tips data to JSON file"""
-        with open(self.tips_file, 'w') as f:
-            json.dump(tips_data, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.tips_file, tips_data)
+    
+    @instrumented
+    def _save_jobs(self, jobs_data: List[Dict[str, Any]]):
+        """
+        Save background job data to JSON file
+        Swapped in whole, since other worker processes read it without the lock
+        """
+        import os
+        
+        temp_file = self.jobs_file + ".tmp"
+        self._write_json(temp_file, jobs_data)
+        os.replace(temp_file, self.jobs_file)
     
+    @instrumented
     def load_tasks(self, user_id: str) -> List[Dict[str, Any]]:
         """Load tasks for a specific user from JSON file"""
         try:
-            with open(self.tasks_file, 'r') as f:
-                data = json.load(f)
-                return [self._deserialize_datetime(task) for task in data if task.get('user_id') == user_id]
+            data = self._read_json(self.tasks_file)
+            return [self._deserialize_datetime(task) for task in data if task.get('user_id') == user_id]
         except FileNotFoundError:
             return []
     
-
+    def iter_tasks(self, chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every task (all users) from tasks.json without loading the
+        whole file, decoding one task object at a time from chunked reads.
+        Tasks are yielded as stored, without date conversion.
+        """
+        decoder = json.JSONDecoder()
+        separators = re.compile(r"[\s,]*")
+        try:
+            f = open(self.tasks_file, 'r')
+        except FileNotFoundError:
+            return
+        # Only time spent here reading and decoding counts, not the consumer's
+        bytes_read = records = 0
+        busy = 0.0
+        resumed = time.perf_counter()
+        try:
+            with f:
+                buffer = f.read(chunk_size)
+                bytes_read += len(buffer)
+                buffer = buffer.lstrip()
+                if not buffer.startswith('['):
+                    raise ValueError(f"{self.tasks_file} does not contain a JSON array")
+                position = 1
+                at_eof = False
+                while True:
+                    position = separators.match(buffer, position).end()
+                    if buffer.startswith(']', position):
+                        return
+                    try:
+                        task, position = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        # Object cut off by the chunk boundary; read more
+                        if at_eof:
+                            raise
+                        more = f.read(chunk_size)
+                        bytes_read += len(more)
+                        at_eof = not more
+                        buffer = buffer[position:] + more
+                        position = 0
+                        continue
+                    records += 1
+                    busy += time.perf_counter() - resumed
+                    yield task
+                    resumed = time.perf_counter()
+        finally:
+            busy += time.perf_counter() - resumed
+            self.stats.record_call("iter_tasks", busy, nested=False)
+            self.stats.record_read(bytes_read, busy, records, method="iter_tasks")
     
+    @instrumented
     def load_posts(self) -> List[Dict[str, Any]]:
         """Load posts from JSON file"""
         try:
-            with open(self.posts_file, 'r') as f:
-                data = json.load(f)
-                return [self._deserialize_datetime(post) for post in data]
+            data = self._read_json(self.posts_file)
+            return [self._deserialize_datetime(post) for post in data]
         except FileNotFoundError:
             return DUMMY_POSTS
     
+    @instrumented
     def load_comments(self) -> List[Dict[str, Any]]:
         """Load comments from JSON file"""
         try:
-            with open(self.comments_file, 'r') as f:
-                data = json.load(f)
-                return [self._deserialize_datetime(comment) for comment in data]
+            data = self._read_json(self.comments_file)
+            return [self._deserialize_datetime(comment) for comment in data]
         except FileNotFoundError:
             return []
     
+    @instrumented
     def load_streak(self, user_id: str) -> Dict[str, Any]:
         """Load streak data for a specific user from JSON file"""
         try:
-            with open(self.streak_file, 'r') as f:
-                data = json.load(f)
-                return self._deserialize_datetime(data.get(user_id, {}))
+            data = self._read_json(self.streak_file)
+            return self._deserialize_datetime(data.get(user_id, {}))
         except FileNotFoundError:
             return {}
     
+    @instrumented
     def load_tips(self) -> List[Dict[str, Any]]:
         """Load tips from JSON file"""
         try:
-            with open(self.tips_file, 'r') as f:
-                data = json.load(f)
-                return [self._deserialize_datetime(tip) for tip in data]
+            data = self._read_json(self.tips_file)
+            return [self._deserialize_datetime(tip) for tip in data]
         except FileNotFoundError:
             return DUMMY_TIPS
     
+    @instrumented
+    def load_jobs(self) -> List[Dict[str, Any]]:
+        """Load background jobs from JSON file"""
+        try:
+            return self._read_json(self.jobs_file)
+        except FileNotFoundError:
+            return []
+    
+    @instrumented
     def save_task(self, task_data: Dict[str, Any]):
         """Save a single task to the database (user-specific)"""
         user_id = task_data.get('user_id')
         tasks = []
         try:
-            with open(self.tasks_file, 'r') as f:
-                tasks = json.load(f)
+            tasks = self._read_json(self.tasks_file)
         except FileNotFoundError:
             pass
         # Find and update existing task or add new one
@@ -168,22 +307,21 @@ class DataManager:
                 break
         if not task_found:
             tasks.append(task_data)
-        with open(self.tasks_file, 'w') as f:
-            json.dump(tasks, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.tasks_file, tasks)
     
+    @instrumented
     def delete_task(self, task_id: str, user_id: str):
         """Delete a task for a specific user from the database"""
         try:
-            with open(self.tasks_file, 'r') as f:
-                tasks = json.load(f)
+            tasks = self._read_json(self.tasks_file)
         except FileNotFoundError:
             tasks = []
         tasks = [task for task in tasks if not (task.get('id') == task_id and task.get('user_id') == user_id)]
-        with open(self.tasks_file, 'w') as f:
-            json.dump(tasks, f, default=self._serialize_datetime, indent=2)
+        self._write_json(self.tasks_file, tasks)
     
-
     
+    
+    @instrumented
     def save_post(self, post_data: Dict[str, Any]):
         """Save a single post to the database"""
         posts = self.load_posts()
@@ -203,17 +341,77 @@ class DataManager:
         
         self._save_posts(posts)
     
-    def save_streak(self, user_id: str, streak_data: Dict[str, Any]):
-        """Save streak data for a specific user to the database"""
+    @instrumented
+    def load_all_streaks(self) -> Dict[str, Dict[str, Any]]:
+        """Load streak data for every user in one read"""
+        try:
+            data = self._read_json(self.streak_file)
+        except FileNotFoundError:
+            return {}
+        return {user_id: self._deserialize_datetime(streak_data) for user_id, streak_data in data.items()}
+    
+    def streak_version(self) -> Any:
+        """
+        Changes whenever streak.json is rewritten, by this process or another
+        worker. None if there is no streak store yet.
+        """
+        import os
+        
         try:
-            with open(self.streak_file, 'r') as f:
-                all_streaks = json.load(f)
+            stat = os.stat(self.streak_file)
         except FileNotFoundError:
-            all_streaks = {}
-        all_streaks[user_id] = streak_data
-        with open(self.streak_file, 'w') as f:
-            json.dump(all_streaks, f, default=self._serialize_datetime, indent=2)
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    @instrumented
+    def save_all_streaks(self, all_streaks: Dict[str, Dict[str, Any]]):
+        """
+        Replace streak data for every user in one write.
+        The file is written next to streak.json and swapped in, so readers
+        never see a half-written store.
+        """
+        import os
+        
+        temp_file = self.streak_file + ".tmp"
+        self._write_json(temp_file, all_streaks)
+        os.replace(temp_file, self.streak_file)
+    
+    def update_all_streaks(self, update: Callable[[Dict[str, Dict[str, Any]]], Any]) -> Any:
+        """
+        Read every streak record, let update modify them in place and write
+        them back, with no other streak write in between.
+        
+        Bulk jobs do their slow work on a snapshot and only merge the result
+        in here, so single-user saves made meanwhile aren't overwritten.
+        
+        Returns:
+            Whatever update returns
+        """
+        with self._locked(self.streak_file, self.streak_lock):
+            all_streaks = self.load_all_streaks()
+            result = update(all_streaks)
+            self.save_all_streaks(all_streaks)
+        return result
+    
+    @instrumented
+    def save_streak(self, user_id: str, streak_data: Dict[str, Any]):
+        """
+        Save streak data for a specific user to the database
+        Swapped in whole, since other worker processes read it without the lock
+        """
+        import os
+        
+        with self._locked(self.streak_file, self.streak_lock):
+            try:
+                all_streaks = self._read_json(self.streak_file)
+            except FileNotFoundError:
+                all_streaks = {}
+            all_streaks[user_id] = streak_data
+            temp_file = self.streak_file + ".tmp"
+            self._write_json(temp_file, all_streaks)
+            os.replace(temp_file, self.streak_file)
     
+    @instrumented
     def save_tip(self, tip_data: Dict[str, Any]):
         """Save a single tip to the database"""
         tips = self.load_tips()
@@ -233,11 +431,10 @@ class DataManager:
         
         self._save_tips(tips)
     
+    @instrumented
     def save_comment(self, comment_data: Dict[str, Any]):
         """Save a single comment to JSON file"""
-        print(f"save_comment called with: {comment_data}")
         comments = self.load_comments()
-        print(f"Loaded {len(comments)} existing comments")
         
         # Update existing comment or add new one
         comment_id = comment_data.get('id')
@@ -249,13 +446,56 @@ class DataManager:
                 if comment.get('id') == comment_id:
                     comments[i] = comment_data
                     comment_found = True
-                    print(f"Updated existing comment at index {i}")
                     break
         
         if not comment_found:
             # Add new comment
             comments.append(comment_data)
-            print(f"Added new comment. Total comments now: {len(comments)}")
         
         self._save_comments(comments)
-        print(f"Saved {len(comments)} comments to file") 
\ No newline at end of file
+        logger.debug("Saved comment", extra={'comment_id': comment_id, 'updated': comment_found,
+                                             'total_comments': len(comments)})
+    
+    @instrumented
+    def save_job(self, job_data: Dict[str, Any]):
+        """Save a single background job to JSON file"""
+        with self._locked(self.jobs_file, self.jobs_lock):
+            jobs = self.load_jobs()
+        
+            # Find and update existing job or add new one
+            job_id = job_data.get('id')
+            job_found = False
+        
+            for i, job in enumerate(jobs):
+                if job.get('id') == job_id:
+                    jobs[i] = job_data
+                    job_found = True
+                    break
+        
+            if not job_found:
+                jobs.append(job_data)
+        
+            self._save_jobs(jobs)
+    
+    def update_job(self, job_id: str, update: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+        """
+        Let update modify a stored job in place and save it, with no other
+        job write in between, from this or another worker process.
+        
+        Returns:
+            The saved job, or None if there is no such job or update returned False
+        """
+        with self._locked(self.jobs_file, self.jobs_lock):
+            jobs = self.load_jobs()
+            job = next((job for job in jobs if job.get('id') == job_id), None)
+            if job is None or not update(job):
+                return None
+            self._save_jobs(jobs)
+            return job
+    
+    @instrumented
+    def delete_job(self, job_id: str):
+        """Remove a finished background job from JSON file"""
+        with self._locked(self.jobs_file, self.jobs_lock):
+            jobs = [job for job in self.load_jobs() if job.get('id') != job_id]
+            self._save_jobs(jobs)
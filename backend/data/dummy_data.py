@@ -7,7 +7,7 @@ DUMMY_STREAK = {
     "longest_streak": 0,
     "last_completion_date": None,
     "is_paused": False,
-    "completion_dates": []  # List of dates when tasks were completed
+    "completion_bitmap": {"origin": None, "bits": ""}  # Days when tasks were completed (see CompletionBitmap)
 }
 
 # Dummy Tips Data
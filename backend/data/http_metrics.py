@@ -0,0 +1,168 @@
+import re
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.routing import compile_path
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Labels for requests that matched no route or used an unusual method, so
+# arbitrary client input can't create new series
+UNMATCHED = "unmatched"
+OTHER_METHOD = "other"
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+
+class RouteResolver:
+    """
+    Map a request path to its route template ("/api/tasks/{task_id}"), so
+    metrics are labelled per route rather than per URL.
+    
+    Paths without parameters are a set lookup. The others are compiled
+    into one alternation, tried in route order as the router does, with
+    one capture group per template so the match says which one it was.
+    """
+    
+    def __init__(self, paths: List[str]):
+        self.static = {path for path in paths if "{" not in path}
+        self.templates = [path for path in dict.fromkeys(paths) if "{" in path]
+        alternatives = []
+        for template in self.templates:
+            pattern = compile_path(template)[0].pattern[1:-1]   # drop ^ and $
+            alternatives.append("(" + re.sub(r"\(\?P<\w+>", "(?:", pattern) + ")")
+        self.pattern = re.compile("^(?:" + "|".join(alternatives) + ")$") if alternatives else None
+    
+    def resolve(self, path: str) -> str:
+        if path in self.static:
+            return path
+        match = self.pattern.match(path) if self.pattern else None
+        return self.templates[match.lastindex - 1] if match else UNMATCHED
+
+
+class HttpMetrics:
+    """
+    Request counters, latency histograms and in-flight gauges per route,
+    rendered in the Prometheus text exposition format.
+    
+    Recording is a few dict lookups and a bisect, with no lock: it only
+    happens on the event loop, between awaits. Histogram buckets are
+    stored non-cumulative and summed when rendered.
+    """
+    
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.requests: Dict[Tuple[str, str, int], int] = {}        # (method, route, status) -> count
+        self.latency: Dict[Tuple[str, str], List[float]] = {}      # (method, route) -> bucket counts + [sum, count]
+        self.in_flight: Dict[Tuple[str, str], int] = {}            # (method, route) -> requests in progress
+        self.gauges: List[Tuple[str, str, Callable[[], Optional[float]]]] = []
+    
+    def add_gauge(self, name: str, help_text: str, read: Callable[[], Optional[float]]):
+        """Expose a value read at scrape time (None leaves it out)"""
+        self.gauges.append((name, help_text, read))
+    
+    def started(self, method: str, route: str):
+        key = (method, route)
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+    
+    def finished(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        self.in_flight[key] -= 1
+        request_key = (method, route, status)
+        self.requests[request_key] = self.requests.get(request_key, 0) + 1
+        
+        series = self.latency.get(key)
+        if series is None:
+            # One count per bucket, then +Inf, then sum and count
+            series = self.latency[key] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-2] += seconds
+        series[-1] += 1
+    
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total HTTP requests handled, by route and status code",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency, until the last body chunk is sent",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        bounds = [_number(bound) for bound in self.buckets + (float("inf"),)]
+        for (method, route), series in sorted(self.latency.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {_number(series[-2])}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {series[-1]}")
+        
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests currently being handled",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, route), count in sorted(self.in_flight.items()):
+            lines.append(f'http_requests_in_flight{{method="{method}",route="{_escape(route)}"}} {count}')
+        
+        for name, help_text, read in self.gauges:
+            value = read()
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request into an HttpMetrics.
+    
+    The route is resolved from the app's routes, on the first request, so
+    it is known before the handler runs (for the in-flight gauge) and
+    requests shed by middleware further in still count under their route.
+    """
+    
+    def __init__(self, app, metrics: HttpMetrics):
+        self.app = app
+        self.metrics = metrics
+        self.resolver: Optional[RouteResolver] = None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if self.resolver is None:
+            self.resolver = RouteResolver([route.path for route in scope["app"].routes if hasattr(route, "path")])
+        method = scope["method"] if scope["method"] in METHODS else OTHER_METHOD
+        route = self.resolver.resolve(scope["path"])
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        self.metrics.started(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.finished(method, route, status, time.perf_counter() - start)
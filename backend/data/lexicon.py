@@ -0,0 +1,157 @@
+import json
+import os
+import re
+from typing import Dict, List, Tuple, Iterable, Optional
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "negative_lexicon.json")
+
+VOWELS = "aeiou"
+
+
+def _is_short_cvc(word: str) -> bool:
+    """Short consonant-vowel-consonant words double their last letter (stop -> stopping)"""
+    return (
+        len(word) <= 4 and len(word) >= 3
+        and word[-1] not in VOWELS + "wxy"
+        and word[-2] in VOWELS
+        and word[-3] not in VOWELS
+    )
+
+
+def inflect_verb(verb: str) -> List[str]:
+    """Regular verb forms: base, -s, -ed, -ing"""
+    if verb.endswith(("s", "x", "z", "ch", "sh")):
+        third_person = verb + "es"
+    elif verb.endswith("y") and verb[-2] not in VOWELS:
+        third_person = verb[:-1] + "ies"
+    else:
+        third_person = verb + "s"
+    
+    if verb.endswith("e"):
+        past, gerund = verb + "d", verb[:-1] + "ing"
+    elif verb.endswith("y") and verb[-2] not in VOWELS:
+        past, gerund = verb[:-1] + "ied", verb + "ing"
+    elif _is_short_cvc(verb):
+        past, gerund = verb + verb[-1] + "ed", verb + verb[-1] + "ing"
+    else:
+        past, gerund = verb + "ed", verb + "ing"
+    
+    return [verb, third_person, past, gerund]
+
+
+def inflect_noun(noun: str) -> List[str]:
+    """Singular and regular plural"""
+    if noun.endswith(("s", "x", "z", "ch", "sh")):
+        return [noun, noun + "es"]
+    if noun.endswith("y") and noun[-2] not in VOWELS:
+        return [noun, noun[:-1] + "ies"]
+    return [noun, noun + "s"]
+
+
+def expand_variants(term: str, pos: str) -> List[str]:
+    """
+    Expand a lexicon term into the surface forms to match.
+    
+    Multi-word terms (phrasal verbs like "mess up") inflect their first word.
+    """
+    head, _, rest = term.partition(" ")
+    if pos == "verb":
+        forms = inflect_verb(head)
+    elif pos == "noun":
+        forms = inflect_noun(head)
+    else:
+        forms = [head]
+    return [f"{form} {rest}" if rest else form for form in forms]
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Build a regex that matches exactly the given words, factored as a trie.
+    
+    Shared prefixes are matched once (e.g. "hat(?:e[ds]?|ing)") so the regex
+    engine does far less backtracking than with a flat alternation.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    
+    def to_regex(node: Dict[str, dict]) -> str:
+        optional = "" in node
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            if optional:
+                return f"(?:{body})?" if len(body) > 1 else f"{body}?"
+            return body
+        if all(len(b) == 1 for b in branches):
+            body = "[" + "".join(branches) + "]"
+        else:
+            body = "(?:" + "|".join(branches) + ")"
+        return body + ("?" if optional else "")
+    
+    return to_regex(trie)
+
+
+class Lexicon:
+    """
+    Weighted negative-word lexicon compiled into a single regex automaton.
+    
+    Each term has a part of speech and a severity weight. Terms are expanded
+    into their inflected variants ("hate" -> "hates", "hated", "hating")
+    and every variant is compiled, once, into one trie-shaped pattern. A text
+    is scored by summing the weights of the distinct terms it contains.
+    """
+    
+    def __init__(self, terms: Dict[str, Dict], rewrite_threshold: float = 1.0):
+        self.rewrite_threshold = rewrite_threshold
+        self.weights: Dict[str, float] = {}
+        self.variant_to_term: Dict[str, str] = {}
+        
+        for term, spec in terms.items():
+            term = term.lower()
+            self.weights[term] = float(spec.get("weight", 1.0))
+            variants = expand_variants(term, spec.get("pos", "adj")) + list(spec.get("variants", []))
+            for variant in variants:
+                self.variant_to_term.setdefault(variant.lower(), term)
+        
+        self.pattern = re.compile(r"\b(" + _trie_regex(self.variant_to_term) + r")\b")
+    
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "Lexicon":
+        """Load and compile a lexicon from a JSON data file"""
+        with open(path or DEFAULT_LEXICON_PATH, 'r') as f:
+            data = json.load(f)
+        return cls(data["terms"], data.get("rewrite_threshold", 1.0))
+    
+    @property
+    def terms(self) -> List[str]:
+        return list(self.weights)
+    
+    @property
+    def surface_forms(self) -> List[str]:
+        return list(self.variant_to_term)
+    
+    def find_terms(self, text_lower: str) -> List[str]:
+        """Distinct terms found in already-lowercased text, in order of appearance"""
+        return list(dict.fromkeys(
+            self.variant_to_term[match] for match in self.pattern.findall(text_lower)
+        ))
+    
+    def score_terms(self, terms: Iterable[str]) -> float:
+        """Severity score for a set of found terms"""
+        return sum(self.weights[term] for term in terms)
+    
+    def score(self, text: str) -> Tuple[float, List[str]]:
+        """
+        Score text by the severity of the negative terms it contains.
+        
+        Returns:
+            Tuple of (score, list_of_found_terms)
+        """
+        found_terms = self.find_terms(text.lower()) if text else []
+        return self.score_terms(found_terms), found_terms
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Moderation states stored on tips, posts and comments
+PENDING_REWRITE = "pending_rewrite"
+# Job state while a worker process owns it
+RUNNING = "running"
+REWRITTEN = "rewritten"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+
+class ModerationQueue:
+    """
+    Background pipeline for compassionate rewriting of user content.
+    
+    Content is saved right away with a "pending_rewrite" moderation status
+    and a job is recorded in the jobs store. Worker tasks take job ids from
+    a bounded in-memory queue, run the (blocking) rewriter in a thread and
+    write the result back to the stored item. Jobs that don't fit in the
+    queue stay in the store and are picked up as workers free up, and all
+    unfinished jobs are re-queued on startup so nothing is lost on restart.
+    
+    Every worker process runs its own queue over the shared jobs store, so
+    a job is claimed (status "running" plus the owning pid, written under
+    the store's file lock) before it is processed. Running jobs whose owner
+    has exited are claimable again.
+    
+    Supported job kinds are 'tip', 'post' and 'comment'; other kinds can be
+    added with register_handler.
+    """
+    
+    def __init__(self, data_manager, rewriter, max_size: int = 100,
+                 num_workers: int = 2, max_retries: int = 3, retry_delay: float = 2.0):
+        self.data_manager = data_manager
+        self.rewriter = rewriter
+        self.max_size = max_size
+        self.num_workers = num_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers = []
+        self.queued_ids = set()
+        self.retry_scheduled = set()
+        self.handlers: Dict[str, Callable[[str, Dict[str, Any]], None]] = {
+            'tip': self._apply_to_tip,
+            'post': self._apply_to_post,
+            'comment': self._apply_to_comment,
+        }
+        
+        # Counters for observability
+        self.completed_jobs = 0
+        self.failed_jobs = 0
+        self.retried_jobs = 0
+        self.job_latencies = deque(maxlen=500)
+    
+    def register_handler(self, kind: str, handler: Callable[[str, Dict[str, Any]], None]):
+        """Register how a finished analysis is written back for a job kind"""
+        self.handlers[kind] = handler
+    
+    async def start(self):
+        """Start the worker tasks and re-queue jobs left over from a previous run"""
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self.queued_ids = set()
+        
+        for job in self.data_manager.load_jobs():
+            if self._claimable(job):
+                self._try_enqueue(job['id'])
+        
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+    
+    async def stop(self):
+        """Stop the worker tasks; unfinished jobs stay in the store"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+    
+    def submit(self, kind: str, target_id: str, text: str) -> Dict[str, Any]:
+        """
+        Record a rewrite job for a stored item and queue it for the workers.
+        
+        Args:
+            kind: Job kind ('tip', 'post' or 'comment')
+            target_id: ID of the stored item to update
+            text: Text to analyze (title and content separated by a newline for posts)
+        
+        Returns:
+            The persisted job record
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown moderation job kind: {kind}")
+        
+        job = {
+            'id': str(uuid.uuid4()),
+            'kind': kind,
+            'target_id': target_id,
+            'text': text,
+            'status': PENDING_REWRITE,
+            'attempts': 0,
+            'error': None,
+            'created_at': datetime.now().isoformat(),
+            'enqueued_at': time.time()
+        }
+        self.data_manager.save_job(job)
+        self._try_enqueue(job['id'])
+        return job
+    
+    @staticmethod
+    def _owner_alive(pid: Optional[int]) -> bool:
+        if pid is None:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    
+    def _claimable(self, job: Dict[str, Any]) -> bool:
+        """Pending, or running in this process or in one that has exited"""
+        if job.get('status') == PENDING_REWRITE:
+            return True
+        return job.get('status') == RUNNING and (job.get('owner_pid') == os.getpid()
+                                                 or not self._owner_alive(job.get('owner_pid')))
+    
+    def _claim(self, job: Dict[str, Any]) -> bool:
+        """Called under the jobs lock; marks the job as owned by this process"""
+        if not self._claimable(job):
+            return False
+        job['status'] = RUNNING
+        job['owner_pid'] = os.getpid()
+        return True
+    
+    def _try_enqueue(self, job_id: str) -> bool:
+        if self.queue is None or job_id in self.queued_ids:
+            return False
+        try:
+            self.queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            # Stays pending in the store; _refill picks it up later
+            return False
+        self.queued_ids.add(job_id)
+        return True
+    
+    def _retry(self, job_id: str):
+        self.retry_scheduled.discard(job_id)
+        self._try_enqueue(job_id)
+    
+    def _refill(self):
+        """Queue stored pending jobs that didn't fit in the queue earlier"""
+        if self.queue.full():
+            return
+        for job in self.data_manager.load_jobs():
+            if not self._claimable(job) or job['id'] in self.retry_scheduled:
+                continue
+            if job['id'] not in self.queued_ids:
+                if not self._try_enqueue(job['id']):
+                    break
+    
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error(f"Moderation job {job_id} crashed: {e}")
+            finally:
+                self.queued_ids.discard(job_id)
+                self.queue.task_done()
+                self._refill()
+    
+    async def _process(self, job_id: str):
+        # None if another worker process got to it first
+        job = self.data_manager.update_job(job_id, self._claim)
+        if not job:
+            return
+        
+        job['attempts'] += 1
+        try:
+            analysis = await asyncio.to_thread(self.rewriter.analyze_and_suggest_rewrite, job['text'])
+            if analysis.get('error'):
+                raise RuntimeError(analysis['error'])
+            self.handlers[job['kind']](job['target_id'], analysis)
+        except Exception as e:
+            job['error'] = str(e)
+            if job['attempts'] < self.max_retries:
+                logger.warning(f"Moderation job {job_id} failed (attempt {job['attempts']}), retrying: {e}")
+                self.retried_jobs += 1
+                self.data_manager.save_job(job)
+                self.retry_scheduled.add(job_id)
+                asyncio.get_running_loop().call_later(
+                    self.retry_delay * job['attempts'], self._retry, job_id
+                )
+                return
+            
+            logger.error(f"Moderation job {job_id} failed permanently: {e}")
+            job['status'] = FAILED
+            self.failed_jobs += 1
+            self.data_manager.save_job(job)
+            self.handlers[job['kind']](job['target_id'], None)
+            return
+        
+        self.completed_jobs += 1
+        self.job_latencies.append(time.time() - job['enqueued_at'])
+        self.data_manager.delete_job(job_id)
+    
+    def _moderated_fields(self, analysis: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if analysis is None:
+            return {'moderation_status': FAILED}
+        if analysis.get('suggestion_available') and analysis.get('rewritten_text'):
+            return {'moderation_status': REWRITTEN, 'rewritten_text': analysis['rewritten_text']}
+        return {'moderation_status': UNCHANGED}
+    
+    def _apply_to_tip(self, tip_id: str, analysis: Optional[Dict[str, Any]]):
+        tip = next((t for t in self.data_manager.load_tips() if t.get('id') == tip_id), None)
+        if not tip:
+            return
+        fields = self._moderated_fields(analysis)
+        if 'rewritten_text' in fields:
+            tip['content'] = fields['rewritten_text'].strip()
+        tip['moderation_status'] = fields['moderation_status']
+        self.data_manager.save_tip(tip)
+    
+    def _apply_to_post(self, post_id: str, analysis: Optional[Dict[str, Any]]):
+        post = next((p for p in self.data_manager.load_posts() if p.get('id') == post_id), None)
+        if not post:
+            return
+        fields = self._moderated_fields(analysis)
+        if 'rewritten_text' in fields:
+            # Rewritten text comes back as "title\n\ncontent"
+            title, _, content = fields['rewritten_text'].partition('\n\n')
+            post['title'] = title
+            post['content'] = content or post['content']
+        post['moderation_status'] = fields['moderation_status']
+        self.data_manager.save_post(post)
+    
+    def _apply_to_comment(self, comment_id: str, analysis: Optional[Dict[str, Any]]):
+        comment = next((c for c in self.data_manager.load_comments() if c.get('id') == comment_id), None)
+        if not comment:
+            return
+        fields = self._moderated_fields(analysis)
+        if 'rewritten_text' in fields:
+            comment['content'] = fields['rewritten_text'].strip()
+        comment['moderation_status'] = fields['moderation_status']
+        self.data_manager.save_comment(comment)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, job counters and job latency percentiles"""
+        stored_jobs = self.data_manager.load_jobs()
+        latencies = sorted(self.job_latencies)
+        
+        def percentile(pct: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * pct))]
+        
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'max_queue_size': self.max_size,
+            'pending_jobs': sum(1 for j in stored_jobs if j.get('status') == PENDING_REWRITE),
+            'running_jobs': sum(1 for j in stored_jobs if j.get('status') == RUNNING),
+            'failed_jobs_stored': sum(1 for j in stored_jobs if j.get('status') == FAILED),
+            'workers': len(self.workers),
+            'completed_jobs': self.completed_jobs,
+            'failed_jobs': self.failed_jobs,
+            'retried_jobs': self.retried_jobs,
+            'job_latency_p50_seconds': percentile(0.5),
+            'job_latency_p95_seconds': percentile(0.95)
+        }
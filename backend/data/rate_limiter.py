@@ -0,0 +1,297 @@
+import fcntl
+import functools
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Any, Tuple
+
+
+class RateLimiter:
+    """
+    Sliding-window-counter rate limiter with constant memory per key.
+    
+    Time is split into fixed windows of window_seconds. For each key only two
+    counts are kept: requests in the current window and in the previous one.
+    The number of requests in the last window_seconds is estimated by
+    weighting the previous window's count by how much of it still overlaps
+    the sliding window:
+    
+        estimate = previous * (1 - elapsed_fraction) + current
+    
+    Counts live in two dicts, one per window. When a new window starts the
+    current dict becomes the previous one and the old previous dict is
+    dropped whole, so keys idle for two windows (whose estimate is zero
+    anyway) are evicted without scanning them.
+    """
+    
+    def __init__(self, max_requests: int = 10, window_seconds: int = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.window = int(clock() // window_seconds)
+        self.current: Dict[str, int] = {}   # key -> requests in this window
+        self.previous: Dict[str, int] = {}  # key -> requests in the previous window
+    
+    def _roll(self, window: int):
+        """Advance to the given window, evicting keys not seen in the last two"""
+        if window == self.window:
+            return
+        if window == self.window + 1:
+            self.previous, self.current = self.current, {}
+        else:
+            self.previous, self.current = {}, {}
+        self.window = window
+    
+    def _estimate(self, key: str, offset: float) -> float:
+        return self.previous.get(key, 0) * (1 - offset / self.window_seconds) + self.current.get(key, 0)
+    
+    def check(self, key: str, cost: int = 1) -> Dict[str, Any]:
+        """
+        Count a request for key if it is within the limit.
+        
+        Returns:
+            Dict with allowed, limit, remaining, reset_seconds and
+            retry_after_seconds (0 when allowed)
+        """
+        window, offset = divmod(self.clock(), self.window_seconds)
+        
+        with self.lock:
+            self._roll(int(window))
+            estimate = self._estimate(key, offset)
+            allowed = estimate + cost <= self.max_requests
+            if allowed:
+                self.current[key] = self.current.get(key, 0) + cost
+                estimate += cost
+            current, previous = self.current.get(key, 0), self.previous.get(key, 0)
+        
+        return self._result(allowed, estimate, current, previous, offset, cost)
+    
+    def _result(self, allowed: bool, estimate: float, current: int, previous: int,
+                offset: float, cost: int) -> Dict[str, Any]:
+        return {
+            'allowed': allowed,
+            'limit': self.max_requests,
+            'remaining': max(0, math.floor(self.max_requests - estimate)),
+            'reset_seconds': math.ceil(self.window_seconds - offset),
+            'retry_after_seconds': 0 if allowed else self._retry_after(current, previous, offset, cost)
+        }
+    
+    def _retry_after(self, current: int, previous: int, offset: float, cost: int) -> int:
+        """Seconds until a request of this cost would fit under the limit"""
+        budget = self.max_requests - cost
+        if current <= budget and previous > 0:
+            # Wait for the previous window's weight to decay within this window
+            fraction = 1 - (budget - current) / previous
+            return max(1, math.ceil(fraction * self.window_seconds - offset))
+        # Wait into the next window, where this window's count becomes "previous"
+        fraction = max(0.0, 1 - budget / current) if current else 0.0
+        return max(1, math.ceil(self.window_seconds - offset + fraction * self.window_seconds))
+    
+    def is_allowed(self, user_id: str) -> bool:
+        """Check if user is allowed to make a request (and count it)"""
+        return self.check(user_id)['allowed']
+    
+    def get_remaining_requests(self, user_id: str) -> int:
+        """Get remaining requests for a user without counting one"""
+        window, offset = divmod(self.clock(), self.window_seconds)
+        with self.lock:
+            self._roll(int(window))
+            estimate = self._estimate(user_id, offset)
+        return max(0, math.floor(self.max_requests - estimate))
+    
+    def evict_idle(self):
+        """Drop keys idle for two windows now rather than on the next request"""
+        with self.lock:
+            self._roll(int(self.clock() // self.window_seconds))
+    
+    @staticmethod
+    def headers(result: Dict[str, Any]) -> Dict[str, str]:
+        """RateLimit-* (and Retry-After when limited) response headers for a check() result"""
+        headers = {
+            'RateLimit-Limit': str(result['limit']),
+            'RateLimit-Remaining': str(result['remaining']),
+            'RateLimit-Reset': str(result['retry_after_seconds'] or result['reset_seconds'])
+        }
+        if not result['allowed']:
+            headers['Retry-After'] = str(result['retry_after_seconds'])
+        return headers
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'keys_current_window': len(self.current),
+            'keys_previous_window': len(self.previous),
+            'max_requests': self.max_requests,
+            'window_seconds': self.window_seconds
+        }
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Sliding-window-counter rate limiter shared by all processes on a host.
+    
+    Same algorithm and interface as RateLimiter, but the counts live in a
+    memory-mapped file, so every uvicorn worker opening the same path
+    enforces one global limit instead of one limit each.
+    
+    The file is a fixed-size open-addressing hash table. Each slot holds a
+    64-bit hash of the key, the window it was last written in and the
+    current/previous counts; a slot is rolled forward lazily when its key
+    is next checked. Slots whose window is two or more behind are free for
+    reuse, so idle keys are evicted without any scan and the file never
+    grows. A check is a hash, a few struct reads/writes on the mapping and
+    an exclusive fcntl lock around them, a few microseconds in all.
+    lockf locks belong to the process, so an instance inherited through
+    fork still excludes its parent, but they also mean a process should
+    open a given path once: two instances in one process don't exclude
+    each other.
+    
+    The clock must be shared by all processes, hence time.time by default.
+    """
+    
+    MAGIC = b"RLSW0001"
+    HEADER = struct.Struct("<8sQQ")   # magic, num_slots, window_seconds
+    SLOT = struct.Struct("<QqII")     # key hash (0 = empty), window, current, previous
+    MAX_PROBES = 32
+    
+    def __init__(self, path: str, max_requests: int = 10, window_seconds: int = 60,
+                 num_slots: int = 1 << 18, clock: Callable[[], float] = time.time):
+        if num_slots & (num_slots - 1):
+            raise ValueError("num_slots must be a power of two")
+        super().__init__(max_requests=max_requests, window_seconds=window_seconds, clock=clock)
+        self.path = path
+        self.num_slots = num_slots
+        self.size = self.HEADER.size + num_slots * self.SLOT.size
+        # Live keys overwritten because every slot in their probe range was in use
+        self.overflows = 0
+        
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self.fd).st_size == 0:
+                    os.ftruncate(self.fd, self.size)
+                    os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, num_slots, window_seconds), 0)
+                magic, file_slots, file_window = self.HEADER.unpack(os.pread(self.fd, self.HEADER.size, 0))
+                if (magic, file_slots, file_window) != (self.MAGIC, num_slots, window_seconds):
+                    raise ValueError(
+                        f"{path} holds a rate limit table with {file_slots} slots and "
+                        f"{file_window}s windows, expected {num_slots} and {window_seconds}s"
+                    )
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+            self.map = mmap.mmap(self.fd, self.size)
+        except BaseException:
+            os.close(self.fd)
+            raise
+    
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _hash(key: str) -> int:
+        # Must agree across processes, so not the (randomized) built-in hash()
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return digest or 1
+    
+    def _find(self, key_hash: int, window: int) -> Tuple[int, int, int]:
+        """
+        Slot position for key_hash and its (current, previous) counts as of
+        window. Caller holds the locks.
+        """
+        unpack_from = self.SLOT.unpack_from
+        index = key_hash & (self.num_slots - 1)
+        free = oldest = None
+        oldest_window = None
+        for _ in range(self.MAX_PROBES):
+            position = self.HEADER.size + index * self.SLOT.size
+            slot_hash, slot_window, current, previous = unpack_from(self.map, position)
+            if slot_hash == key_hash:
+                if slot_window == window:
+                    return position, current, previous
+                if slot_window == window - 1:
+                    return position, 0, current
+                return position, 0, 0
+            if slot_hash == 0 or not window - 1 <= slot_window <= window:
+                # Empty or idle for two windows; keep probing in case the key is further on
+                if free is None:
+                    free = position
+                if slot_hash == 0:
+                    break
+            elif oldest_window is None or slot_window < oldest_window:
+                oldest, oldest_window = position, slot_window
+            index = (index + 1) & (self.num_slots - 1)
+        
+        if free is None:
+            # Table is full around this key: overwrite the least recently used slot
+            self.overflows += 1
+            free = oldest
+        return free, 0, 0
+    
+    def check(self, key: str, cost: int = 1) -> Dict[str, Any]:
+        """
+        Count a request for key if it is within the limit.
+        
+        Returns:
+            Same dict as RateLimiter.check
+        """
+        key_hash = self._hash(key)
+        window, offset = divmod(self.clock(), self.window_seconds)
+        window = int(window)
+        
+        # The thread lock excludes other threads, the fcntl lock other processes
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                position, current, previous = self._find(key_hash, window)
+                estimate = previous * (1 - offset / self.window_seconds) + current
+                allowed = estimate + cost <= self.max_requests
+                if allowed:
+                    current += cost
+                    estimate += cost
+                if allowed or current or previous:
+                    self.SLOT.pack_into(self.map, position, key_hash, window, current, previous)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        
+        return self._result(allowed, estimate, current, previous, offset, cost)
+    
+    def get_remaining_requests(self, user_id: str) -> int:
+        """Get remaining requests for a user without counting one"""
+        key_hash = self._hash(user_id)
+        window, offset = divmod(self.clock(), self.window_seconds)
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX)
+            try:
+                _, current, previous = self._find(key_hash, int(window))
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        estimate = previous * (1 - offset / self.window_seconds) + current
+        return max(0, math.floor(self.max_requests - estimate))
+    
+    def evict_idle(self):
+        """Nothing to do: slots idle for two windows are reused in place"""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        window = int(self.clock() // self.window_seconds)
+        # Unlocked read: the count is a snapshot and may be off by in-flight checks
+        live = 0
+        for slot_hash, slot_window, _, _ in self.SLOT.iter_unpack(self.map[self.HEADER.size:]):
+            if slot_hash and window - 1 <= slot_window <= window:
+                live += 1
+        return {
+            'path': self.path,
+            'num_slots': self.num_slots,
+            'live_keys': live,
+            'overflows': self.overflows,
+            'max_requests': self.max_requests,
+            'window_seconds': self.window_seconds
+        }
+
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextvars import copy_context
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, TypeVar
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    """
+    Hedge slow upstream calls by racing a second identical request.
+    
+    The primary call is started immediately. If it hasn't returned by the
+    hedge deadline (the recent p95 latency times deadline_factor, so normal
+    jitter around the p95 doesn't trigger hedges), a backup call is fired and
+    whichever answers first wins. Hedges are capped to a fraction of all
+    calls so a slow upstream is not hit with twice the traffic.
+    """
+    
+    def __init__(self, max_workers: int = 8, hedge_budget: float = 0.1,
+                 min_samples: int = 20, default_deadline: float = 2.0,
+                 window_size: int = 200, deadline_factor: float = 1.5):
+        self.hedge_budget = hedge_budget
+        self.deadline_factor = deadline_factor
+        self.min_samples = min_samples
+        self.default_deadline = default_deadline
+        self.latencies = deque(maxlen=window_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        
+        self.total_calls = 0
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+    
+    def record_latency(self, seconds: float):
+        """Add an observed upstream latency to the rolling window"""
+        with self._lock:
+            self.latencies.append(seconds)
+    
+    def hedge_deadline(self) -> float:
+        """Seconds to wait for the primary call before firing a hedge"""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return self.default_deadline
+            ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return p95 * self.deadline_factor
+    
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = fn()
+        self.record_latency(time.perf_counter() - start)
+        return result
+    
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self.hedged_calls + 1 > self.hedge_budget * self.total_calls:
+                return False
+            self.hedged_calls += 1
+            return True
+    
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Run fn, hedging it with a second call if it is slower than usual.
+        
+        Returns the first successful result; raises the last error if
+        every attempt failed.
+        """
+        with self._lock:
+            self.total_calls += 1
+        
+        # Each attempt runs in its own copy of the caller's context (a context
+        # can't be entered by two threads at once), keeping its trace spans
+        primary = self.executor.submit(copy_context().run, self._timed, fn)
+        done, _ = wait([primary], timeout=self.hedge_deadline())
+        if done or not self._take_hedge_token():
+            return primary.result()
+        
+        hedge = self.executor.submit(copy_context().run, self._timed, fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging counters and the current hedge deadline"""
+        deadline = self.hedge_deadline()
+        with self._lock:
+            return {
+                'total_calls': self.total_calls,
+                'hedged_calls': self.hedged_calls,
+                'hedge_wins': self.hedge_wins,
+                'hedge_budget': self.hedge_budget,
+                'hedge_deadline_seconds': deadline
+            }
@@ -0,0 +1,215 @@
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from .structured_logging import request_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_TOKEN_PARAM = "profile_token"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Profile IDs are file names; anything else (e.g. "../x") is never served
+_PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{1,32}$")
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile capture of single requests, stored as .prof files.
+    
+    A request is profiled when it carries the admin token (X-Profile-Token
+    header or profile_token query parameter) or, with sample_rate > 0, at
+    random. Files are in the standard pstats format, readable with
+    `python -m pstats`, snakeviz or gprof2dot; the newest max_profiles are
+    kept.
+    
+    cProfile follows one thread, so a profile covers the work the request
+    does on the event loop (the handler, DataManager, StreakManager, the
+    rewriter's regex matching) and shows time spent waiting on rewriter
+    worker threads (LLM calls) as waits. Only one request is profiled at a
+    time, and other requests interleaved on the loop meanwhile appear in
+    its profile too, so profile under low load for a clean picture.
+    """
+    
+    def __init__(self, directory: str, token: Optional[str] = None, sample_rate: float = 0.0,
+                 max_profiles: int = 50, skip_prefixes: Tuple[str, ...] = (),
+                 rng: Optional[random.Random] = None):
+        self.directory = directory
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        # e.g. the profile download routes, whose requests carry the token too
+        self.skip_prefixes = tuple(skip_prefixes)
+        self.random = (rng or random.Random()).random
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.active = False
+        self.requested = 0
+        self.sampled = 0
+        self.skipped_busy = 0
+        
+        os.makedirs(directory, exist_ok=True)
+        # Profiles from earlier runs, oldest first, without their request details
+        for name in sorted(os.listdir(directory)):
+            profile_id, extension = os.path.splitext(name)
+            if extension == ".prof" and _PROFILE_ID.match(profile_id):
+                path = os.path.join(directory, name)
+                self.profiles[profile_id] = {'id': profile_id, 'created': os.path.getmtime(path),
+                                             'bytes': os.path.getsize(path)}
+        self._prune()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None or self.sample_rate > 0
+    
+    def authorized(self, token: Optional[str]) -> bool:
+        return self.token is not None and token is not None and hmac.compare_digest(token, self.token)
+    
+    def should_profile(self, scope: Dict[str, Any]) -> Optional[str]:
+        """The reason to profile this request ("requested" or "sampled"), or None"""
+        if self.skip_prefixes and scope["path"].startswith(self.skip_prefixes):
+            return None
+        if self.token is not None:
+            token = next((value.decode("latin-1") for name, value in scope.get("headers", [])
+                          if name == PROFILE_TOKEN_HEADER), None)
+            query_string = scope.get("query_string", b"")
+            if token is None and PROFILE_TOKEN_PARAM.encode() in query_string:
+                token = dict(parse_qsl(query_string.decode("latin-1"))).get(PROFILE_TOKEN_PARAM)
+            if self.authorized(token):
+                return "requested"
+        if self.sample_rate > 0 and self.random() < self.sample_rate:
+            return "sampled"
+        return None
+    
+    def start(self, trigger: str) -> Optional[cProfile.Profile]:
+        """A running profiler for this request, or None if another request holds it"""
+        with self.lock:
+            if self.active:
+                self.skipped_busy += 1
+                return None
+            self.active = True
+            if trigger == "requested":
+                self.requested += 1
+            else:
+                self.sampled += 1
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+    
+    def new_profile_id(self) -> str:
+        suffix = (request_id.get() or uuid.uuid4().hex)[:32]
+        if not re.fullmatch(r"[0-9a-f]+", suffix):
+            suffix = uuid.uuid4().hex
+        return f"{int(time.time() * 1000)}-{suffix}"
+    
+    def finish(self, profile: cProfile.Profile, profile_id: str, method: str, path: str,
+               status: int, seconds: float, trigger: str):
+        """Stop the profiler and store what it captured"""
+        profile.disable()
+        try:
+            file_path = self.path_for(profile_id)
+            profile.dump_stats(file_path)
+            entry = {
+                'id': profile_id,
+                'created': time.time(),
+                'bytes': os.path.getsize(file_path),
+                'method': method,
+                'path': path,
+                'status': status,
+                'seconds': round(seconds, 6),
+                'trigger': trigger
+            }
+            with self.lock:
+                self.profiles[profile_id] = entry
+                self._prune()
+            logger.info("Request profiled", extra=entry)
+        except OSError as e:
+            logger.error(f"Could not store profile {profile_id}: {e}")
+        finally:
+            with self.lock:
+                self.active = False
+    
+    def _prune(self):
+        while len(self.profiles) > self.max_profiles:
+            profile_id, _ = self.profiles.popitem(last=False)
+            try:
+                os.remove(self.path_for(profile_id))
+            except FileNotFoundError:
+                pass
+    
+    def path_for(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.prof")
+    
+    def get_profile_path(self, profile_id: str) -> Optional[str]:
+        with self.lock:
+            known = profile_id in self.profiles
+        return self.path_for(profile_id) if known and _PROFILE_ID.match(profile_id) else None
+    
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first"""
+        with self.lock:
+            return list(reversed(self.profiles.values()))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'sample_rate': self.sample_rate,
+                'requested': self.requested,
+                'sampled': self.sampled,
+                'skipped_busy': self.skipped_busy,
+                'stored': len(self.profiles),
+                'max_profiles': self.max_profiles
+            }
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware running RequestProfiler over the requests it selects.
+    
+    The response of a profiled request carries X-Profile-Id, the ID to
+    download the profile with. Only install it when the profiler is
+    enabled; without it requests pay nothing at all.
+    """
+    
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self.profiler.should_profile(scope)
+        profile = self.profiler.start(trigger) if trigger else None
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile_id = self.profiler.new_profile_id()
+        status = 500
+        
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (PROFILE_ID_HEADER, profile_id.encode("latin-1"))]}
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            self.profiler.finish(profile, profile_id, scope["method"], scope["path"], status,
+                                 time.perf_counter() - start, trigger)
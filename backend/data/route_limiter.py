@@ -0,0 +1,228 @@
+import json
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.responses import JSONResponse
+from starlette.routing import compile_path
+
+from .rate_limiter import RateLimiter
+
+# Route-wide concurrency caps shed with 503, everything keyed to a client with 429
+OVERLOADED = 503
+TOO_MANY_REQUESTS = 429
+
+
+def client_key(scope: Dict[str, Any]) -> str:
+    """
+    Key a request by its user_id query parameter, else by client address.
+    
+    Behind a proxy, run uvicorn with --proxy-headers so the client address
+    is the caller's rather than the proxy's.
+    """
+    for name, value in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+        if name == "user_id" and value:
+            return f"user:{value}"
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:unknown"
+
+
+def body_user_key(body: bytes) -> Optional[str]:
+    """Key from the user_id field of a JSON request body, if it has one"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    user_id = data.get("user_id") if isinstance(data, dict) else None
+    return f"user:{user_id}" if isinstance(user_id, str) and user_id else None
+
+
+async def read_body(receive) -> Tuple[bytes, List[Dict[str, Any]]]:
+    """Read the whole request body, returning it and the messages to replay"""
+    messages = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request" or not message.get("more_body", False):
+            break
+    return b"".join(message.get("body", b"") for message in messages), messages
+
+
+class RouteLimit:
+    """
+    Limits for one method and path pattern (FastAPI syntax, e.g.
+    "/api/posts/{post_id}/comments").
+    
+    - max_requests per window_seconds: per-key sliding-window rate limit
+    - max_in_flight: requests the route may be handling at once, all keys
+    - max_in_flight_per_key: requests one key may have in flight at once
+    
+    Any of them may be None to leave that dimension unlimited. A streaming
+    response stays in flight until its last chunk is sent. All counts are
+    per process, except the rate when a SharedRateLimiter is passed as
+    limiter (max_requests is then ignored).
+    
+    With key_from_body, the user_id field of a JSON body is the key (the
+    analyze routes take user_id in the body, not the query string); the
+    body is read before admission and replayed to the app.
+    """
+    
+    def __init__(self, method: str, path: str, max_requests: Optional[int] = None,
+                 window_seconds: int = 60, max_in_flight: Optional[int] = None,
+                 max_in_flight_per_key: Optional[int] = None,
+                 key: Callable[[Dict[str, Any]], str] = client_key,
+                 limiter: Optional[RateLimiter] = None, key_from_body: bool = False):
+        self.method = method.upper()
+        self.path = path
+        self.regex = compile_path(path)[0]
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_key = max_in_flight_per_key
+        self.key = key
+        self.key_from_body = key_from_body
+        if limiter is None and max_requests is not None:
+            limiter = RateLimiter(max_requests=max_requests, window_seconds=window_seconds)
+        self.limiter = limiter
+        
+        self.in_flight = 0
+        self.in_flight_by_key: Dict[str, int] = {}
+        self.admitted = 0
+        self.shed_rate = 0
+        self.shed_in_flight = 0
+    
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+    
+    def acquire(self, key: str) -> Tuple[Optional[JSONResponse], Dict[str, str]]:
+        """
+        Admit a request for key or build the response that sheds it.
+        
+        Returns (rejection or None, RateLimit-* headers for the response).
+        Concurrency is checked first so a shed request doesn't use up rate.
+        """
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            self.shed_in_flight += 1
+            return self._reject(OVERLOADED, "Server busy",
+                                "Too many requests in progress. Please try again shortly.", 1, {}), {}
+        key_in_flight = self.in_flight_by_key.get(key, 0)
+        if self.max_in_flight_per_key is not None and key_in_flight >= self.max_in_flight_per_key:
+            self.shed_in_flight += 1
+            return self._reject(TOO_MANY_REQUESTS, "Too many concurrent requests",
+                                "Please wait for your earlier requests to finish.", 1, {}), {}
+        
+        headers: Dict[str, str] = {}
+        if self.limiter is not None:
+            result = self.limiter.check(key)
+            headers = RateLimiter.headers(result)
+            if not result['allowed']:
+                self.shed_rate += 1
+                retry_after = result['retry_after_seconds']
+                return self._reject(TOO_MANY_REQUESTS, "Rate limit exceeded",
+                                    f"Too many requests. Please wait {retry_after} seconds before trying again.",
+                                    retry_after, headers), headers
+        
+        self.in_flight += 1
+        self.in_flight_by_key[key] = key_in_flight + 1
+        self.admitted += 1
+        return None, headers
+    
+    def release(self, key: str):
+        self.in_flight -= 1
+        remaining = self.in_flight_by_key[key] - 1
+        if remaining:
+            self.in_flight_by_key[key] = remaining
+        else:
+            del self.in_flight_by_key[key]
+    
+    @staticmethod
+    def _reject(status_code: int, error: str, message: str, retry_after: int,
+                headers: Dict[str, str]) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code,
+            content={"detail": {"error": error, "message": message, "retry_after_seconds": retry_after}},
+            headers={**headers, 'Retry-After': str(retry_after)}
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'max_in_flight_per_key': self.max_in_flight_per_key,
+            'max_requests': self.limiter.max_requests if self.limiter else None,
+            'window_seconds': self.limiter.window_seconds if self.limiter else None,
+            'admitted': self.admitted,
+            'shed_rate': self.shed_rate,
+            'shed_in_flight': self.shed_in_flight
+        }
+
+
+class RouteLimitMiddleware:
+    """
+    ASGI middleware applying RouteLimits before the request reaches routing.
+    
+    Requests over a limit are answered here with 429/503 and Retry-After,
+    so the handler never runs and an expensive route that is saturated
+    can't tie up the server for cheap ones. Routes without a RouteLimit
+    pass straight through. The first matching limit applies; list more
+    specific paths first.
+    
+    Admission and release happen on the event loop between awaits, so the
+    counters need no lock.
+    """
+    
+    def __init__(self, app, limits: List[RouteLimit]):
+        self.app = app
+        self.limits = limits
+        # Most limited routes have no path parameters: look those up directly
+        self.static: Dict[Tuple[str, str], RouteLimit] = {}
+        self.patterns: List[RouteLimit] = []
+        for limit in limits:
+            if "{" in limit.path:
+                self.patterns.append(limit)
+            else:
+                self.static.setdefault((limit.method, limit.path), limit)
+    
+    def match(self, method: str, path: str) -> Optional[RouteLimit]:
+        limit = self.static.get((method, path))
+        if limit is not None:
+            return limit
+        for limit in self.patterns:
+            if limit.method == method and limit.regex.match(path):
+                return limit
+        return None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.match(scope["method"], scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        
+        key = None
+        if limit.key_from_body:
+            body, messages = await read_body(receive)
+            key = body_user_key(body)
+            original_receive = receive
+            
+            async def receive():
+                return messages.pop(0) if messages else await original_receive()
+        key = key or limit.key(scope)
+        rejection, headers = limit.acquire(key)
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+        
+        raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and raw_headers:
+                existing = {name.lower() for name, _ in message.get("headers", [])}
+                added = [header for header in raw_headers if header[0] not in existing]
+                message = {**message, "headers": [*message.get("headers", []), *added]}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            limit.release(key)
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, Iterable
+
+# Whole phrases are matched before single words so that e.g.
+# "I hate myself" gets a gentler rewrite than just swapping "hate".
+KIND_PHRASES = {
+    "i hate myself": "I'm being really hard on myself",
+    "i'm such a failure": "I'm still learning",
+    "i am such a failure": "I am still learning",
+    "i'm a failure": "I'm still learning",
+    "i am a failure": "I am still learning",
+    "i'm so stupid": "I'm still figuring this out",
+    "i am so stupid": "I am still figuring this out",
+    "i'm worthless": "I'm worthy of kindness",
+    "i am worthless": "I am worthy of kindness",
+    "i'm useless": "I'm doing what I can",
+    "i am useless": "I am doing what I can",
+    "i'm so lazy": "I'm low on energy",
+    "i am so lazy": "I am low on energy",
+    "messed up": "made a mistake",
+}
+
+KIND_ALTERNATIVES = {
+    'lazy': 'low on energy',
+    'disgusting': 'unpleasant',
+    'hate': 'struggle with',
+    'terrible': 'difficult',
+    'awful': 'hard',
+    'horrible': 'really tough',
+    'stupid': 'still learning',
+    'idiot': 'someone still learning',
+    'worthless': 'still worthy',
+    'useless': 'still finding my way',
+    'pathetic': 'struggling',
+    'failure': 'work in progress',
+    'disgusted': 'uncomfortable',
+    'sick': 'unwell',
+    'nasty': 'unpleasant',
+    'gross': 'unpleasant',
+    'filthy': 'messy',
+    'dirty': 'messy',
+    'embarrassed': 'self-conscious',
+    'ashamed': 'uneasy',
+    'guilty': 'regretful',
+    'hopeless': 'discouraged',
+    'helpless': 'unsure',
+    'weak': 'tired',
+    'broken': 'hurting',
+    'damaged': 'hurting',
+    'ruined': 'set back',
+    'destroyed': 'set back',
+    'dumb': 'unclear',
+    'yikes': 'hmm',
+    'cringe': 'awkward',
+    'ridiculous': 'surprising',
+    'absurd': 'unexpected',
+    'nonsense': 'confusing',
+    'embarrassing': 'awkward',
+    'shameful': 'regrettable',
+    'pointless': 'unclear',
+    'meaningless': 'unclear',
+    'powerless': 'unsure',
+    'defeated': 'worn down',
+    'beaten': 'worn out',
+    'crushed': 'overwhelmed',
+    'wasted': 'spent',
+    'squandered': 'spent',
+    # Inflected forms matched by the lexicon
+    'hates': 'struggles with',
+    'hated': 'struggled with',
+    'hating': 'struggling with',
+    'failed': 'struggled',
+    'failing': 'struggling',
+    'failures': 'setbacks',
+    'ruining': 'setting back',
+    'laziness': 'low energy',
+    'stupidity': 'inexperience',
+    'idiots': 'people still learning',
+}
+
+
+class RuleBasedRewriter:
+    """
+    Fast offline rewriter that swaps negative phrases for kinder alternatives.
+    
+    Used as a fallback when the LLM is unavailable. It never makes network
+    calls, so it answers in microseconds.
+    """
+    
+    def __init__(self, negative_words: Iterable[str]):
+        self.substitutions: Dict[str, str] = dict(KIND_PHRASES)
+        for word in negative_words:
+            word = word.lower()
+            # Only words with a curated alternative are replaced; a generic
+            # substitute would often break the sentence's grammar
+            if word not in self.substitutions and word in KIND_ALTERNATIVES:
+                self.substitutions[word] = KIND_ALTERNATIVES[word]
+        
+        # One alternation, longest phrases first so they win over single words
+        alternatives = sorted(self.substitutions, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(a) for a in alternatives) + r')\b',
+            re.IGNORECASE
+        )
+    
+    def _replace(self, match: re.Match) -> str:
+        original = match.group(0)
+        replacement = self.substitutions[original.lower()]
+        # Keep sentence-initial capitalisation
+        if original[0].isupper() and replacement[0].islower():
+            replacement = replacement[0].upper() + replacement[1:]
+        return replacement
+    
+    def rewrite(self, text: str) -> str:
+        """
+        Rewrite text by substituting negative phrases.
+        
+        Args:
+            text: The original text to rewrite
+            
+        Returns:
+            Text with negative phrases replaced by kinder alternatives
+        """
+        if not text:
+            return text
+        return self.pattern.sub(self._replace, text)
@@ -0,0 +1,191 @@
+import re
+import random
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+# Mersenne prime used for the MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Words whose addition or removal flips a text's meaning however similar
+# the rest is, so a stored rewrite can't stand in for it
+NEGATIONS = {
+    "not", "no", "never", "nothing", "nobody", "none", "nor", "cannot", "without",
+    "dont", "cant", "wont", "isnt", "arent", "wasnt", "werent", "didnt", "doesnt",
+    "havent", "hasnt", "couldnt", "shouldnt", "wouldnt", "aint"
+}
+FIRST_PERSON = {"i", "i'm", "i've", "i'll", "i'd"}
+TOKEN = re.compile(r"[A-Za-z0-9']+|[.!?\n]")
+
+
+class SimilarityIndex:
+    """
+    Near-duplicate lookup for previously rewritten texts.
+    
+    Texts are reduced to word shingles and a MinHash signature. Signatures
+    are split into LSH bands so a lookup only compares against texts that
+    share at least one band, then the best candidate is confirmed with the
+    exact Jaccard similarity of the shingle sets.
+    
+    Entries only match lookups with the same scope (the rewriter uses the
+    user ID), and a candidate is rejected when the words that differ
+    include a negation, a number or a name: "I am not lazy" must not get
+    the rewrite of "I am lazy", however similar the two are.
+    
+    The index keeps at most max_entries texts and evicts the oldest first.
+    """
+    
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 2, max_entries: int = 5000, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, _PRIME - 1), rng.randint(0, _PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        
+        # entry_id -> (scope, shingles, signature, words, sensitive words, rewritten text)
+        self.entries: "OrderedDict[int, Tuple[Any, Set[str], List[int], Set[str], Set[str], str]]" = OrderedDict()
+        self.buckets: List[Dict[Tuple[int, ...], Set[int]]] = [{} for _ in range(bands)]
+        self.next_id = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.rejected_edits = 0
+    
+    def shingles(self, text: str) -> Set[str]:
+        """Word shingles of the normalized text (unigrams for very short texts)"""
+        words = re.findall(r"[a-z0-9']+", text.lower())
+        if len(words) < self.shingle_size:
+            return set(words)
+        return {
+            ' '.join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+    
+    def sensitive_words(self, text: str) -> Set[str]:
+        """Negations, numbers and capitalized words that don't start a sentence"""
+        sensitive = set()
+        sentence_start = True
+        for match in TOKEN.finditer(text):
+            token = match.group()
+            if token in ".!?\n":
+                sentence_start = True
+                continue
+            word = token.lower()
+            if (word in NEGATIONS or word.endswith("n't") or any(c.isdigit() for c in word)
+                    or (token[0].isupper() and not sentence_start and word not in FIRST_PERSON)):
+                sensitive.add(word)
+            sentence_start = False
+        return sensitive
+    
+    def signature(self, shingles: Set[str]) -> List[int]:
+        """MinHash signature of a shingle set"""
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+            for a, b in self.permutations
+        ]
+    
+    def _band_keys(self, signature: List[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+    
+    def _words(self, text: str) -> Set[str]:
+        return set(re.findall(r"[a-z0-9']+", text.lower()))
+    
+    def add(self, text: str, rewritten_text: str, scope: Any = None):
+        """Store a rewrite so similar texts in the same scope can reuse it"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return
+        signature = self.signature(shingles)
+        
+        with self._lock:
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = (scope, shingles, signature, self._words(text),
+                                      self.sensitive_words(text), rewritten_text)
+            for band, key in self._band_keys(signature):
+                self.buckets[band].setdefault(key, set()).add(entry_id)
+            
+            while len(self.entries) > self.max_entries:
+                self._evict_oldest()
+    
+    def _evict_oldest(self):
+        entry_id, (_, _, signature, _, _, _) = self.entries.popitem(last=False)
+        for band, key in self._band_keys(signature):
+            bucket = self.buckets[band].get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[band][key]
+    
+    def lookup(self, text: str, scope: Any = None) -> Optional[Tuple[str, float]]:
+        """
+        Find the stored rewrite of the most similar earlier text in scope.
+        
+        Returns:
+            Tuple of (rewritten_text, jaccard_similarity), or None if no
+            stored text reaches the threshold
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        signature = self.signature(shingles)
+        words = self._words(text)
+        sensitive = self.sensitive_words(text)
+        
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self.buckets[band].get(key, ()))
+            
+            best = None
+            best_similarity = 0.0
+            rejected = False
+            for entry_id in candidates:
+                entry_scope, stored_shingles, _, stored_words, stored_sensitive, rewritten_text = self.entries[entry_id]
+                if entry_scope != scope:
+                    continue
+                similarity = len(shingles & stored_shingles) / len(shingles | stored_shingles)
+                if similarity < self.threshold or similarity <= best_similarity:
+                    continue
+                if (words ^ stored_words) & (sensitive | stored_sensitive):
+                    rejected = True
+                    continue
+                best, best_similarity = rewritten_text, similarity
+            
+            if rejected and best is None:
+                self.rejected_edits += 1
+            if best is not None:
+                self.hits += 1
+                return best, best_similarity
+            self.misses += 1
+            return None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'rejected_edits': self.rejected_edits,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
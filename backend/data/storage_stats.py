@@ -0,0 +1,233 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional
+
+from .tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+# Innermost instrumented DataManager method running in this context, so
+# the I/O it does is attributed to it rather than to its callers
+_current_method: ContextVar[Optional[str]] = ContextVar("storage_method", default=None)
+# Storage profile of the HTTP request being handled in this context, if any
+_current_request: ContextVar[Optional["RequestStorage"]] = ContextVar("storage_request", default=None)
+
+UNATTRIBUTED = "unattributed"
+
+
+class IOCounters:
+    """Storage counters for one method, or for one request"""
+    
+    __slots__ = ('calls', 'seconds', 'bytes_read', 'bytes_written', 'parse_seconds',
+                 'dump_seconds', 'records_scanned', 'records_written')
+    
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.parse_seconds = 0.0
+        self.dump_seconds = 0.0
+        self.records_scanned = 0
+        self.records_written = 0
+    
+    def add_read(self, num_bytes: int, parse_seconds: float, records: int):
+        self.bytes_read += num_bytes
+        self.parse_seconds += parse_seconds
+        self.records_scanned += records
+    
+    def add_write(self, num_bytes: int, dump_seconds: float, records: int):
+        self.bytes_written += num_bytes
+        self.dump_seconds += dump_seconds
+        self.records_written += records
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'seconds': round(self.seconds, 6),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'parse_seconds': round(self.parse_seconds, 6),
+            'dump_seconds': round(self.dump_seconds, 6),
+            'records_scanned': self.records_scanned,
+            'records_written': self.records_written
+        }
+
+
+class RequestStorage:
+    """
+    Storage done on behalf of one request.
+    
+    totals counts outermost calls only (save_post calling load_posts is one
+    call and its time is not counted twice); by_method has every call.
+    """
+    
+    def __init__(self):
+        self.totals = IOCounters()
+        self.by_method: Dict[str, IOCounters] = {}
+        self.lock = threading.Lock()
+    
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return {**self.totals.as_dict(),
+                    'by_method': {name: counters.as_dict() for name, counters in self.by_method.items()}}
+
+
+class StorageStats:
+    """
+    Process-wide storage counters per DataManager method, plus the
+    per-request breakdown of recent slow requests.
+    
+    DataManager methods are wrapped with @instrumented, which times each
+    call; the JSON helpers report bytes, parse/dump time and record counts
+    through record_read/record_write. Both are added to the method's
+    totals and, when a request is being profiled in the current context
+    (see StorageProfileMiddleware), to that request's RequestStorage.
+    Context variables follow asyncio tasks and asyncio.to_thread, so
+    storage run in worker threads is still attributed to its request.
+    """
+    
+    def __init__(self, max_slow_requests: int = 20):
+        self.methods: Dict[str, IOCounters] = {}
+        self.slow_requests = deque(maxlen=max_slow_requests)
+        self.lock = threading.Lock()
+    
+    def _counters(self, table: Dict[str, IOCounters], name: str) -> IOCounters:
+        counters = table.get(name)
+        if counters is None:
+            counters = table[name] = IOCounters()
+        return counters
+    
+    def record_call(self, name: str, seconds: float, nested: bool):
+        with self.lock:
+            counters = self._counters(self.methods, name)
+            counters.calls += 1
+            counters.seconds += seconds
+        request = _current_request.get()
+        if request is not None:
+            with request.lock:
+                counters = self._counters(request.by_method, name)
+                counters.calls += 1
+                counters.seconds += seconds
+                if not nested:
+                    request.totals.calls += 1
+                    request.totals.seconds += seconds
+    
+    def record_read(self, num_bytes: int, parse_seconds: float, records: int,
+                    method: Optional[str] = None):
+        name = method or _current_method.get() or UNATTRIBUTED
+        with self.lock:
+            self._counters(self.methods, name).add_read(num_bytes, parse_seconds, records)
+        request = _current_request.get()
+        if request is not None:
+            with request.lock:
+                self._counters(request.by_method, name).add_read(num_bytes, parse_seconds, records)
+                request.totals.add_read(num_bytes, parse_seconds, records)
+    
+    def record_write(self, num_bytes: int, dump_seconds: float, records: int):
+        name = _current_method.get() or UNATTRIBUTED
+        with self.lock:
+            self._counters(self.methods, name).add_write(num_bytes, dump_seconds, records)
+        request = _current_request.get()
+        if request is not None:
+            with request.lock:
+                self._counters(request.by_method, name).add_write(num_bytes, dump_seconds, records)
+                request.totals.add_write(num_bytes, dump_seconds, records)
+    
+    def record_slow_request(self, method: str, path: str, status: int, seconds: float,
+                            storage: Dict[str, Any]):
+        entry = {
+            'method': method,
+            'path': path,
+            'status': status,
+            'seconds': round(seconds, 6),
+            'storage': storage
+        }
+        with self.lock:
+            self.slow_requests.append(entry)
+        logger.warning(
+            f"Slow request {method} {path} took {seconds * 1000:.0f} ms, "
+            f"{storage['seconds'] * 1000:.0f} ms in {storage['calls']} storage calls "
+            f"({storage['bytes_read']} bytes read, {storage['bytes_written']} written, "
+            f"{storage['parse_seconds'] * 1000:.0f} ms parsing, {storage['dump_seconds'] * 1000:.0f} ms dumping)"
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            methods = {name: counters.as_dict() for name, counters in sorted(self.methods.items())}
+            slow_requests = list(self.slow_requests)
+        return {'methods': methods, 'slow_requests': slow_requests}
+
+
+def instrumented(method: Callable) -> Callable:
+    """
+    Time a DataManager method into self.stats and attribute its I/O to it.
+    During a traced request the call is also a span.
+    """
+    name = method.__name__
+    span_name = f"DataManager.{name}"
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        nested = _current_method.get() is not None
+        token = _current_method.set(name)
+        start = time.perf_counter()
+        try:
+            with start_span(span_name):
+                return method(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_method.reset(token)
+            self.stats.record_call(name, elapsed, nested)
+    
+    return wrapper
+
+
+class StorageProfileMiddleware:
+    """
+    ASGI middleware giving each HTTP request its own storage profile.
+    
+    The totals are sent back in a Server-Timing header (visible in browser
+    dev tools) when the response starts; a streaming response's storage
+    after that point is still counted for the slow request log. Requests
+    slower than slow_seconds are kept in stats.slow_requests, with their
+    per-method breakdown, and logged.
+    """
+    
+    def __init__(self, app, stats: StorageStats, slow_seconds: float = 0.5):
+        self.app = app
+        self.stats = stats
+        self.slow_seconds = slow_seconds
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request = RequestStorage()
+        token = _current_request.set(request)
+        status = 500
+        
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                totals = request.totals
+                timing = (f'storage;dur={totals.seconds * 1000:.2f};'
+                          f'desc="{totals.calls} calls, {totals.bytes_read} B read, {totals.bytes_written} B written"')
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", timing.encode("latin-1"))]}
+            await send(message)
+        
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.slow_seconds:
+                self.stats.record_slow_request(scope["method"], scope["path"], status, elapsed, request.summary())
@@ -0,0 +1,164 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Streak fields that can be ranked
+METRICS = ('current_streak', 'longest_streak')
+
+# Upper bounds (inclusive) of the histogram buckets, in days
+HISTOGRAM_BOUNDS = (0, 1, 3, 7, 14, 30, 60, 100, 180, 365)
+
+
+class StreakLeaderboard:
+    """
+    Ranking of users by current and longest streak, kept up to date as
+    streaks change.
+    
+    For each metric it keeps a sorted list of (-streak, user_id) entries, the
+    score of each user and how many users have each score. Top-N is a slice,
+    a user's rank is a binary search, and stats and histograms are computed
+    from the per-score counts, so none of the queries walks every user.
+    Built from the streak store, then updated by StreakManager.
+    
+    StreakManager only sees the writes made in its own process, so with
+    several workers each index misses the others' updates. refresh() reloads
+    from the store when it changed and the index is older than max_age seconds.
+    """
+    
+    def __init__(self, max_age: float = 5.0):
+        self.max_age = max_age
+        self.version: Any = None
+        self.loaded_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self.ranked: Dict[str, List[Tuple[int, str]]] = {metric: [] for metric in METRICS}
+        self.scores: Dict[str, Dict[str, int]] = {metric: {} for metric in METRICS}
+        self.score_counts: Dict[str, Counter] = {metric: Counter() for metric in METRICS}
+        self.score_sums: Dict[str, int] = {metric: 0 for metric in METRICS}
+    
+    def load(self, all_streaks: Dict[str, Dict[str, Any]], version: Any = None):
+        """
+        Replace the index with the given user_id -> streak record mapping
+        version identifies the state of the store it was read from (taken before reading)
+        """
+        with self.lock:
+            self.version = version
+            self.loaded_at = time.monotonic()
+            for metric in METRICS:
+                scores = {user_id: int(streak_data.get(metric, 0)) for user_id, streak_data in all_streaks.items()}
+                self.scores[metric] = scores
+                self.ranked[metric] = sorted((-score, user_id) for user_id, score in scores.items())
+                self.score_counts[metric] = Counter(scores.values())
+                self.score_sums[metric] = sum(scores.values())
+    
+    def refresh(self, version: Any, load_all: Callable[[], Dict[str, Dict[str, Any]]]) -> bool:
+        """
+        Reload from the store if it changed since the last load (version
+        differs) and that load is more than max_age seconds old.
+        
+        Returns:
+            Whether the index was reloaded
+        """
+        with self.lock:
+            fresh = (self.loaded_at is not None and
+                     (version == self.version or time.monotonic() - self.loaded_at < self.max_age))
+        if fresh:
+            return False
+        self.load(load_all(), version)
+        return True
+    
+    def update(self, user_id: str, streak_data: Dict[str, Any]):
+        """Re-rank one user after their streak record changed"""
+        with self.lock:
+            for metric in METRICS:
+                self._set_score(metric, user_id, int(streak_data.get(metric, 0)))
+    
+    def _set_score(self, metric: str, user_id: str, score: int):
+        scores = self.scores[metric]
+        ranked = self.ranked[metric]
+        old_score = scores.get(user_id)
+        if old_score == score:
+            return
+        
+        if old_score is not None:
+            del ranked[bisect.bisect_left(ranked, (-old_score, user_id))]
+            self.score_counts[metric][old_score] -= 1
+            self.score_sums[metric] -= old_score
+        bisect.insort(ranked, (-score, user_id))
+        scores[user_id] = score
+        self.score_counts[metric][score] += 1
+        self.score_sums[metric] += score
+    
+    def _check_metric(self, metric: str):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown streak metric: {metric} (expected one of {', '.join(METRICS)})")
+    
+    def top(self, metric: str = 'current_streak', limit: int = 10) -> List[Dict[str, Any]]:
+        """Highest streaks first; ties share a rank and are ordered by user ID"""
+        self._check_metric(metric)
+        with self.lock:
+            entries = self.ranked[metric][:limit]
+            ranks = [bisect.bisect_left(self.ranked[metric], (negative, "")) + 1 for negative, _ in entries]
+        return [
+            {'rank': rank, 'user_id': user_id, metric: -negative}
+            for rank, (negative, user_id) in zip(ranks, entries)
+        ]
+    
+    def standing(self, user_id: str, metric: str = 'current_streak') -> Optional[Dict[str, Any]]:
+        """
+        Rank and percentile of one user.
+        
+        The percentile is the share of users whose streak is at or below
+        this user's, so the top user is at 100.
+        """
+        self._check_metric(metric)
+        with self.lock:
+            score = self.scores[metric].get(user_id)
+            if score is None:
+                return None
+            ranked = self.ranked[metric]
+            higher = bisect.bisect_left(ranked, (-score, ""))
+            total = len(ranked)
+        return {
+            'user_id': user_id,
+            metric: score,
+            'rank': higher + 1,
+            'total_users': total,
+            'percentile': round(100 * (total - higher) / total, 2)
+        }
+    
+    def stats(self, metric: str = 'current_streak') -> Dict[str, Any]:
+        """User count, mean, percentiles and a histogram of streak lengths"""
+        self._check_metric(metric)
+        with self.lock:
+            ranked = self.ranked[metric]
+            total = len(ranked)
+            counts = sorted(self.score_counts[metric].items())
+            score_sum = self.score_sums[metric]
+            
+            def percentile(pct: float) -> Optional[int]:
+                if not total:
+                    return None
+                # ranked is descending, so the pct-th percentile sits (1 - pct) from the top
+                return -ranked[min(total - 1, int(total * (1 - pct)))][0]
+            
+            summary = {
+                'metric': metric,
+                'total_users': total,
+                'mean': round(score_sum / total, 2) if total else None,
+                'median': percentile(0.5),
+                'p90': percentile(0.9),
+                'max': -ranked[0][0] if total else None
+            }
+        
+        histogram = []
+        lower = 0
+        for upper in HISTOGRAM_BOUNDS + (None,):
+            users = sum(n for score, n in counts if score >= lower and (upper is None or score <= upper))
+            label = f"{lower}+" if upper is None else (str(lower) if lower == upper else f"{lower}-{upper}")
+            histogram.append({'range': label, 'users': users})
+            if upper is not None:
+                lower = upper + 1
+        summary['histogram'] = histogram
+        return summary
@@ -1,115 +1,164 @@
-from datetime import date, timedelta
-from typing import Dict, Any, List
+import copy
+from datetime import date
+from typing import Dict, Any, Optional
+
+from .completion_bitmap import CompletionBitmap
+from .tracing import traced
 
 class StreakManager:
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, leaderboard=None):
         self.data_manager = data_manager
+        # Optional StreakLeaderboard kept in step with every saved record
+        self.leaderboard = leaderboard
     
     def get_streak_data(self, user_id: str) -> Dict[str, Any]:
-        """Get current streak data for a specific user"""
-        return self.data_manager.load_streak(user_id)
+        """
+        Get current streak data for a specific user
+        
+        If the daily rollover hasn't reached this record yet (e.g. it is
+        shortly after midnight), it is applied here on the returned copy.
+        """
+        streak_data = self.data_manager.load_streak(user_id)
+        today = date.today()
+        if streak_data and streak_data.get('rollover_date') != today.isoformat():
+            self._apply_rollover(streak_data, today)
+        return streak_data
+    
+    def get_completions(self, user_id: str) -> CompletionBitmap:
+        """Get the set of days a user completed tasks on"""
+        return self._load_completions(self.get_streak_data(user_id))
     
+    def _load_completions(self, streak_data: Dict[str, Any]) -> CompletionBitmap:
+        """
+        Read completion days from a streak record.
+        Records saved before the bitmap format keep a list of ISO dates in
+        completion_dates; those are converted here and rewritten on next save.
+        """
+        if 'completion_bitmap' in streak_data:
+            return CompletionBitmap.from_json(streak_data['completion_bitmap'])
+        return CompletionBitmap.from_dates(streak_data.get('completion_dates', []))
+    
+    @traced("StreakManager.update_streak_for_completion")
     def update_streak_for_completion(self, user_id: str, completion_date: date) -> Dict[str, Any]:
         """
         Update streak when a task is completed on a given date for a specific user
         Returns updated streak data
+        
+        Completion days are stored as a bitmap (see CompletionBitmap), so
+        recording a day and finding the runs around it are a few integer
+        operations regardless of how long the history is.
         """
         streak_data = self.get_streak_data(user_id)
+        completions = self._load_completions(streak_data)
         
-        # Convert completion_date to string for comparison
-        completion_date_str = completion_date.isoformat()
-        
-        # If this date is already in completion_dates, no need to update
-        if completion_date_str in streak_data.get('completion_dates', []):
+        if not completions.add(completion_date):
             return streak_data
         
-        # Add completion date to the list
-        completion_dates = streak_data.get('completion_dates', [])
-        completion_dates.append(completion_date_str)
-        streak_data['completion_dates'] = completion_dates
-        
-        # Update last completion date
-        streak_data['last_completion_date'] = completion_date
-        
-        # Calculate new streak
-        self._calculate_streak(streak_data)
+        # Current run ends at the latest completion; backfills may extend it
+        self._set_current_run(streak_data, completions, date.today())
+        new_run_start, new_run_end = completions.run_around(completion_date)
+        run_length = (new_run_end - new_run_start).days + 1
+        streak_data['longest_streak'] = max(streak_data.get('longest_streak', 0), run_length)
         
         # Save updated streak data
         self.data_manager.save_streak(user_id, streak_data)
+        if self.leaderboard:
+            self.leaderboard.update(user_id, streak_data)
         
         return streak_data
     
-    def _calculate_streak(self, streak_data: Dict[str, Any]):
-        """
-        Calculate current streak based on completion dates
-        Streak logic:
-        - If no completion dates, streak is 0
-        - If last completion was today, check consecutive days backwards
-        - If last completion was not today, streak is paused (not reset to 0)
-        """
-        completion_dates = streak_data.get('completion_dates', [])
-        
-        if not completion_dates:
+    def _set_current_run(self, streak_data: Dict[str, Any], completions: CompletionBitmap, today: date):
+        """Store the completions and the run ending at the latest completion as of today"""
+        last_completion_date = completions.last()
+        streak_data.pop('completion_dates', None)
+        # Runs are found in the bitmap with run_around; older records also stored their bounds
+        streak_data.pop('run_start', None)
+        streak_data.pop('run_end', None)
+        streak_data['completion_bitmap'] = completions.to_json()
+        streak_data['rollover_date'] = today.isoformat()
+        
+        if last_completion_date is None:
             streak_data['current_streak'] = 0
             streak_data['is_paused'] = False
             return
         
-        # Sort completion dates
-        completion_dates.sort()
-        
-        # Get the most recent completion date
-        last_completion_str = completion_dates[-1]
-        last_completion_date = date.fromisoformat(last_completion_str)
-        today = date.today()
-        
-        # Calculate the current streak based on the most recent completion
-        current_streak = self._calculate_consecutive_days(completion_dates, last_completion_date)
-        streak_data['current_streak'] = current_streak
-        
-        # If last completion was today, streak is active
-        if last_completion_date == today:
-            streak_data['is_paused'] = False
-        else:
-            # Streak is paused (not reset to 0)
-            streak_data['is_paused'] = True
-        
-        # Update longest streak if current streak is longer
-        longest_streak = streak_data.get('longest_streak', 0)
-        if current_streak > longest_streak:
-            streak_data['longest_streak'] = current_streak
+        run_start, run_end = completions.run_around(last_completion_date)
+        streak_data['last_completion_date'] = last_completion_date
+        streak_data['current_streak'] = (run_end - run_start).days + 1
+        # If last completion was today, streak is active; otherwise paused (not reset to 0)
+        streak_data['is_paused'] = last_completion_date != today
     
-    def _calculate_consecutive_days(self, completion_dates: List[str], end_date: date) -> int:
-        """
-        Calculate consecutive days of completion ending on end_date
+    @traced("StreakManager.build_streak_record")
+    def build_streak_record(self, completions: CompletionBitmap, today: date) -> Dict[str, Any]:
+        """Build a streak record from scratch given every day the user completed a task"""
+        streak_data = {
+            'last_completion_date': None,
+            'longest_streak': completions.longest_run()
+        }
+        self._set_current_run(streak_data, completions, today)
+        return streak_data
+    
+    def _apply_rollover(self, streak_data: Dict[str, Any], today: date) -> Dict[str, Any]:
+        """Refresh is_paused and current_streak of one record for a new day"""
+        legacy = 'completion_bitmap' not in streak_data
+        completions = self._load_completions(streak_data)
+        self._set_current_run(streak_data, completions, today)
+        if legacy:
+            # Records converted from the list format may hold longer runs than longest_streak
+            streak_data['longest_streak'] = max(streak_data.get('longest_streak', 0), completions.longest_run())
+        return streak_data
+    
+    def rollover_all(self, today: Optional[date] = None) -> int:
         """
-        if not completion_dates:
-            return 0
-        
-        # Convert completion dates to date objects and sort
-        dates = [date.fromisoformat(d) for d in completion_dates]
-        dates.sort()
+        Refresh every user's streak for a new day in one bulk pass.
         
-        # Find the last occurrence of end_date or earlier
-        last_date = None
-        for d in reversed(dates):
-            if d <= end_date:
-                last_date = d
-                break
+        The whole streak store is read once and records not yet rolled over
+        for today are refreshed on copies, outside any lock. The results are
+        then merged under the streak lock: a record saved by a request in
+        the meantime is rolled over again from its new state rather than
+        overwritten, and all updates are written back with a single save.
         
-        if not last_date:
-            return 0
-        
-        # Count consecutive days backwards from last_date
-        consecutive_count = 0
-        current_date = last_date
+        Records are processed serially; the work is pure Python, so threads
+        would only contend for the GIL.
         
-        # Check if we have consecutive days backwards
-        while current_date in dates:
-            consecutive_count += 1
-            current_date -= timedelta(days=1)
+        Args:
+            today: Day to roll over to (defaults to today)
         
-        return consecutive_count
+        Returns:
+            Number of records updated
+        """
+        today = today or date.today()
+        loaded = self.data_manager.load_all_streaks()
+        stale = {
+            user_id: streak_data for user_id, streak_data in loaded.items()
+            if streak_data.get('rollover_date') != today.isoformat()
+        }
+        if not stale:
+            return 0
+        rolled = {user_id: self._apply_rollover(copy.deepcopy(streak_data), today)
+                  for user_id, streak_data in stale.items()}
+        
+        def merge(all_streaks: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            updated = {}
+            for user_id, streak_data in rolled.items():
+                current = all_streaks.get(user_id)
+                if current is None:
+                    continue
+                if current != stale[user_id]:
+                    # Saved since the snapshot: roll the newer record over instead
+                    if current.get('rollover_date') == today.isoformat():
+                        continue
+                    streak_data = self._apply_rollover(current, today)
+                all_streaks[user_id] = updated[user_id] = streak_data
+            return updated
+        
+        updated = self.data_manager.update_all_streaks(merge)
+        if self.leaderboard:
+            for user_id, streak_data in updated.items():
+                self.leaderboard.update(user_id, streak_data)
+        return len(updated)
     
+    @traced("StreakManager.get_streak_summary")
     def get_streak_summary(self, user_id: str) -> Dict[str, Any]:
         """
         Get a summary of streak information for a specific user
@@ -130,5 +179,5 @@ class StreakManager:
             'is_paused': streak_data.get('is_paused', False),
             'last_completion_date': last_completion_date.isoformat() if last_completion_date else None,
             'days_since_last_completion': days_since_last,
-            'total_completion_days': len(streak_data.get('completion_dates', []))
+            'total_completion_days': len(self._load_completions(streak_data))
         } 
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Rebuild streak.json from the completion_history of every task.
+
+Streaks are updated incrementally as tasks are completed, so they can drift
+from the tasks themselves (e.g. un-completing a task never removes the day).
+This recomputes every user's streak from scratch:
+
+1. tasks.json is streamed one task at a time and completed days are
+   collected per user into a CompletionBitmap
+2. streak records are rebuilt from the bitmaps, on a process pool when
+   run from the command line
+3. the result is diffed against streak.json and, unless it's a dry run,
+   merged back under the streak lock in one atomic replace
+
+Users that have a streak record but no tasks are left untouched, and so
+are records saved by a request while the rebuild was running.
+
+Usage (from the backend directory):
+    python -m data.streak_rebuild [--dry-run] [--workers N]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+from .completion_bitmap import CompletionBitmap
+from .streak_manager import StreakManager
+
+# Fields compared in the diff between stored and rebuilt records
+DIFF_FIELDS = ('current_streak', 'longest_streak', 'last_completion_date', 'is_paused', 'total_completion_days')
+
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+
+def collect_completions(tasks: Iterable[Dict[str, Any]],
+                        progress: Optional[ProgressCallback] = None,
+                        progress_every: int = 100000) -> Tuple[Dict[str, CompletionBitmap], int]:
+    """
+    Group the days each user completed any task on.
+    
+    Returns:
+        Tuple of (user_id -> completed days, number_of_tasks_scanned)
+    """
+    completions: Dict[str, CompletionBitmap] = {}
+    # Each date string is parsed once, however many tasks mention it
+    parsed_days: Dict[str, date] = {}
+    scanned = 0
+    for task in tasks:
+        scanned += 1
+        if progress and scanned % progress_every == 0:
+            progress('scan', scanned, None)
+        
+        user_id = task.get('user_id')
+        history = task.get('completion_history')
+        if not user_id or not history:
+            continue
+        
+        bitmap = completions.get(user_id)
+        if bitmap is None:
+            bitmap = completions[user_id] = CompletionBitmap()
+        for day_str, completed in history.items():
+            if not completed:
+                continue
+            day = parsed_days.get(day_str)
+            if day is None:
+                try:
+                    day = parsed_days[day_str] = date.fromisoformat(day_str)
+                except ValueError:
+                    continue
+            bitmap.add(day)
+    
+    if progress:
+        progress('scan', scanned, scanned)
+    return completions, scanned
+
+
+def _rebuild_chunk(chunk: List[Tuple[str, CompletionBitmap]], today: date) -> List[Tuple[str, Dict[str, Any]]]:
+    streak_manager = StreakManager(None)
+    return [(user_id, streak_manager.build_streak_record(bitmap, today)) for user_id, bitmap in chunk]
+
+
+def rebuild_records(completions: Dict[str, CompletionBitmap], today: date, workers: int = 1,
+                    chunk_size: int = 2000,
+                    progress: Optional[ProgressCallback] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Build fresh streak records for every user.
+    
+    Args:
+        completions: user_id -> completed days
+        today: Day the streaks are computed for (decides is_paused)
+        workers: Worker processes; 0 uses all CPUs, 1 runs in this process.
+            Workers are spawned, not forked, so they don't inherit locks held
+            by the parent's threads (log listener, span exporter).
+        chunk_size: Users per process-pool task
+        progress: Called as progress('rebuild', users_done, users_total)
+    """
+    items = list(completions.items())
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    records: Dict[str, Dict[str, Any]] = {}
+    
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = (_rebuild_chunk(chunk, today) for chunk in chunks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        results = executor.map(_rebuild_chunk, chunks, [today] * len(chunks))
+    
+    try:
+        for rebuilt in results:
+            records.update(rebuilt)
+            if progress:
+                progress('rebuild', len(records), len(items))
+    finally:
+        if executor:
+            executor.shutdown()
+    return records
+
+
+def _summary(streak_data: Dict[str, Any]) -> Dict[str, Any]:
+    if 'completion_bitmap' in streak_data:
+        total = len(CompletionBitmap.from_json(streak_data['completion_bitmap']))
+    else:
+        total = len(set(streak_data.get('completion_dates', [])))
+    last_completion_date = streak_data.get('last_completion_date')
+    return {
+        'current_streak': streak_data.get('current_streak', 0),
+        'longest_streak': streak_data.get('longest_streak', 0),
+        'last_completion_date': last_completion_date.isoformat() if isinstance(last_completion_date, date)
+        else last_completion_date,
+        'is_paused': streak_data.get('is_paused', False),
+        'total_completion_days': total
+    }
+
+
+def diff_records(stored: Dict[str, Dict[str, Any]],
+                 rebuilt: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, List[Any]]]:
+    """Changed fields per user, as {user_id: {field: [stored, rebuilt]}}"""
+    changes = {}
+    for user_id, record in rebuilt.items():
+        before = _summary(stored.get(user_id, {}))
+        after = _summary(record)
+        changed = {field: [before[field], after[field]] for field in DIFF_FIELDS if before[field] != after[field]}
+        if changed:
+            changes[user_id] = changed
+    return changes
+
+
+def rebuild_streaks(data_manager, dry_run: bool = False, workers: int = 1, today: Optional[date] = None,
+                    chunk_size: int = 2000, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Recompute every user's streak from task completion history.
+    
+    Args:
+        data_manager: DataManager whose tasks and streaks are used
+        dry_run: Only report the differences, don't write streak.json
+        workers: Worker processes for the rebuild (0 = all CPUs, 1 = in this
+            process, which is what the server uses)
+        today: Day the streaks are computed for (defaults to today)
+        chunk_size: Users per process-pool task
+        progress: Called as progress(stage, done, total) while scanning and rebuilding
+    
+    Returns:
+        Report with task/user counts, per-user changes and whether it was written
+    """
+    today = today or date.today()
+    started = time.perf_counter()
+    
+    completions, tasks_scanned = collect_completions(data_manager.iter_tasks(), progress)
+    rebuilt = rebuild_records(completions, today, workers=workers, chunk_size=chunk_size,
+                              progress=progress)
+    
+    stored = data_manager.load_all_streaks()
+    changes = diff_records(stored, rebuilt)
+    
+    skipped = []
+    if not dry_run and changes:
+        def merge(all_streaks: Dict[str, Dict[str, Any]]):
+            for user_id in changes:
+                if all_streaks.get(user_id) != stored.get(user_id):
+                    # Saved by a request since it was read; the rebuild may predate it
+                    skipped.append(user_id)
+                    continue
+                all_streaks[user_id] = rebuilt[user_id]
+        
+        data_manager.update_all_streaks(merge)
+    
+    return {
+        'dry_run': dry_run,
+        'tasks_scanned': tasks_scanned,
+        'users_rebuilt': len(rebuilt),
+        'users_changed': len(changes),
+        'users_without_tasks': sum(1 for user_id in stored if user_id not in rebuilt),
+        'changes': changes,
+        'written': not dry_run and len(changes) > len(skipped),
+        'skipped_concurrent_updates': len(skipped),
+        'duration_seconds': time.perf_counter() - started
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild streak.json from task completion history")
+    parser.add_argument("--dry-run", action="store_true", help="show the differences without writing")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (default: all CPUs)")
+    args = parser.parse_args()
+    
+    from .data_manager import DataManager
+    
+    def progress(stage: str, done: int, total: Optional[int]):
+        suffix = f"/{total}" if total else ""
+        print(f"\r{stage}: {done}{suffix}", end="" if total is None or done < total else "\n",
+              file=sys.stderr, flush=True)
+    
+    report = rebuild_streaks(DataManager(), dry_run=args.dry_run, workers=args.workers, progress=progress)
+    
+    for user_id, changed in report['changes'].items():
+        fields = ", ".join(f"{field} {before} -> {after}" for field, (before, after) in changed.items())
+        print(f"{user_id}: {fields}")
+    action = "would change" if report['dry_run'] else "changed"
+    print(f"Scanned {report['tasks_scanned']} tasks, rebuilt {report['users_rebuilt']} users, "
+          f"{action} {report['users_changed']} in {report['duration_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
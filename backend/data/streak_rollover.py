@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DailyRolloverJob:
+    """
+    Runs StreakManager.rollover_all at each day boundary.
+    
+    One asyncio task sleeps until the next local midnight and runs the bulk
+    rollover in a thread. It also runs once on start to catch up on days
+    missed while the server was down. Reads before the job has run for the
+    day still see fresh data, since StreakManager applies the rollover
+    lazily on read.
+    """
+    
+    def __init__(self, streak_manager, run_on_start: bool = True):
+        self.streak_manager = streak_manager
+        self.run_on_start = run_on_start
+        self.task: Optional[asyncio.Task] = None
+        
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds: Optional[float] = None
+        self.last_updated_records = 0
+        self.last_error: Optional[str] = None
+    
+    async def start(self):
+        self.task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+    
+    @staticmethod
+    def seconds_until_next_run(now: datetime) -> float:
+        """Seconds from now until the next local midnight"""
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (next_midnight - now).total_seconds()
+    
+    async def _loop(self):
+        if self.run_on_start:
+            await self.run_once()
+        while True:
+            await asyncio.sleep(self.seconds_until_next_run(datetime.now()))
+            await self.run_once()
+    
+    async def run_once(self) -> int:
+        """Run the bulk rollover now; returns the number of records updated"""
+        started = time.perf_counter()
+        try:
+            updated = await asyncio.to_thread(self.streak_manager.rollover_all)
+        except Exception as e:
+            logger.error(f"Streak rollover failed: {e}")
+            self.last_error = str(e)
+            return 0
+        
+        self.runs += 1
+        self.last_run_at = datetime.now()
+        self.last_run_seconds = time.perf_counter() - started
+        self.last_updated_records = updated
+        self.last_error = None
+        logger.info(f"Streak rollover updated {updated} records in {self.last_run_seconds:.2f}s")
+        return updated
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_run_seconds': self.last_run_seconds,
+            'last_updated_records': self.last_updated_records,
+            'last_error': self.last_error,
+            'next_run_in_seconds': self.seconds_until_next_run(datetime.now())
+        }
@@ -0,0 +1,217 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, TextIO, Union
+
+# ID of the HTTP request being handled in this context, added to every log record
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Attributes every LogRecord has; anything else was passed with extra= and is a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_settings(spec: str) -> Dict[str, str]:
+    """Parse "logger=value,other.logger=value" (e.g. from an environment variable)"""
+    settings = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        settings[name.strip()] = value.strip()
+    return settings
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request ID, in the thread that logged them"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records at or below max_level (DEBUG by
+    default), so high-volume debug events can stay enabled in production.
+    More severe records always pass.
+    
+    rates overrides the default rate for a logger and its children, e.g.
+    {"data.data_manager": 0.01}; the most specific name wins.
+    """
+    
+    def __init__(self, rate: float = 1.0, rates: Optional[Dict[str, float]] = None,
+                 max_level: int = logging.DEBUG, rng: Optional[random.Random] = None):
+        super().__init__()
+        self.rate = rate
+        self.rates = dict(rates or {})
+        self.max_level = max_level
+        self.random = (rng or random.Random()).random
+        self.resolved: Dict[str, float] = {}
+        self.dropped = 0
+    
+    def rate_for(self, name: str) -> float:
+        rate = self.resolved.get(name)
+        if rate is None:
+            prefix = name
+            while prefix not in self.rates and "." in prefix:
+                prefix = prefix.rsplit(".", 1)[0]
+            rate = self.resolved[name] = self.rates.get(prefix, self.rate)
+        return rate
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or self.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id and any extra= fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != 'request_id':
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+    
+    The stock prepare() formats the whole record in the logging thread;
+    here only the message arguments are merged (they may not survive the
+    trip to another thread) and tracebacks are rendered to text.
+    """
+    
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # The writer can't keep up; losing records beats blocking requests
+            self.dropped += 1
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: Union[int, str] = "INFO", levels: Optional[Dict[str, Union[int, str]]] = None,
+                      debug_sample_rate: float = 1.0, sample_rates: Optional[Dict[str, float]] = None,
+                      json_format: bool = True,
+                      stream: Optional[TextIO] = None, queue_size: int = 10000) -> QueueListener:
+    """
+    Route all logging through a queue to a single writer thread.
+    
+    Log calls on the request path only filter the record and put it on an
+    in-memory queue; formatting and the blocking write to the stream
+    happen on the listener thread. If the queue is full (the stream can't
+    keep up) records are dropped rather than blocking requests.
+    
+    Args:
+        level: root level
+        levels: per-logger levels, e.g. {"data.data_manager": logging.DEBUG}
+        debug_sample_rate: fraction of DEBUG records kept
+        sample_rates: per-logger overrides of debug_sample_rate
+        json_format: JSON lines if True, else a plain text format
+        stream: where records are written (stderr by default)
+    
+    Returns:
+        The running listener; it is stopped (and the queue flushed) at exit
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if json_format:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(RequestContextFilter())
+    if debug_sample_rate < 1.0 or sample_rates:
+        queue_handler.addFilter(SamplingFilter(debug_sample_rate, sample_rates))
+    
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        if isinstance(existing, _QueueHandler):
+            # Configured before (e.g. on reload): replace rather than log twice
+            root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+    
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener):
+    # QueueListener.stop() fails if the listener was already stopped
+    if listener._thread is not None:
+        listener.stop()
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving each HTTP request an ID for its log records.
+    
+    An incoming X-Request-ID (e.g. from a proxy) is reused, otherwise one
+    is generated; either way it is returned in the X-Request-ID header.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        incoming = next((value for name, value in scope.get("headers", []) if name == REQUEST_ID_HEADER), None)
+        current = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+        token = request_id.set(current)
+        
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (REQUEST_ID_HEADER, current.encode("latin-1"))]}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,410 @@
+"""
+Generate a synthetic dataset at production-like scale.
+
+dummy_data.py seeds a handful of records, which is too few for the O(n)
+scans over tasks, posts and comments to show up in benchmarks or load
+tests. This writes the same six files the app reads (tasks, posts,
+comments, streak, tips, jobs), in the same format, with:
+
+- users whose completion days come in runs and gaps of varying length,
+  some with long breaks and some who stopped using the app
+- several tasks per user, each with a completion history over its lifetime
+- posts from a few prolific users and many occasional ones
+- comment threads with replies nested up to --thread-depth deep
+- streak records built from the task histories, so a streak rebuild
+  finds nothing to change
+
+Titles and text are drawn from the dummy_data templates. The same seed
+and --today always produce the same files. Tasks, posts and comments are
+written as they are generated, so memory stays flat at any scale; for
+the same reason comments are grouped by post rather than interleaved.
+
+Usage (from the backend directory):
+    python -m data.synthetic_data --output /tmp/dataset [--users 1000] [--years 3] [--seed 1]
+
+The output directory can be passed to benchmarks/load_test.py --data-dir.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .completion_bitmap import CompletionBitmap
+from .dummy_data import DUMMY_POSTS, DUMMY_TASKS, DUMMY_TIPS
+from .streak_manager import StreakManager
+
+# Extra habits so users with many tasks don't repeat the same six
+EXTRA_TASKS = [
+    ("Evening Stretch", "Ten minutes of gentle stretching before bed"),
+    ("Journal", "Write a few lines about how the day went"),
+    ("No Screens After 10pm", "Put the phone away an hour before sleep"),
+    ("Eat a Piece of Fruit", "Have at least one piece of fruit with a meal"),
+    ("Take the Stairs", "Skip the elevator at least once today"),
+    ("Practice Gratitude", "Note three things you're grateful for"),
+    ("Tidy Up for 10 Minutes", "Put away anything that's out of place"),
+    ("Strength Training", "Bodyweight exercises or a session at the gym"),
+]
+
+COMMENTS = [
+    "This is so helpful, thank you for sharing!",
+    "I totally agree! Starting small made all the difference for me too.",
+    "Have you tried doing it at the same time every day? That helped me a lot.",
+    "I struggled with the same thing last month. It does get easier.",
+    "Great idea, I'm going to try this tomorrow.",
+    "Same here! Consistency beats intensity every time.",
+    "Thanks, I needed to read this today.",
+    "What worked best for you in the first week?",
+    "I found that pairing it with my morning coffee made it stick.",
+    "Love this. Keep us posted on how it goes!",
+]
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Users that posted at least once follow a Zipf-like distribution
+POSTER_EXPONENT = 1.1
+
+
+def _sentences(texts: List[str]) -> List[str]:
+    return [sentence for text in texts for sentence in SENTENCE_END.split(text) if sentence]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _user_id(rng: random.Random) -> str:
+    alphabet = "0123456789abcdefghijklmnopqrstuvwxyz"
+    return "user_" + "".join(rng.choice(alphabet) for _ in range(9))
+
+
+class SyntheticDataset:
+    """
+    A seeded dataset generator; each part has its own random stream, so
+    e.g. changing the number of posts leaves the tasks unchanged.
+    
+    Args:
+        seed: Seed for every random stream
+        users: Number of users
+        tasks_per_user: Mean number of tasks per user
+        years: Length of the longest histories; users join at any point in it
+        posts: Number of forum posts
+        comments_per_post: Mean comments per post (a few posts get many more)
+        thread_depth: Maximum reply nesting below a top-level comment
+        tips: Number of tips
+        today: Last day of the history (defaults to today)
+    """
+    
+    def __init__(self, seed: int = 1, users: int = 1000, tasks_per_user: int = 5, years: float = 3,
+                 posts: int = 2000, comments_per_post: float = 6, thread_depth: int = 8, tips: int = 50,
+                 today: Optional[date] = None):
+        self.seed = seed
+        self.users = users
+        self.tasks_per_user = tasks_per_user
+        self.years = years
+        self.posts = posts
+        self.comments_per_post = comments_per_post
+        self.thread_depth = thread_depth
+        self.tips = tips
+        self.today = today or date.today()
+        self.first_day = self.today - timedelta(days=max(1, int(years * 365.25)))
+        
+        self.task_templates = [(task["title"], task["description"]) for task in DUMMY_TASKS] + EXTRA_TASKS
+        self.post_sentences = _sentences([post["content"] for post in DUMMY_POSTS])
+        self.post_titles = [post["title"] for post in DUMMY_POSTS]
+        self.user_ids = [_user_id(self._random("user", index)) for index in range(users)]
+    
+    def _random(self, *stream) -> random.Random:
+        # String seeds are hashed with SHA-512, so they're stable across runs
+        return random.Random(":".join(str(part) for part in (self.seed,) + stream))
+    
+    def _active_runs(self, rng: random.Random) -> List[Tuple[int, int]]:
+        """A user's completion days as (first, last) day ordinals of each run"""
+        start = self.first_day.toordinal()
+        end = self.today.toordinal()
+        # A third of users were there from the start, so some histories span every year
+        if rng.random() > 0.33:
+            start = rng.randint(start, end)
+        # Some users stopped using the app a while ago
+        if rng.random() < 0.2:
+            end = rng.randint(start, end)
+        
+        consistency = rng.betavariate(2, 2)
+        mean_run = 1 + consistency * 20
+        mean_gap = 1 + (1 - consistency) * 6
+        runs = []
+        day = start
+        while day <= end:
+            length = 1 + int(rng.expovariate(1 / mean_run))
+            runs.append((day, min(day + length - 1, end)))
+            gap = 1 + int(rng.expovariate(1 / mean_gap))
+            if rng.random() < 0.03:
+                # A holiday, an illness, a busy quarter
+                gap += rng.randint(30, 180)
+            day += length + gap
+        return runs
+    
+    def _user_tasks(self, user_id: str, rng: random.Random,
+                    runs: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Tasks whose completion histories together cover every active day"""
+        days = [day for first, last in runs for day in range(first, last + 1)]
+        iso = [date.fromordinal(day).isoformat() for day in days]
+        first, last = days[0], days[-1]
+        count = max(1, rng.randint(self.tasks_per_user // 2, self.tasks_per_user * 3 // 2))
+        templates = rng.sample(self.task_templates, min(count, len(self.task_templates)))
+        templates += [rng.choice(self.task_templates) for _ in range(count - len(templates))]
+        
+        # The user's main habit lasts as long as they do and is done on any
+        # active day the other tasks weren't, so it goes last
+        spans = [(first, last)]
+        for _ in templates[1:]:
+            span_start = rng.randint(first, last)
+            spans.append((span_start, min(last, span_start + int(rng.expovariate(1 / 120)))))
+        histories = [None] * count
+        covered = set()
+        for index in list(range(1, count)) + [0]:
+            span_start, span_end = spans[index]
+            rate = rng.uniform(0.3, 0.9)
+            history = {}
+            for position in range(bisect_left(days, span_start), bisect_right(days, span_end)):
+                if index == 0 and position not in covered:
+                    history[iso[position]] = True
+                elif rng.random() < rate:
+                    history[iso[position]] = True
+                    covered.add(position)
+                elif rng.random() < 0.05:
+                    # Ticked and then unticked
+                    history[iso[position]] = False
+            histories[index] = history
+        
+        today = self.today.isoformat()
+        tasks = []
+        for (title, description), (_, span_end), history in zip(templates, spans, histories):
+            tasks.append({
+                "id": _uuid(rng),
+                "title": title,
+                "description": description,
+                "completed": history.get(today, False),
+                "due_date": date.fromordinal(span_end),
+                "completion_history": history,
+                "user_id": user_id
+            })
+        return tasks
+    
+    def iter_users(self) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """(tasks, streak record) for each user"""
+        streak_manager = StreakManager(None)
+        for index, user_id in enumerate(self.user_ids):
+            rng = self._random("tasks", index)
+            runs = self._active_runs(rng)
+            origin = runs[0][0]
+            bits = 0
+            for first, last in runs:
+                bits |= ((1 << (last - first + 1)) - 1) << (first - origin)
+            completions = CompletionBitmap(date.fromordinal(origin), bits)
+            yield self._user_tasks(user_id, rng, runs), streak_manager.build_streak_record(completions, self.today)
+    
+    def _timestamps(self, rng: random.Random, count: int) -> List[datetime]:
+        start = datetime.combine(self.first_day, datetime.min.time())
+        seconds = (self.today - self.first_day).days * 86400
+        return sorted(start + timedelta(seconds=rng.uniform(0, seconds)) for _ in range(count))
+    
+    def _comments(self, rng: random.Random, post: Dict[str, Any], pick_user) -> List[Dict[str, Any]]:
+        count = int(rng.expovariate(1 / self.comments_per_post)) if self.comments_per_post > 0 else 0
+        if rng.random() < 0.01:
+            # The occasional post everyone replies to
+            count *= 20
+        end = datetime.combine(self.today, datetime.min.time())
+        created_at = post["created_at"]
+        comments = []
+        depths = []
+        for _ in range(count):
+            created_at = min(end, created_at + timedelta(seconds=rng.expovariate(1 / 7200)))
+            parent = None
+            if comments and rng.random() < 0.6:
+                # Half the replies continue the latest exchange, which builds deep chains
+                parent = len(comments) - 1 if rng.random() < 0.5 else rng.randrange(len(comments))
+                if depths[parent] >= self.thread_depth:
+                    parent = None
+            if parent is not None:
+                comments[parent]["replies_count"] += 1
+            depths.append(depths[parent] + 1 if parent is not None else 0)
+            comments.append({
+                "id": _uuid(rng),
+                "post_id": post["id"],
+                "user_id": pick_user(),
+                "content": rng.choice(COMMENTS),
+                "parent_id": comments[parent]["id"] if parent is not None else None,
+                "created_at": created_at,
+                "replies_count": 0,
+                "reactions_count": int(rng.paretovariate(2)) - 1,
+                "user_reacted": rng.random() < 0.1
+            })
+        return comments
+    
+    def iter_posts(self) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """(post, its comments) in the order the posts were created"""
+        rng = self._random("posts")
+        posters = list(self.user_ids)
+        rng.shuffle(posters)
+        weights = list(accumulate(1 / (rank + 1) ** POSTER_EXPONENT for rank in range(len(posters))))
+        
+        def pick_user() -> str:
+            return rng.choices(posters, cum_weights=weights)[0]
+        
+        for created_at in self._timestamps(rng, self.posts):
+            post = {
+                "id": _uuid(rng),
+                "title": rng.choice(self.post_titles),
+                "content": " ".join(rng.sample(self.post_sentences, rng.randint(2, 4))),
+                "user_id": pick_user(),
+                "author": None,
+                "category": None,
+                "created_at": created_at,
+                "comments_count": 0,
+                "reactions_count": int(rng.paretovariate(1.2)) - 1,
+                "user_reacted": rng.random() < 0.2
+            }
+            comments = self._comments(rng, post, pick_user)
+            post["comments_count"] = len(comments)
+            yield post, comments
+    
+    def iter_tips(self) -> Iterator[Dict[str, Any]]:
+        rng = self._random("tips")
+        for created_at in self._timestamps(rng, self.tips):
+            template = rng.choice(DUMMY_TIPS)
+            yield {
+                "id": _uuid(rng),
+                "content": template["content"],
+                "author": template["author"],
+                "category": template["category"],
+                "likes": int(rng.paretovariate(1.5) * 10),
+                "created_at": created_at,
+                "is_featured": rng.random() < 0.2
+            }
+
+
+def _serialize(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
+
+
+class _JsonArrayWriter:
+    """Writes a JSON array one record at a time, laid out like DataManager's indent=2 files"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path + ".tmp", "w")
+        self.file.write("[")
+        self.count = 0
+    
+    def write(self, record: Dict[str, Any]):
+        text = json.dumps(record, default=_serialize, indent=2).replace("\n", "\n  ")
+        self.file.write(("," if self.count else "") + "\n  " + text)
+        self.count += 1
+    
+    def close(self):
+        self.file.write("\n]" if self.count else "]")
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+def write_dataset(dataset: SyntheticDataset, directory: str, progress=None) -> Dict[str, Any]:
+    """
+    Write the dataset's files into directory, replacing any already there.
+    
+    Args:
+        dataset: What to generate
+        directory: Where to write tasks.json, posts.json, etc. (used as the app's database directory)
+        progress: Called as progress(stage, done, total) while generating
+    
+    Returns:
+        Record counts, file sizes and the time taken
+    """
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    
+    def path(name: str) -> str:
+        return os.path.join(directory, name)
+    
+    tasks = _JsonArrayWriter(path("tasks.json"))
+    streaks = {}
+    for user_id, (user_tasks, record) in zip(dataset.user_ids, dataset.iter_users()):
+        for task in user_tasks:
+            tasks.write(task)
+        streaks[user_id] = record
+        if progress and len(streaks) % 1000 == 0:
+            progress('users', len(streaks), dataset.users)
+    tasks.close()
+    with open(path("streak.json"), "w") as f:
+        json.dump(streaks, f, default=_serialize, indent=2)
+    
+    posts = _JsonArrayWriter(path("posts.json"))
+    comments = _JsonArrayWriter(path("comments.json"))
+    for post, post_comments in dataset.iter_posts():
+        posts.write(post)
+        for comment in post_comments:
+            comments.write(comment)
+        if progress and posts.count % 1000 == 0:
+            progress('posts', posts.count, dataset.posts)
+    posts.close()
+    comments.close()
+    
+    tips = _JsonArrayWriter(path("tips.json"))
+    for tip in dataset.iter_tips():
+        tips.write(tip)
+    tips.close()
+    with open(path("jobs.json"), "w") as f:
+        json.dump([], f)
+    
+    files = ("tasks.json", "posts.json", "comments.json", "streak.json", "tips.json", "jobs.json")
+    return {
+        'users': len(streaks),
+        'tasks': tasks.count,
+        'posts': posts.count,
+        'comments': comments.count,
+        'tips': tips.count,
+        'bytes': {name: os.path.getsize(path(name)) for name in files},
+        'duration_seconds': time.perf_counter() - started
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic dataset in the app's storage format")
+    parser.add_argument("--output", required=True, help="directory to write the JSON files to")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks-per-user", type=int, default=5, help="mean tasks per user")
+    parser.add_argument("--years", type=float, default=3, help="length of the longest histories")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments-per-post", type=float, default=6, help="mean comments per post")
+    parser.add_argument("--thread-depth", type=int, default=8, help="maximum reply nesting")
+    parser.add_argument("--tips", type=int, default=50)
+    parser.add_argument("--today", type=date.fromisoformat, help="last day of the history, YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+    
+    def progress(stage: str, done: int, total: int):
+        print(f"\r{stage}: {done}/{total}", end="" if done < total else "\n", file=sys.stderr, flush=True)
+    
+    dataset = SyntheticDataset(seed=args.seed, users=args.users, tasks_per_user=args.tasks_per_user,
+                               years=args.years, posts=args.posts, comments_per_post=args.comments_per_post,
+                               thread_depth=args.thread_depth, tips=args.tips, today=args.today)
+    report = write_dataset(dataset, args.output, progress)
+    
+    for name, size in report['bytes'].items():
+        print(f"{name:14} {size / 1e6:10.1f} MB")
+    print(f"Wrote {report['users']} users, {report['tasks']} tasks, {report['posts']} posts, "
+          f"{report['comments']} comments and {report['tips']} tips to {args.output} "
+          f"in {report['duration_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import atexit
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, List, Optional
+
+from .http_metrics import RouteResolver
+from .structured_logging import request_id
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+# OTLP status codes; OK is only set explicitly, which nothing here does
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+SCOPE_NAME = "tendril.tracing"
+
+# Innermost open span in this context. Follows asyncio tasks and
+# asyncio.to_thread; pass contextvars.copy_context().run to executors to
+# carry it into other threads.
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation in a trace; a context manager that makes itself current"""
+    
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'kind', 'attributes',
+                 'start_ns', 'end_ns', 'error', '_token')
+    
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[int], kind: int,
+                 attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    @property
+    def seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+    
+    def __enter__(self) -> "Span":
+        self.trace.spans.append(self)
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        return False
+
+
+class _NoSpan:
+    """Stands in for a span outside any trace, so instrumented code costs next to nothing"""
+    
+    __slots__ = ()
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def __enter__(self) -> "_NoSpan":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """The spans of one request; appended to from any thread (list.append is atomic)"""
+    
+    __slots__ = ('trace_id', 'spans')
+    
+    def __init__(self):
+        self.trace_id = random.getrandbits(128) or 1
+        self.spans: List[Span] = []
+
+
+def start_span(name: str, kind: int = INTERNAL, **attributes) -> Any:
+    """
+    A child of the current span, for use as `with start_span("name"):`.
+    
+    Outside a trace (background jobs, scripts, tests) this returns a shared
+    no-op span, so instrumentation can stay in place everywhere.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NO_SPAN
+    return Span(name, parent.trace, parent.span_id, kind, attributes)
+
+
+def record_span(name: str, start_ns: int, kind: int = INTERNAL, error: Optional[str] = None,
+                **attributes):
+    """
+    Add a span that started at start_ns (time.time_ns()) and ends now.
+    
+    For work a `with` block can't wrap, such as an LLM stream consumed
+    across a generator's yields.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = Span(name, parent.trace, parent.span_id, kind, attributes)
+    span.start_ns = start_ns
+    span.end_ns = time.time_ns()
+    span.error = error
+    parent.trace.spans.append(span)
+
+
+def traced(name: str, kind: int = INTERNAL) -> Callable:
+    """Decorator running each call of the function in a span"""
+    def decorate(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with start_span(name, kind):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+def to_otlp(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """
+    Encode finished spans as an OTLP/JSON ExportTraceServiceRequest, the
+    format the OpenTelemetry Collector's file exporter and otlpjsonfile
+    receiver use (IDs in hex, 64-bit integers as strings).
+    """
+    encoded = []
+    for span in spans:
+        if span.end_ns is None:
+            continue
+        entry = {
+            'traceId': f"{span.trace.trace_id:032x}",
+            'spanId': f"{span.span_id:016x}",
+            'parentSpanId': f"{span.parent_id:016x}" if span.parent_id else "",
+            'name': span.name,
+            'kind': span.kind,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [_attribute(key, value) for key, value in span.attributes.items()],
+            'status': {'code': STATUS_UNSET}
+        }
+        if span.error:
+            entry['status'] = {'code': STATUS_ERROR, 'message': span.error}
+        encoded.append(entry)
+    return {'resourceSpans': [{
+        'resource': {'attributes': [_attribute('service.name', service_name)]},
+        'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': encoded}]
+    }]}
+
+
+def span_tree(spans: List[Span]) -> Dict[str, Any]:
+    """Nested {name, ms, attributes, children} view of a trace, for logs and the status endpoint"""
+    nodes = {}
+    root = None
+    for span in spans:
+        node = {'name': span.name, 'ms': round(span.seconds * 1000, 3)}
+        if span.attributes:
+            node['attributes'] = span.attributes
+        if span.error:
+            node['error'] = span.error
+        if span.end_ns is None:
+            node['unfinished'] = True
+        node['children'] = []
+        nodes[span.span_id] = node
+    for span in spans:
+        parent = nodes.get(span.parent_id)
+        if parent is not None:
+            parent['children'].append(nodes[span.span_id])
+        elif root is None:
+            root = nodes[span.span_id]
+    return root or {}
+
+
+class FileSpanExporter:
+    """
+    Append traces to a local file as OTLP/JSON, one export request per line.
+    
+    Encoding and writing happen on a background thread; when it falls
+    behind, traces are dropped rather than slowing requests down.
+    """
+    
+    def __init__(self, path: str, service_name: str = "tendril-api", queue_size: int = 1000):
+        self.path = path
+        self.service_name = service_name
+        self.queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+    
+    def export(self, spans: List[Span]):
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as output:
+            while True:
+                spans = self.queue.get()
+                if spans is None:
+                    break
+                output.write(json.dumps(to_otlp(spans, self.service_name), default=str) + "\n")
+                self.exported += 1
+                if self.queue.empty():
+                    output.flush()
+    
+    def close(self):
+        """Write out queued traces and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+
+
+class Tracer:
+    """
+    Collects each request's spans and decides what happens to them once
+    the request finishes.
+    
+    - Traces with any span at or over slow_seconds go to the slow request
+      log with their full span tree, and the last max_slow_traces are kept
+      for /api/traces/status.
+    - If an exporter is set, slow traces and a sample_rate fraction of the
+      rest are exported.
+    """
+    
+    def __init__(self, slow_seconds: float = 1.0, exporter: Optional[FileSpanExporter] = None,
+                 sample_rate: float = 1.0, max_slow_traces: int = 20,
+                 rng: Optional[random.Random] = None):
+        self.slow_seconds = slow_seconds
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.random = (rng or random.Random()).random
+        self.slow_traces = deque(maxlen=max_slow_traces)
+        self.traces = 0
+        self.slow = 0
+    
+    def start_trace(self, name: str, kind: int = SERVER, **attributes) -> Span:
+        """The root span of a new trace; spans started under it join the trace"""
+        return Span(name, Trace(), None, kind, attributes)
+    
+    def finish_trace(self, root: Span):
+        spans = list(root.trace.spans)
+        self.traces += 1
+        slowest = max(spans, key=lambda span: span.seconds)
+        slow = slowest.seconds >= self.slow_seconds
+        if slow:
+            self.slow += 1
+            tree = span_tree(spans)
+            entry = {'trace_id': f"{root.trace.trace_id:032x}", 'request_id': request_id.get(),
+                     'seconds': round(root.seconds, 6), 'slowest_span': slowest.name, 'spans': tree}
+            self.slow_traces.append(entry)
+            logger.warning(f"Slow request {root.name} took {root.seconds * 1000:.0f} ms "
+                           f"(slowest span {slowest.name}, {slowest.seconds * 1000:.0f} ms)",
+                           extra={'trace_id': entry['trace_id'], 'span_tree': tree})
+        if self.exporter is not None and (slow or self.random() < self.sample_rate):
+            self.exporter.export(spans)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'traces': self.traces,
+            'slow_traces': self.slow,
+            'slow_seconds': self.slow_seconds,
+            'sample_rate': self.sample_rate,
+            'exported': self.exporter.exported if self.exporter else 0,
+            'export_dropped': self.exporter.dropped if self.exporter else 0,
+            'recent_slow': list(self.slow_traces)
+        }
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware giving each HTTP request a trace.
+    
+    Installed innermost, so its root span is the handler itself (with
+    routing, validation and serialization): spans opened by DataManager,
+    StreakManager and the rewriter during the request become its children.
+    The root span is named after the route template, like the metrics.
+    """
+    
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+        self.resolver: Optional[RouteResolver] = None
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if self.resolver is None:
+            self.resolver = RouteResolver([route.path for route in scope["app"].routes if hasattr(route, "path")])
+        route = self.resolver.resolve(scope["path"])
+        root = self.tracer.start_trace(f"{scope['method']} {route}", **{
+            'http.request.method': scope["method"],
+            'http.route': route,
+            'url.path': scope["path"],
+        })
+        if request_id.get():
+            root.set_attribute('request.id', request_id.get())
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute('http.response.status_code', message["status"])
+                if message["status"] >= 500:
+                    root.error = f"HTTP {message['status']}"
+            await send(message)
+        
+        try:
+            with root:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = scope.get("endpoint")
+            if endpoint is not None:
+                root.set_attribute('code.function', endpoint.__name__)
+            self.tracer.finish_trace(root)
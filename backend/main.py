@@ -1,20 +1,52 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime, date, timedelta
 import uvicorn
 import uuid
 import time
 import os
+import json
+import asyncio
+import logging
+import tempfile
+import re
+import multiprocessing
+import sys
 from dotenv import load_dotenv
+from data.structured_logging import configure_logging, parse_settings, RequestIdMiddleware
 from data.data_manager import DataManager
+from data.storage_stats import StorageProfileMiddleware
+from data.request_profiler import RequestProfiler, ProfileMiddleware
+from data.tracing import Tracer, FileSpanExporter, TracingMiddleware
 from data.streak_manager import StreakManager
+from data.streak_rollover import DailyRolloverJob
+from data.streak_rebuild import rebuild_streaks
+from data.streak_leaderboard import StreakLeaderboard, METRICS
+from data.completion_heatmap import CompletionHeatmap
+from data.rate_limiter import RateLimiter, SharedRateLimiter
+from data.route_limiter import RouteLimit, RouteLimitMiddleware
+from data.http_metrics import HttpMetrics, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from data.compassionate_rewriter import CompassionateRewriter
+from data.circuit_breaker import CircuitBreaker
+from data.moderation_queue import ModerationQueue, PENDING_REWRITE, UNCHANGED
 
 # Load environment variables from .env file in root directory
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
 
+# Structured logging through a background writer thread. LOG_LEVELS and
+# LOG_SAMPLE_RATES take "logger=value,..." lists, e.g. "data.data_manager=DEBUG"
+configure_logging(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    levels={name: level.upper() for name, level in parse_settings(os.environ.get("LOG_LEVELS", "")).items()},
+    debug_sample_rate=float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01")),
+    sample_rates={name: float(rate) for name, rate in parse_settings(os.environ.get("LOG_SAMPLE_RATES", "")).items()},
+    json_format=os.environ.get("LOG_FORMAT", "json") == "json"
+)
+logger = logging.getLogger("api")
+
 app = FastAPI(title="Tendril Wellness API", version="1.0.0")
 
 # CORS configuration for frontend
@@ -46,7 +78,107 @@ if vercel_url:
         f"https://{vercel_url}/",
     ])
 
-print(f"Allowed origins: {allowed_origins}")
+logger.info("CORS configured", extra={'allowed_origins': allowed_origins})
+
+# Initialize data manager
+data_manager = DataManager()
+
+# Middleware added first runs innermost. Every request is traced (handler,
+# storage, streak and rewriter spans); traces with a span slower than
+# TRACE_SLOW_SECONDS are logged with their span tree, and with TRACE_FILE
+# set, slow traces plus a TRACE_SAMPLE_RATE fraction of the rest are written
+# there as OTLP/JSON lines
+trace_file = os.environ.get("TRACE_FILE")
+tracer = Tracer(
+    slow_seconds=float(os.environ.get("TRACE_SLOW_SECONDS", "1.0")),
+    exporter=FileSpanExporter(trace_file) if trace_file else None,
+    sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+)
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
+# Opt-in cProfile of single requests:
+# send X-Profile-Token: $PROFILE_TOKEN (or ?profile_token=), or set
+# PROFILE_SAMPLE_RATE. Not installed at all unless one of them is set
+profile_token = os.environ.get("PROFILE_TOKEN")
+profile_sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+request_profiler = None
+if profile_token or profile_sample_rate > 0:
+    request_profiler = RequestProfiler(
+        os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "tendril-profiles")),
+        token=profile_token,
+        sample_rate=profile_sample_rate,
+        max_profiles=int(os.environ.get("PROFILE_MAX_FILES", "50")),
+        skip_prefixes=("/api/profiles",)
+    )
+    app.add_middleware(ProfileMiddleware, profiler=request_profiler)
+
+# Storage time and bytes per request, as a Server-Timing header and in the
+# slow request log at /api/storage/status
+app.add_middleware(StorageProfileMiddleware, stats=data_manager.stats, slow_seconds=0.5)
+
+def in_worker_process() -> bool:
+    """
+    Whether this process may be one of several workers. uvicorn --workers
+    spawns each worker with multiprocessing and gunicorn forks them, and
+    neither sets WEB_CONCURRENCY, so check for both as well.
+    """
+    return (int(os.environ.get("WEB_CONCURRENCY", "1")) > 1
+            or multiprocessing.parent_process() is not None
+            or "gunicorn" in sys.modules)
+
+# With several workers, rate limit counts must be shared through a file, or
+# every worker allows the full rate on its own
+rate_limit_file = os.environ.get("RATE_LIMIT_FILE")
+if not rate_limit_file and in_worker_process():
+    rate_limit_file = os.path.join(tempfile.gettempdir(), "tendril-rate-limits.bin")
+    logger.warning("Running as a worker process without RATE_LIMIT_FILE; sharing rate limits through "
+                   "the default file", extra={'rate_limit_file': rate_limit_file})
+
+def write_limit(method: str, path: str, max_requests: int, max_in_flight: int) -> RouteLimit:
+    """
+    Rate limited and capped write route. The rate is shared by all workers
+    when rate_limit_file is set (one file per route); the in-flight cap
+    bounds each process's own load, so it stays per process.
+    """
+    limiter = None
+    if rate_limit_file:
+        slug = re.sub(r"[^a-z0-9]+", "-", f"{method} {path}".lower()).strip("-")
+        limiter = SharedRateLimiter(f"{rate_limit_file}.{slug}", max_requests=max_requests,
+                                    window_seconds=60, num_slots=1 << 14)
+    return RouteLimit(method, path, max_requests=max_requests, max_in_flight=max_in_flight, limiter=limiter)
+
+# Concurrent streams per stream route; the rewriter's stream pool is sized to match
+STREAM_MAX_IN_FLIGHT = 16
+
+# Per-route limits, enforced before routing so shed requests never reach a
+# handler. LLM-backed analysis routes are capped on concurrency (their
+# per-user rate is enforced in the handlers, where user_id is known); writes
+# rewrite whole JSON files, so they are rate limited and capped too.
+# Requests without a user_id are keyed by client address, which behind a
+# proxy needs uvicorn --proxy-headers (X-Forwarded-For) to tell clients apart.
+route_limits = [
+    # The analyze routes take user_id in the JSON body
+    RouteLimit("POST", "/api/posts/analyze", max_in_flight=16, max_in_flight_per_key=2, key_from_body=True),
+    RouteLimit("POST", "/api/comments/analyze", max_in_flight=16, max_in_flight_per_key=2, key_from_body=True),
+    RouteLimit("POST", "/api/posts/analyze/stream", max_in_flight=STREAM_MAX_IN_FLIGHT, max_in_flight_per_key=2,
+               key_from_body=True),
+    RouteLimit("POST", "/api/comments/analyze/stream", max_in_flight=STREAM_MAX_IN_FLIGHT, max_in_flight_per_key=2,
+               key_from_body=True),
+    RouteLimit("POST", "/api/moderation/analyze-batch", max_in_flight=2, max_in_flight_per_key=1, key_from_body=True),
+    write_limit("POST", "/api/posts", max_requests=20, max_in_flight=4),
+    write_limit("POST", "/api/posts/{post_id}/comments", max_requests=30, max_in_flight=4),
+    write_limit("POST", "/api/posts/{post_id}/react", max_requests=60, max_in_flight=8),
+    write_limit("POST", "/api/comments/{comment_id}/react", max_requests=60, max_in_flight=8),
+    write_limit("POST", "/api/tips", max_requests=10, max_in_flight=2),
+    write_limit("POST", "/api/tasks", max_requests=60, max_in_flight=8),
+    write_limit("PUT", "/api/tasks/{task_id}", max_requests=60, max_in_flight=8),
+    write_limit("DELETE", "/api/tasks/{task_id}", max_requests=60, max_in_flight=8),
+    write_limit("PUT", "/api/tasks/{task_id}/complete/{target_date}", max_requests=120, max_in_flight=8),
+    RouteLimit("POST", "/api/streak/rebuild", max_in_flight=1),
+]
+
+# Added before CORS so CORS wraps it and 429/503 responses carry CORS headers
+app.add_middleware(RouteLimitMiddleware, limits=route_limits)
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,50 +190,58 @@ app.add_middleware(
     max_age=86400,  # Cache preflight requests for 24 hours
 )
 
-# Simple Rate Limiter for Compassionate Rewriter
-class RateLimiter:
-    def __init__(self, max_requests: int = 10, window_seconds: int = 60):
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.requests = {}  # user_id -> list of timestamps
-    
-    def is_allowed(self, user_id: str) -> bool:
-        """Check if user is allowed to make a request"""
-        now = time.time()
-        
-        # Clean old requests outside the window
-        if user_id in self.requests:
-            self.requests[user_id] = [
-                timestamp for timestamp in self.requests[user_id]
-                if now - timestamp < self.window_seconds
-            ]
-        else:
-            self.requests[user_id] = []
-        
-        # Check if user has exceeded the limit
-        if len(self.requests[user_id]) >= self.max_requests:
-            return False
-        
-        # Add current request
-        self.requests[user_id].append(now)
-        return True
-    
-    def get_remaining_requests(self, user_id: str) -> int:
-        """Get remaining requests for a user"""
-        now = time.time()
-        
-        if user_id in self.requests:
-            # Clean old requests
-            self.requests[user_id] = [
-                timestamp for timestamp in self.requests[user_id]
-                if now - timestamp < self.window_seconds
-            ]
-            return max(0, self.max_requests - len(self.requests[user_id]))
-        
-        return self.max_requests
-
-# Initialize rate limiter (10 requests per minute per user)
-rate_limiter = RateLimiter(max_requests=10, window_seconds=60)
+# Outside CORS and the route limits, so every request is counted, including
+# CORS preflights and requests shed by the limits
+http_metrics = HttpMetrics()
+app.add_middleware(MetricsMiddleware, metrics=http_metrics)
+# Outermost, so every log record of a request carries its ID
+app.add_middleware(RequestIdMiddleware)
+
+# Initialize rate limiter (10 requests per minute per user). With several
+# workers the counts must be shared, or every worker allows its own 10
+if rate_limit_file:
+    rate_limiter = SharedRateLimiter(rate_limit_file, max_requests=10, window_seconds=60)
+else:
+    rate_limiter = RateLimiter(max_requests=10, window_seconds=60)
+
+def enforce_rate_limit(user_id: str, cost: int = 1) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """
+    Count a rate-limited request for user_id, raising 429 when over the limit
+    cost is the number of LLM rewrites the request may make (one per flagged batch item)
+    Returns the rate limit info for the response body and RateLimit-* headers
+    """
+    if cost > rate_limiter.max_requests:
+        # Would never fit in a window, so there's no point telling the client to retry
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": f"This request needs {cost} rewrites but at most {rate_limiter.max_requests} "
+                           f"are allowed every {rate_limiter.window_seconds} seconds. Send fewer items per batch.",
+                "remaining_requests": rate_limiter.get_remaining_requests(user_id),
+                "window_seconds": rate_limiter.window_seconds
+            }
+        )
+    result = rate_limiter.check(user_id, cost)
+    headers = RateLimiter.headers(result)
+    if not result['allowed']:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": f"Too many analysis requests. Please wait {result['retry_after_seconds']} seconds before trying again.",
+                "remaining_requests": 0,
+                "retry_after_seconds": result['retry_after_seconds'],
+                "window_seconds": rate_limiter.window_seconds
+            },
+            headers=headers
+        )
+    rate_limit = {
+        "remaining_requests": result['remaining'],
+        "max_requests": rate_limiter.max_requests,
+        "window_seconds": rate_limiter.window_seconds
+    }
+    return rate_limit, headers
 
 # Pydantic models
 class Task(BaseModel):
@@ -154,6 +294,7 @@ class Tip(BaseModel):
     likes: int = 0
     created_at: Optional[datetime] = None
     is_featured: bool = False
+    moderation_status: Optional[str] = None
 
 class PostAnalysisRequest(BaseModel):
     content: str
@@ -163,6 +304,20 @@ class CommentAnalysisRequest(BaseModel):
     content: str
     user_id: Optional[str] = None
 
+class BatchAnalysisItem(BaseModel):
+    id: Optional[str] = None
+    content: str
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[BatchAnalysisItem]
+    rewrite: bool = False
+    max_concurrent_rewrites: int = 4
+    user_id: Optional[str] = None
+
+# Upper bounds for batch moderation requests
+MAX_BATCH_ITEMS = 10000
+MAX_BATCH_REWRITE_CONCURRENCY = 8
+
 # Calendar response model for date-specific tasks
 class CalendarDayResponse(BaseModel):
     date: date
@@ -171,10 +326,36 @@ class CalendarDayResponse(BaseModel):
     total_count: int
     completion_rate: float
 
-# Initialize data manager and streak manager
-data_manager = DataManager()
-streak_manager = StreakManager(data_manager)
-compassionate_rewriter = CompassionateRewriter()
+# Initialize streak manager
+streak_leaderboard = StreakLeaderboard()
+streak_version = data_manager.streak_version()
+streak_leaderboard.load(data_manager.load_all_streaks(), streak_version)
+streak_manager = StreakManager(data_manager, streak_leaderboard)
+completion_heatmap = CompletionHeatmap(data_manager)
+compassionate_rewriter = CompassionateRewriter(max_concurrent_streams=2 * STREAM_MAX_IN_FLIGHT)
+moderation_queue = ModerationQueue(data_manager, compassionate_rewriter)
+streak_rollover = DailyRolloverJob(streak_manager)
+
+http_metrics.add_gauge("moderation_queue_depth", "Rewrite jobs waiting in the moderation queue",
+                       lambda: moderation_queue.queue.qsize() if moderation_queue.queue else 0)
+http_metrics.add_gauge("rewriter_circuit_open", "1 while the LLM rewriter circuit breaker is not closed",
+                       lambda: int(compassionate_rewriter.circuit_breaker.state != CircuitBreaker.CLOSED))
+
+@app.on_event("startup")
+async def start_moderation_queue():
+    await moderation_queue.start()
+
+@app.on_event("shutdown")
+async def stop_moderation_queue():
+    await moderation_queue.stop()
+
+@app.on_event("startup")
+async def start_streak_rollover():
+    await streak_rollover.start()
+
+@app.on_event("shutdown")
+async def stop_streak_rollover():
+    await streak_rollover.stop()
 
 # Health check endpoint
 @app.get("/")
@@ -185,6 +366,55 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now()}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request counts, latency histograms and in-flight requests per route, in Prometheus text format"""
+    return PlainTextResponse(http_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/moderation/status")
+async def get_moderation_status():
+    """Get background moderation queue depth, job latency and retries"""
+    return moderation_queue.get_stats()
+
+@app.get("/api/rewriter/status")
+async def get_rewriter_status():
+    """Get compassionate rewriter health (circuit breaker state and fallback rate)"""
+    return compassionate_rewriter.get_stats()
+
+@app.get("/api/storage/status")
+async def get_storage_status():
+    """Get per-method storage calls, bytes, JSON parse/dump time and recent slow requests"""
+    return data_manager.stats.get_stats()
+
+@app.get("/api/limits/status")
+async def get_route_limits_status():
+    """Get per-route requests in flight, admitted and shed by the route limits"""
+    return {limit.name: limit.get_stats() for limit in route_limits}
+
+@app.get("/api/traces/status")
+async def get_tracing_status():
+    """Get trace counts, export counters and the span trees of recent slow requests"""
+    return tracer.get_stats()
+
+def check_profile_token(token: Optional[str]):
+    if request_profiler is None or not request_profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Profiling is not enabled or the token is invalid")
+
+@app.get("/api/profiles")
+async def list_request_profiles(x_profile_token: Optional[str] = Header(None)):
+    """List stored request profiles, newest first (requires X-Profile-Token)"""
+    check_profile_token(x_profile_token)
+    return {"profiles": request_profiler.list_profiles(), "stats": request_profiler.get_stats()}
+
+@app.get("/api/profiles/{profile_id}")
+async def download_request_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Download a request profile in pstats format (requires X-Profile-Token)"""
+    check_profile_token(x_profile_token)
+    path = request_profiler.get_profile_path(profile_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
 
 
 # Tasks endpoints
@@ -214,6 +444,7 @@ async def create_task(task: Task):
     if task.completion_history is None:
         task.completion_history = {}
     data_manager.save_task(task.model_dump())
+    completion_heatmap.invalidate(task.user_id)
     
     return task
 
@@ -243,6 +474,7 @@ async def update_task(task_id: str, task: Task):
         task.completion_history = data_manager.load_tasks(task.user_id)[0].completion_history or {}
     
     data_manager.save_task(task.model_dump())
+    completion_heatmap.invalidate(task.user_id)
     
     return task
 
@@ -251,11 +483,19 @@ async def delete_task(task_id: str, user_id: str):
     if not any(t["id"] == task_id for t in data_manager.load_tasks(user_id)):
         raise HTTPException(status_code=404, detail="Task not found")
     data_manager.delete_task(task_id, user_id)
+    completion_heatmap.invalidate(user_id)
     
     return {"message": "Task deleted"}
 
 
 
+@app.get("/api/tasks/heatmap/{year}")
+async def get_completion_heatmap(year: int, user_id: str):
+    """Get a yearly heatmap of task completions with weekly totals and completion rates"""
+    if not 1970 <= year <= 9998:
+        raise HTTPException(status_code=400, detail="Year must be between 1970 and 9998")
+    return completion_heatmap.get_year(user_id, year)
+
 # New calendar endpoint for date-specific tasks
 @app.get("/api/calendar/{target_date}", response_model=CalendarDayResponse)
 async def get_calendar_day(target_date: date, user_id: str):
@@ -329,6 +569,7 @@ async def update_task_completion(task_id: str, target_date: date, completed: boo
     
     # Save to persistent storage
     data_manager.save_task(task)
+    completion_heatmap.invalidate(user_id)
     
     return {
         "message": f"Task completion updated for {target_date}",
@@ -343,6 +584,59 @@ async def get_streak(user_id: str):
     """Get current streak information"""
     return streak_manager.get_streak_summary(user_id)
 
+def check_streak_metric(metric: str):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(METRICS)}")
+
+async def refresh_streak_leaderboard():
+    """Pick up streak changes made by other workers"""
+    version = data_manager.streak_version()
+    if version != streak_leaderboard.version:
+        await asyncio.to_thread(streak_leaderboard.refresh, version, data_manager.load_all_streaks)
+
+@app.get("/api/streak/leaderboard")
+async def get_streak_leaderboard(metric: str = "current_streak", limit: int = 10):
+    """Get the users with the highest current or longest streaks"""
+    check_streak_metric(metric)
+    await refresh_streak_leaderboard()
+    return streak_leaderboard.top(metric, max(1, min(limit, 100)))
+
+@app.get("/api/streak/percentile")
+async def get_streak_percentile(user_id: str, metric: str = "current_streak"):
+    """Get a user's rank and percentile among all users"""
+    check_streak_metric(metric)
+    await refresh_streak_leaderboard()
+    standing = streak_leaderboard.standing(user_id, metric)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="No streak found for user")
+    return standing
+
+@app.get("/api/streak/stats")
+async def get_streak_stats(metric: str = "current_streak"):
+    """Get aggregate streak stats and a histogram of streak lengths"""
+    check_streak_metric(metric)
+    await refresh_streak_leaderboard()
+    return streak_leaderboard.stats(metric)
+
+@app.get("/api/streak/rollover/status")
+async def get_streak_rollover_status():
+    """Get when the daily streak rollover last ran and how many records it updated"""
+    return streak_rollover.get_stats()
+
+# Changes listed in a rebuild response; the counts always cover every user
+MAX_REBUILD_CHANGES_SHOWN = 100
+
+@app.post("/api/streak/rebuild")
+async def rebuild_all_streaks(dry_run: bool = True):
+    """Recompute every user's streak from task completion history (dry run by default)"""
+    # In this process: forking worker processes from the server isn't safe
+    report = await asyncio.to_thread(rebuild_streaks, data_manager, dry_run, workers=1)
+    if report['written']:
+        version = data_manager.streak_version()
+        streak_leaderboard.load(data_manager.load_all_streaks(), version)
+    report['changes'] = dict(list(report['changes'].items())[:MAX_REBUILD_CHANGES_SHOWN])
+    return report
+
 @app.post("/api/streak/complete")
 async def complete_task_for_streak(completion_date: date, user_id: str):
     """Manually complete a task for streak tracking (for testing purposes)"""
@@ -376,14 +670,16 @@ async def get_random_tip():
 
 @app.post("/api/tips", response_model=Tip)
 async def create_tip(tip: Tip):
-    """Create a new tip, using Groq API for compassionate rewriting if needed"""
+    """Create a new tip, queueing a compassionate rewrite in the background if needed"""
     tip.id = str(uuid.uuid4())
     tip.created_at = datetime.now()
-    # Analyze tip content for negative words and suggest compassionate rewriting
-    analysis = compassionate_rewriter.analyze_and_suggest_rewrite(tip.content)
-    if analysis.get('contains_negative_words') and analysis.get('suggestion_available') and analysis.get('rewritten_text'):
-        tip.content = analysis['rewritten_text']
+    # Scoring is cheap; only the LLM rewrite is deferred. Mild wording that the
+    # worker wouldn't rewrite isn't queued at all
+    needs_rewrite = compassionate_rewriter.needs_rewrite(tip.content)
+    tip.moderation_status = PENDING_REWRITE if needs_rewrite else UNCHANGED
     data_manager.save_tip(tip.model_dump())
+    if needs_rewrite:
+        moderation_queue.submit('tip', tip.id, tip.content)
     return tip
 
 # Forum endpoints
@@ -404,69 +700,99 @@ async def get_post(post_id: str):
     return post
 
 @app.post("/api/posts/analyze")
-async def analyze_post_content(request: PostAnalysisRequest):
+async def analyze_post_content(request: PostAnalysisRequest, response: Response):
     """Analyze post content for negative words and suggest compassionate rewriting"""
     # Use default user ID if not provided
     user_id = request.user_id or "anonymous"
     
     # Check rate limit
-    if not rate_limiter.is_allowed(user_id):
-        remaining_time = rate_limiter.window_seconds
-        raise HTTPException(
-            status_code=429, 
-            detail={
-                "error": "Rate limit exceeded",
-                "message": f"Too many analysis requests. Please wait {remaining_time} seconds before trying again.",
-                "remaining_requests": 0,
-                "window_seconds": rate_limiter.window_seconds
-            }
-        )
+    rate_limit, headers = enforce_rate_limit(user_id)
+    response.headers.update(headers)
     
     # Perform analysis
-    analysis = compassionate_rewriter.analyze_and_suggest_rewrite(request.content)
+    analysis = compassionate_rewriter.analyze_and_suggest_rewrite(request.content, request.user_id)
     
     # Add rate limit info to response
-    remaining_requests = rate_limiter.get_remaining_requests(user_id)
-    analysis["rate_limit"] = {
-        "remaining_requests": remaining_requests,
-        "max_requests": rate_limiter.max_requests,
-        "window_seconds": rate_limiter.window_seconds
-    }
+    analysis["rate_limit"] = rate_limit
     
     return analysis
 
 @app.post("/api/comments/analyze")
-async def analyze_comment_content(request: CommentAnalysisRequest):
+async def analyze_comment_content(request: CommentAnalysisRequest, response: Response):
     """Analyze comment content for negative words and suggest compassionate rewriting"""
     # Use default user ID if not provided
     user_id = request.user_id or "anonymous"
     
     # Check rate limit
-    if not rate_limiter.is_allowed(user_id):
-        remaining_time = rate_limiter.window_seconds
-        raise HTTPException(
-            status_code=429, 
-            detail={
-                "error": "Rate limit exceeded",
-                "message": f"Too many analysis requests. Please wait {remaining_time} seconds before trying again.",
-                "remaining_requests": 0,
-                "window_seconds": rate_limiter.window_seconds
-            }
-        )
+    rate_limit, headers = enforce_rate_limit(user_id)
+    response.headers.update(headers)
     
     # Perform analysis
-    analysis = compassionate_rewriter.analyze_and_suggest_rewrite(request.content)
+    analysis = compassionate_rewriter.analyze_and_suggest_rewrite(request.content, request.user_id)
     
     # Add rate limit info to response
-    remaining_requests = rate_limiter.get_remaining_requests(user_id)
-    analysis["rate_limit"] = {
-        "remaining_requests": remaining_requests,
-        "max_requests": rate_limiter.max_requests,
-        "window_seconds": rate_limiter.window_seconds
-    }
+    analysis["rate_limit"] = rate_limit
     
     return analysis
 
+def format_sse(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def stream_analysis_response(content: str, user_id: Optional[str]) -> StreamingResponse:
+    """Rate-limit, then stream negative-word analysis and rewrite tokens as SSE"""
+    # Check rate limit before the stream starts so a 429 is still a plain response
+    rate_limit, headers = enforce_rate_limit(user_id or "anonymous")
+    
+    def events():
+        for event, data in compassionate_rewriter.stream_analysis(content, user_id):
+            if event in ("analysis", "done"):
+                data = {**data, "rate_limit": rate_limit}
+            yield format_sse(event, data)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
+    )
+
+@app.post("/api/posts/analyze/stream")
+async def analyze_post_content_stream(request: PostAnalysisRequest):
+    """Stream post analysis: negative words first, then rewrite tokens over SSE"""
+    return stream_analysis_response(request.content, request.user_id)
+
+@app.post("/api/comments/analyze/stream")
+async def analyze_comment_content_stream(request: CommentAnalysisRequest):
+    """Stream comment analysis: negative words first, then rewrite tokens over SSE"""
+    return stream_analysis_response(request.content, request.user_id)
+
+@app.post("/api/moderation/analyze-batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze many texts in one request and stream per-item results as NDJSON"""
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items in batch. The maximum is {MAX_BATCH_ITEMS}."
+        )
+    
+    # Detection is cheap; rewrites are charged to the rate limit one per flagged
+    # item, the same as analyzing each item on its own
+    items = [item.model_dump() for item in request.items]
+    analyses = compassionate_rewriter.detect_batch(items)
+    headers = {}
+    flagged = sum(analysis['contains_negative_words'] for analysis in analyses)
+    if request.rewrite and flagged:
+        headers = enforce_rate_limit(request.user_id or "anonymous", cost=flagged)[1]
+    
+    concurrency = max(1, min(request.max_concurrent_rewrites, MAX_BATCH_REWRITE_CONCURRENCY))
+    
+    def results():
+        for result in compassionate_rewriter.analyze_batch(items, request.rewrite, concurrency,
+                                                           analyses=analyses, user_id=request.user_id):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson", headers=headers)
+
 @app.post("/api/posts", response_model=ForumPost)
 async def create_post(post: ForumPost):
     post.id = str(uuid.uuid4())
@@ -516,9 +842,6 @@ async def get_comments(post_id: str):
 @app.post("/api/posts/{post_id}/comments", response_model=Comment)
 async def create_comment(post_id: str, comment: Comment):
     """Create a new comment on a post"""
-    print(f"Creating comment for post: {post_id}")
-    print(f"Comment data: {comment.model_dump()}")
-    
     posts = data_manager.load_posts()
     if not any(post.get("id") == post_id for post in posts):
         raise HTTPException(status_code=404, detail="Post not found")
@@ -545,15 +868,10 @@ async def create_comment(post_id: str, comment: Comment):
         "user_reacted": comment.user_reacted or False
     })
     
-    print(f"Saving comment: {comment_dict}")
-    
     # Save the comment
     data_manager.save_comment(comment_dict)
-    
-    # Verify the comment was saved
-    all_comments = data_manager.load_comments()
-    saved_comment = next((c for c in all_comments if c.get("id") == comment.id), None)
-    print(f"Comment saved successfully: {saved_comment is not None}")
+    logger.debug("Comment created", extra={'post_id': post_id, 'comment_id': comment.id,
+                                           'is_reply': bool(comment.parent_id)})
     
     # Update parent comment's replies count if this is a reply
     if comment.parent_id:
@@ -0,0 +1,43 @@
+"""
+Local stand-in for the Groq client used by the offline tests and benchmarks.
+
+It mimics the small part of the Groq API that CompassionateRewriter uses
+(client.chat.completions.create, optionally with stream=True) and sleeps to simulate upstream latency.
+A fraction of calls can be made slow to reproduce a long latency tail.
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubGroqClient:
+    def __init__(self, latency_seconds: float = 0.0, reply: str = "You are doing your best.",
+                 slow_probability: float = 0.0, slow_latency_seconds: float = 0.0, seed: int = 0):
+        self.latency_seconds = latency_seconds
+        self.reply = reply
+        self.slow_probability = slow_probability
+        self.slow_latency_seconds = slow_latency_seconds
+        self.calls = 0
+        self.requested_max_tokens = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.requested_max_tokens.append(kwargs.get("max_tokens"))
+            is_slow = self._random.random() < self.slow_probability
+        time.sleep(self.slow_latency_seconds if is_slow else self.latency_seconds)
+        if kwargs.get("stream"):
+            return self._stream_reply()
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream_reply(self):
+        # Word-sized chunks, like the token deltas of a streamed completion
+        for word in self.reply.split(" "):
+            time.sleep(self.latency_seconds / 10)
+            delta = SimpleNamespace(content=word + " ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
@@ -0,0 +1,18 @@
+"""
+Working directory helper for tests that use DataManager, whose paths are relative.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def temp_cwd():
+    """Run inside a fresh temporary directory, then restore the cwd and delete it"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(cwd)
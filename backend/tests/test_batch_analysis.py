@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test batch negative-word detection and flagged-only rewrites
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from llm_stub import StubGroqClient
+
+def test_batch_detection_matches_single_detection():
+    """The single-pass batch scan finds the same words as per-text detection"""
+    rewriter = CompassionateRewriter()
+    texts = [
+        "I feel so lazy today",
+        "What a lovely walk",
+        "",
+        "Yikes, what a dumb take. Dumb!",
+        "I messed up and feel gross",
+    ] * 200
+    
+    batch_found = rewriter.contains_negative_words_batch(texts)
+    for text, found in zip(texts, batch_found):
+        _, single_found = rewriter.contains_negative_words(text)
+        assert found == single_found
+
+def test_batch_detection_with_length_changing_lowercase():
+    """'İ' lowercases to two code points; matches still go to the right item"""
+    rewriter = CompassionateRewriter()
+    texts = ['İ' * 16, "I hate it", "ok"]
+    assert rewriter.contains_negative_words_batch(texts) == [[], ['hate'], []]
+
+def test_analyze_batch_rewrites_only_flagged_items():
+    """Only flagged items are sent to the LLM when rewrite is requested"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(latency_seconds=0.01)
+    items = [
+        {'id': 'a', 'content': "I feel so lazy"},
+        {'id': 'b', 'content': "What a lovely walk"},
+        {'id': 'c', 'content': "I'm so useless"},
+        {'id': 'd', 'content': "Yikes"},
+    ]
+    
+    results = list(rewriter.analyze_batch(items, rewrite=True, max_concurrent_rewrites=2))
+    analyses = [r for r in results if r['type'] == 'analysis']
+    rewrites = [r for r in results if r['type'] == 'rewrite']
+    
+    assert [r['id'] for r in analyses] == ['a', 'b', 'c', 'd']
+    # "Yikes" is a known word but too mild to be worth an LLM rewrite
+    assert [r['contains_negative_words'] for r in analyses] == [True, False, True, False]
+    assert analyses[3]['found_words'] == ['yikes']
+    assert sorted(r['id'] for r in rewrites) == ['a', 'c']
+    assert all(r['suggestion_available'] for r in rewrites)
+    assert rewriter.client.calls == 2
+
+if __name__ == "__main__":
+    test_batch_detection_matches_single_detection()
+    test_batch_detection_with_length_changing_lowercase()
+    test_analyze_batch_rewrites_only_flagged_items()
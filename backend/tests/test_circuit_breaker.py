@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the circuit breaker and rule-based fallback rewriter
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.circuit_breaker import CircuitBreaker
+from data.compassionate_rewriter import CompassionateRewriter
+from data.rule_based_rewriter import RuleBasedRewriter
+from llm_stub import StubGroqClient
+
+class FailingGroqClient(StubGroqClient):
+    def create(self, **kwargs):
+        super().create(**kwargs)
+        raise ConnectionError("Groq is down")
+
+def test_breaker_opens_and_recovers():
+    """Breaker opens after the threshold and closes after a good probe"""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    
+    time.sleep(0.06)
+    assert breaker.allow_request()  # half-open probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_slow_calls_trip_breaker():
+    """Calls over the latency threshold count as failures"""
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=0.5)
+    breaker.record_success(elapsed_seconds=2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_stats()['total_slow_calls'] == 1
+
+def test_rule_based_rewriter():
+    """Negative phrases are replaced with kinder alternatives"""
+    rewriter = RuleBasedRewriter({'lazy', 'failure', 'hate', 'messed up'})
+    assert rewriter.rewrite("I hate myself today") == "I'm being really hard on myself today"
+    assert rewriter.rewrite("Lazy day, total failure") == "Low on energy day, total work in progress"
+    assert rewriter.rewrite("I messed up again") == "I made a mistake again"
+
+def test_rewriter_serves_fallback_while_open():
+    """Once the breaker is open Groq is no longer called"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = FailingGroqClient()
+    rewriter.circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    
+    for _ in range(5):
+        rewritten = rewriter.rewrite_compassionate("I feel so lazy")
+        assert rewritten == "I feel so low on energy"
+    
+    stats = rewriter.get_stats()
+    print(f"Rewriter stats: {stats}")
+    assert rewriter.client.calls == 2
+    assert stats['circuit_breaker']['state'] == CircuitBreaker.OPEN
+    assert stats['fallback_rewrites'] == 5
+    assert stats['fallback_rate'] == 1.0
+
+if __name__ == "__main__":
+    test_breaker_opens_and_recovers()
+    test_slow_calls_trip_breaker()
+    test_rule_based_rewriter()
+    test_rewriter_serves_fallback_while_open()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the bitmap representation of streak completion days
+"""
+import sys
+import os
+import random
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.completion_bitmap import CompletionBitmap
+
+def test_queries_match_a_set_of_dates():
+    """Membership, counts and runs agree with a plain set of days"""
+    rng = random.Random(3)
+    start = date(2023, 1, 1)
+    for _ in range(50):
+        days = {start + timedelta(days=rng.randrange(120)) for _ in range(rng.randint(1, 90))}
+        bitmap = CompletionBitmap()
+        for d in rng.sample(sorted(days), len(days)):
+            bitmap.add(d)
+        
+        assert len(bitmap) == len(days)
+        assert bitmap.first() == min(days) and bitmap.last() == max(days)
+        assert bitmap.dates() == sorted(d.isoformat() for d in days)
+        for offset in range(-3, 125):
+            assert ((start + timedelta(days=offset)) in bitmap) == ((start + timedelta(days=offset)) in days)
+        
+        low = start + timedelta(days=rng.randrange(-10, 120))
+        high = low + timedelta(days=rng.randrange(60))
+        assert bitmap.count_in_range(low, high) == sum(1 for d in days if low <= d <= high)
+        
+        longest = 0
+        for d in days:
+            run_start, run_end = bitmap.run_around(d)
+            assert run_start - timedelta(days=1) not in days and run_end + timedelta(days=1) not in days
+            assert all(run_start + timedelta(days=i) in days for i in range((run_end - run_start).days + 1))
+            longest = max(longest, (run_end - run_start).days + 1)
+        assert bitmap.longest_run() == longest
+
+def test_json_round_trip_and_legacy_list():
+    """Serialized bitmaps and legacy ISO-string lists load the same days"""
+    dates = ["2024-01-05", "2024-01-01", "2024-01-02", "2024-01-02"]
+    bitmap = CompletionBitmap.from_dates(dates)
+    restored = CompletionBitmap.from_json(bitmap.to_json())
+    
+    assert restored.dates() == ["2024-01-01", "2024-01-02", "2024-01-05"]
+    assert restored.longest_run() == 2
+    assert len(CompletionBitmap.from_json(CompletionBitmap().to_json())) == 0
+
+def test_add_before_origin_and_remove():
+    """Adding an earlier day re-bases the bitmap; removing clears a day"""
+    bitmap = CompletionBitmap.from_dates(["2024-02-10"])
+    assert bitmap.add(date(2024, 2, 8))
+    assert not bitmap.add(date(2024, 2, 8))
+    assert bitmap.dates() == ["2024-02-08", "2024-02-10"]
+    
+    assert bitmap.remove(date(2024, 2, 10))
+    assert not bitmap.remove(date(2024, 2, 10))
+    assert bitmap.dates() == ["2024-02-08"]
+
+def test_five_years_fits_in_a_few_hundred_bytes():
+    """A daily history serializes to far less than the list of ISO strings"""
+    start = date(2020, 1, 1)
+    bitmap = CompletionBitmap.from_dates(start + timedelta(days=i) for i in range(365 * 5))
+    assert len(bitmap.to_json()['bits']) < 320
+    assert bitmap.longest_run() == 365 * 5
+
+if __name__ == "__main__":
+    test_queries_match_a_set_of_dates()
+    test_json_round_trip_and_legacy_list()
+    test_add_before_origin_and_remove()
+    test_five_years_fits_in_a_few_hundred_bytes()
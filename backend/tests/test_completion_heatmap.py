@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test the yearly completion heatmap against a plain Python count
+"""
+import sys
+import os
+import random
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.completion_heatmap import CompletionHeatmap
+
+class FakeDataManager:
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.loads = 0
+    
+    def load_tasks(self, user_id):
+        self.loads += 1
+        return [task for task in self.tasks if task['user_id'] == user_id]
+
+def make_tasks(seed=1, num_tasks=20):
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(num_tasks):
+        history = {}
+        for _ in range(rng.randint(0, 200)):
+            day = date(2023, 11, 1) + timedelta(days=rng.randrange(500))
+            history[day.isoformat()] = rng.random() < 0.7
+        tasks.append({'id': str(i), 'user_id': 'alice', 'completion_history': history})
+    return tasks
+
+def test_heatmap_matches_python_counts():
+    """Grid cells, totals and rates agree with counting the dicts directly"""
+    tasks = make_tasks()
+    heatmap = CompletionHeatmap(FakeDataManager(tasks)).get_year('alice', 2024)
+    
+    completed, recorded = Counter(), Counter()
+    for task in tasks:
+        for day, done in task['completion_history'].items():
+            recorded[day] += 1
+            completed[day] += done
+    
+    jan_first = date(2024, 1, 1)
+    assert heatmap['start_weekday'] == jan_first.weekday()
+    cells = [cell for week in heatmap['weeks'] for cell in week]
+    assert cells[:jan_first.weekday()] == [None] * jan_first.weekday()
+    days = [cell for cell in cells if cell is not None]
+    assert len(days) == 366
+    assert days == [completed[(jan_first + timedelta(days=i)).isoformat()] for i in range(366)]
+    
+    in_year = [day for day in recorded if day.startswith("2024-")]
+    total_completed = sum(completed[day] for day in in_year)
+    assert heatmap['total_completions'] == total_completed
+    assert heatmap['completion_rate'] == round(total_completed / sum(recorded[day] for day in in_year), 3)
+    assert heatmap['weekly_totals'] == [sum(cell or 0 for cell in week) for week in heatmap['weeks']]
+    assert heatmap['active_days'] == sum(1 for day in in_year if completed[day])
+    
+    levels = [level for week in heatmap['levels'] for level in week if level is not None]
+    assert all((level == 0) == (count == 0) for level, count in zip(levels, days))
+    assert max(levels) <= 4
+
+def test_cached_until_invalidated():
+    """Tasks are read once until the user's completions change"""
+    data_manager = FakeDataManager(make_tasks(seed=2))
+    heatmap = CompletionHeatmap(data_manager)
+    
+    first = heatmap.get_year('alice', 2024)
+    heatmap.get_year('alice', 2023)
+    assert data_manager.loads == 1
+    
+    data_manager.tasks[0]['completion_history']['2024-06-01'] = True
+    data_manager.tasks[1]['completion_history']['2024-06-01'] = True
+    heatmap.invalidate('alice')
+    assert heatmap.get_year('alice', 2024)['total_completions'] >= first['total_completions'] + 1
+    assert data_manager.loads == 2
+
+def test_user_without_history():
+    heatmap = CompletionHeatmap(FakeDataManager([])).get_year('nobody', 2025)
+    assert heatmap['total_completions'] == 0
+    assert heatmap['completion_rate'] is None
+    assert all(level in (0, None) for week in heatmap['levels'] for level in week)
+
+def test_malformed_days_are_skipped():
+    """A bad completion_history key drops that entry, not the whole heatmap"""
+    tasks = make_tasks(seed=3)
+    expected = CompletionHeatmap(FakeDataManager(tasks)).get_year('alice', 2024)
+    tasks[0]['completion_history'].update({"2024-13-01": True, "yesterday": True, "": True, "NaT": False})
+    heatmap = CompletionHeatmap(FakeDataManager(tasks)).get_year('alice', 2024)
+    assert heatmap == expected
+
+if __name__ == "__main__":
+    test_heatmap_matches_python_counts()
+    test_cached_until_invalidated()
+    test_user_without_history()
+    test_malformed_days_are_skipped()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test that title and content are rewritten concurrently
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from llm_stub import StubGroqClient
+
+def test_title_and_content_rewrite_in_one_round_trip():
+    """Both parts are negative, so two LLM calls should overlap"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(latency_seconds=0.3)
+    
+    start = time.perf_counter()
+    analysis = rewriter.analyze_and_suggest_rewrite("I feel so lazy\nI am a total failure at this")
+    elapsed = time.perf_counter() - start
+    
+    print(f"Analysis took {elapsed:.3f}s with {rewriter.client.calls} LLM calls")
+    assert rewriter.client.calls == 2
+    assert analysis['suggestion_available']
+    assert analysis['rewritten_text'] == "You are doing your best.\n\nYou are doing your best."
+    # Close to a single call's latency, not the sum of both
+    assert elapsed < 0.5
+
+def test_rewrite_failure_reports_title_error():
+    """A failed title rewrite still reports the title error"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(reply="")
+    
+    analysis = rewriter.analyze_and_suggest_rewrite("I feel so lazy\nI am a total failure at this")
+    assert not analysis['suggestion_available']
+    assert analysis['error'] == "Unable to generate compassionate rewrite for title"
+
+if __name__ == "__main__":
+    test_title_and_content_rewrite_in_one_round_trip()
+    test_rewrite_failure_reports_title_error()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test adaptive token budgets and hedged rewrite requests
+"""
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from data.request_hedger import RequestHedger
+from llm_stub import StubGroqClient
+
+def test_max_tokens_scales_with_input():
+    """Short titles get a small budget, long content is capped at 500"""
+    rewriter = CompassionateRewriter(enable_hedging=False)
+    rewriter.client = StubGroqClient()
+    
+    rewriter.rewrite_compassionate("I feel so lazy")
+    rewriter.rewrite_compassionate("I feel lazy and useless. " * 200)
+    
+    short_budget, long_budget = rewriter.client.requested_max_tokens
+    print(f"Budgets: short={short_budget}, long={long_budget}")
+    assert short_budget < 100
+    assert long_budget == 500
+
+def test_hedge_wins_over_slow_primary():
+    """A slow primary is raced by a hedge once past the deadline"""
+    hedger = RequestHedger(hedge_budget=1.0, min_samples=1000, default_deadline=0.05)
+    attempts = []
+    
+    def call():
+        attempts.append(time.perf_counter())
+        time.sleep(0.5 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+    
+    start = time.perf_counter()
+    result = hedger.call(call)
+    elapsed = time.perf_counter() - start
+    
+    assert result == 2
+    assert elapsed < 0.3
+    assert hedger.get_stats()['hedge_wins'] == 1
+
+def test_hedge_budget_is_capped():
+    """No hedges are fired once the budget is used up"""
+    hedger = RequestHedger(hedge_budget=0.0, default_deadline=0.01)
+    assert hedger.call(lambda: time.sleep(0.05) or "primary") == "primary"
+    assert hedger.get_stats()['hedged_calls'] == 0
+
+if __name__ == "__main__":
+    test_max_tokens_scales_with_input()
+    test_hedge_wins_over_slow_primary()
+    test_hedge_budget_is_capped()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test request metrics recording and the Prometheus text output
+"""
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.http_metrics import HttpMetrics, MetricsMiddleware, RouteResolver, UNMATCHED
+
+class FakeRoute:
+    def __init__(self, path):
+        self.path = path
+
+class FakeApp:
+    routes = [FakeRoute("/api/tasks"), FakeRoute("/api/tasks/{task_id}"),
+              FakeRoute("/api/tasks/{task_id}/complete/{target_date}")]
+
+def parse(text):
+    """Sample lines of a rendered exposition as {series: value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+async def request(app, method, path):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        pass
+    
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": [], "app": FakeApp()}
+    await app(scope, receive, send)
+
+def test_route_resolver():
+    resolver = RouteResolver([route.path for route in FakeApp.routes])
+    assert resolver.resolve("/api/tasks") == "/api/tasks"
+    assert resolver.resolve("/api/tasks/abc") == "/api/tasks/{task_id}"
+    assert resolver.resolve("/api/tasks/abc/complete/2024-01-01") == "/api/tasks/{task_id}/complete/{target_date}"
+    assert resolver.resolve("/api/tasks/abc/other") == UNMATCHED
+
+def test_histogram_buckets_are_cumulative():
+    metrics = HttpMetrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        metrics.started("GET", "/api/tasks")
+        metrics.finished("GET", "/api/tasks", 200, seconds)
+    samples = parse(metrics.render())
+    labels = 'method="GET",route="/api/tasks"'
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="0.1"}}'] == 2
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="1.0"}}'] == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 4
+    assert samples[f"http_request_duration_seconds_count{{{labels}}}"] == 4
+    assert abs(samples[f"http_request_duration_seconds_sum{{{labels}}}"] - 3.65) < 1e-9
+    assert samples[f"http_requests_in_flight{{{labels}}}"] == 0
+
+def test_middleware_records_routes_statuses_and_in_flight():
+    metrics = HttpMetrics()
+    release = asyncio.Event()
+    seen_in_flight = []
+    
+    async def app(scope, receive, send):
+        if scope["path"] == "/api/tasks":
+            seen_in_flight.append(metrics.in_flight[("GET", "/api/tasks")])
+            await release.wait()
+            status = 200
+        elif scope["path"].endswith("/boom"):
+            raise RuntimeError("boom")
+        else:
+            status = 404
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    
+    async def run():
+        middleware = MetricsMiddleware(app, metrics)
+        slow = [asyncio.create_task(request(middleware, "GET", "/api/tasks")) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert metrics.in_flight[("GET", "/api/tasks")] == 3
+        release.set()
+        await asyncio.gather(*slow)
+        
+        await request(middleware, "DELETE", "/api/tasks/t1")
+        await request(middleware, "GET", "/no/such/path")
+        await request(middleware, "BREW", "/api/tasks/t2")
+        try:
+            await request(middleware, "PUT", "/api/tasks/t1/boom")
+        except RuntimeError:
+            pass
+    asyncio.run(run())
+    
+    samples = parse(metrics.render())
+    assert samples['http_requests_total{method="GET",route="/api/tasks",status="200"}'] == 3
+    assert samples['http_requests_total{method="DELETE",route="/api/tasks/{task_id}",status="404"}'] == 1
+    assert samples[f'http_requests_total{{method="GET",route="{UNMATCHED}",status="404"}}'] == 1
+    assert samples['http_requests_total{method="other",route="/api/tasks/{task_id}",status="404"}'] == 1
+    # A handler that raised before responding counts as a 500
+    assert samples[f'http_requests_total{{method="PUT",route="{UNMATCHED}",status="500"}}'] == 1
+    assert samples['http_requests_in_flight{method="GET",route="/api/tasks"}'] == 0
+
+def test_gauges():
+    metrics = HttpMetrics()
+    depth = [4]
+    metrics.add_gauge("queue_depth", "Jobs waiting", lambda: depth[0])
+    metrics.add_gauge("missing", "Not available", lambda: None)
+    text = metrics.render()
+    assert "# TYPE queue_depth gauge\nqueue_depth 4\n" in text
+    assert "missing" not in text
+
+if __name__ == "__main__":
+    test_route_resolver()
+    test_histogram_buckets_are_cumulative()
+    test_middleware_records_routes_statuses_and_in_flight()
+    test_gauges()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the weighted negative-word lexicon
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from data.lexicon import Lexicon, expand_variants
+from llm_stub import StubGroqClient
+
+def test_variants_are_expanded():
+    """Verbs, nouns and phrasal verbs are inflected"""
+    assert expand_variants("hate", "verb") == ["hate", "hates", "hated", "hating"]
+    assert expand_variants("ruin", "verb") == ["ruin", "ruins", "ruined", "ruining"]
+    assert expand_variants("mess up", "verb") == ["mess up", "messes up", "messed up", "messing up"]
+    assert expand_variants("failure", "noun") == ["failure", "failures"]
+    assert expand_variants("lazy", "adj") == ["lazy"]
+
+def test_inflections_map_to_base_terms():
+    """Inflected words are reported under their lexicon term"""
+    lexicon = Lexicon.load()
+    score, found = lexicon.score("I keep HATING myself, my failures are ruining everything")
+    assert found == ['hate', 'failure', 'ruin']
+    assert score == lexicon.weights['hate'] + lexicon.weights['failure'] + lexicon.weights['ruin']
+    # Word boundaries still apply
+    assert lexicon.score("The hatchback had a lazyboy chair")[1] == []
+
+def test_mild_text_skips_llm():
+    """Text below the severity threshold is not sent for rewriting"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient()
+    
+    mild = rewriter.analyze_and_suggest_rewrite("Yikes, what a rainy day")
+    assert not mild['contains_negative_words']
+    assert mild['found_words'] == ['yikes']
+    assert rewriter.client.calls == 0
+    
+    severe = rewriter.analyze_and_suggest_rewrite("I feel worthless")
+    assert severe['contains_negative_words']
+    assert severe['suggestion_available']
+    assert rewriter.client.calls == 1
+
+    # New tips are only queued for the worker when it would rewrite them
+    assert not rewriter.needs_rewrite("Yikes, what a rainy day")
+    assert not rewriter.needs_rewrite("Feeling a bit sick today")
+    assert rewriter.needs_rewrite("I feel worthless")
+
+if __name__ == "__main__":
+    test_variants_are_expanded()
+    test_inflections_map_to_base_terms()
+    test_mild_text_skips_llm()
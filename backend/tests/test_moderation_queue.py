@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test the background moderation queue
+"""
+import sys
+import os
+import asyncio
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.data_manager import DataManager
+from data.moderation_queue import ModerationQueue, PENDING_REWRITE, RUNNING, REWRITTEN, FAILED
+from temp_cwd import temp_cwd
+
+class FakeRewriter:
+    def __init__(self, failures_before_success=0):
+        self.failures_before_success = failures_before_success
+        self.calls = 0
+    
+    def analyze_and_suggest_rewrite(self, text):
+        self.calls += 1
+        if self.calls <= self.failures_before_success:
+            return {'contains_negative_words': True, 'suggestion_available': False,
+                    'rewritten_text': None, 'error': "Unable to generate compassionate rewrite for title"}
+        # One-line texts come back with an empty content part, like the real rewriter's
+        return {'contains_negative_words': True, 'suggestion_available': True,
+                'rewritten_text': "Rest is part of the process\n\n", 'error': None}
+
+def make_data_manager():
+    """DataManager with one pending tip, in the current (temporary) directory"""
+    data_manager = DataManager()
+    data_manager.save_tip({'id': 'tip-1', 'content': "Don't be lazy", 'author': 'me',
+                           'category': 'Habits', 'moderation_status': PENDING_REWRITE})
+    return data_manager
+
+async def wait_for_jobs(data_manager, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if not any(j['status'] in (PENDING_REWRITE, RUNNING) for j in data_manager.load_jobs()):
+            return
+        await asyncio.sleep(0.01)
+
+def test_tip_rewritten_in_background():
+    """A submitted job rewrites the stored tip and leaves no pending job"""
+    with temp_cwd():
+        data_manager = make_data_manager()
+        
+        async def run():
+            moderation_queue = ModerationQueue(data_manager, FakeRewriter(), retry_delay=0.01)
+            await moderation_queue.start()
+            moderation_queue.submit('tip', 'tip-1', "Don't be lazy")
+            await wait_for_jobs(data_manager)
+            await moderation_queue.stop()
+            return moderation_queue.get_stats()
+        
+        stats = asyncio.run(run())
+        tip = next(t for t in data_manager.load_tips() if t['id'] == 'tip-1')
+        print(f"Queue stats: {stats}")
+        assert tip['content'] == "Rest is part of the process"
+        assert tip['moderation_status'] == REWRITTEN
+        assert stats['completed_jobs'] == 1
+        assert data_manager.load_jobs() == []
+
+def test_failed_jobs_are_retried_then_marked_failed():
+    """Jobs are retried up to max_retries before the tip is marked failed"""
+    with temp_cwd():
+        data_manager = make_data_manager()
+        rewriter = FakeRewriter(failures_before_success=10)
+        
+        async def run():
+            moderation_queue = ModerationQueue(data_manager, rewriter, max_retries=3, retry_delay=0.01)
+            await moderation_queue.start()
+            moderation_queue.submit('tip', 'tip-1', "Don't be lazy")
+            await wait_for_jobs(data_manager)
+            await moderation_queue.stop()
+            return moderation_queue.get_stats()
+        
+        stats = asyncio.run(run())
+        tip = next(t for t in data_manager.load_tips() if t['id'] == 'tip-1')
+        assert rewriter.calls == 3
+        assert stats['retried_jobs'] == 2
+        assert stats['failed_jobs'] == 1
+        assert tip['moderation_status'] == FAILED
+        assert tip['content'] == "Don't be lazy"
+
+def test_pending_jobs_survive_restart():
+    """Jobs stored before a restart are processed when the queue starts again"""
+    with temp_cwd():
+        data_manager = make_data_manager()
+        
+        # Submitted while no workers are running, as if the process died
+        stopped_queue = ModerationQueue(data_manager, FakeRewriter())
+        stopped_queue.submit('tip', 'tip-1', "Don't be lazy")
+        assert len(data_manager.load_jobs()) == 1
+        
+        async def run():
+            moderation_queue = ModerationQueue(data_manager, FakeRewriter())
+            await moderation_queue.start()
+            await wait_for_jobs(data_manager)
+            await moderation_queue.stop()
+        
+        asyncio.run(run())
+        tip = next(t for t in data_manager.load_tips() if t['id'] == 'tip-1')
+        assert tip['moderation_status'] == REWRITTEN
+
+def test_jobs_claimed_by_another_process_are_left_alone():
+    """A running job is only taken over once the process that claimed it has exited"""
+    with temp_cwd():
+        data_manager = make_data_manager()
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        stopped_queue = ModerationQueue(data_manager, FakeRewriter())
+        owned = stopped_queue.submit('tip', 'tip-1', "Don't be lazy")
+        orphaned = stopped_queue.submit('tip', 'tip-1', "Don't be lazy")
+        data_manager.save_job(dict(owned, status=RUNNING, owner_pid=os.getppid()))
+        data_manager.save_job(dict(orphaned, status=RUNNING, owner_pid=exited.pid))
+        rewriter = FakeRewriter()
+        
+        async def run():
+            moderation_queue = ModerationQueue(data_manager, rewriter)
+            await moderation_queue.start()
+            for _ in range(200):
+                if len(data_manager.load_jobs()) == 1:
+                    break
+                await asyncio.sleep(0.01)
+            await moderation_queue.stop()
+        
+        asyncio.run(run())
+        assert rewriter.calls == 1
+        assert [job['id'] for job in data_manager.load_jobs()] == [owned['id']]
+
+if __name__ == "__main__":
+    test_tip_rewritten_in_background()
+    test_failed_jobs_are_retried_then_marked_failed()
+    test_pending_jobs_survive_restart()
+    test_jobs_claimed_by_another_process_are_left_alone()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test opt-in per-request profiling
+"""
+import sys
+import os
+import asyncio
+import pstats
+import random
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.request_profiler import RequestProfiler, ProfileMiddleware
+
+def busy_handler_work():
+    return sum(i * i for i in range(20000))
+
+async def app(scope, receive, send):
+    busy_handler_work()
+    await asyncio.sleep(0)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+def request(middleware, path="/api/tasks", headers=None, query_string=b""):
+    """Run one request through middleware, returning its response headers"""
+    response = {}
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.update(dict(message["headers"]))
+    
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers or [],
+             "query_string": query_string}
+    asyncio.run(middleware(scope, receive, send))
+    return response
+
+def test_only_admin_requests_are_profiled():
+    profiler = RequestProfiler(tempfile.mkdtemp(), token="secret", skip_prefixes=("/api/profiles",))
+    middleware = ProfileMiddleware(app, profiler)
+    
+    assert b"x-profile-id" not in request(middleware)
+    assert b"x-profile-id" not in request(middleware, headers=[(b"x-profile-token", b"wrong")])
+    assert profiler.list_profiles() == []
+    
+    by_header = request(middleware, headers=[(b"x-profile-token", b"secret")])[b"x-profile-id"].decode()
+    by_query = request(middleware, query_string=b"user_id=a&profile_token=secret")[b"x-profile-id"].decode()
+    profiles = profiler.list_profiles()
+    assert [profile['id'] for profile in profiles] == [by_query, by_header]
+    assert profiles[0]['trigger'] == "requested" and profiles[0]['status'] == 200
+    
+    # The stored file is a standard pstats profile of the handler's work
+    stats = pstats.Stats(profiler.get_profile_path(by_header))
+    assert any(function == "busy_handler_work" for _, _, function in stats.stats)
+    
+    # Downloading a profile doesn't profile the download
+    assert b"x-profile-id" not in request(middleware, "/api/profiles", headers=[(b"x-profile-token", b"secret")])
+
+def test_sampling_and_retention():
+    directory = tempfile.mkdtemp()
+    profiler = RequestProfiler(directory, sample_rate=0.5, max_profiles=3, rng=random.Random(7))
+    middleware = ProfileMiddleware(app, profiler)
+    profiled = sum(b"x-profile-id" in request(middleware) for _ in range(40))
+    assert 10 <= profiled <= 30
+    assert profiler.get_stats()['sampled'] == profiled
+    
+    # Only the newest max_profiles are kept, on disk too
+    assert len(profiler.list_profiles()) == 3
+    assert len(os.listdir(directory)) == 3
+    
+    # Without a token nothing can be downloaded, and IDs can't escape the directory
+    assert not profiler.authorized(None) and not profiler.authorized("")
+    assert profiler.get_profile_path("../../etc/passwd") is None
+    
+    # A restarted profiler finds the stored profiles
+    assert len(RequestProfiler(directory, max_profiles=3).list_profiles()) == 3
+
+def test_one_profile_at_a_time():
+    profiler = RequestProfiler(tempfile.mkdtemp(), sample_rate=1.0)
+    middleware = ProfileMiddleware(app, profiler)
+    ids = []
+    
+    async def run():
+        async def one():
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+            
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    ids.append(dict(message["headers"]).get(b"x-profile-id"))
+            
+            await middleware({"type": "http", "method": "GET", "path": "/", "headers": []}, receive, send)
+        await asyncio.gather(one(), one())
+    asyncio.run(run())
+    
+    assert sum(profile_id is not None for profile_id in ids) == 1
+    assert profiler.get_stats()['skipped_busy'] == 1
+    assert not profiler.active
+
+if __name__ == "__main__":
+    test_only_admin_requests_are_profiled()
+    test_sampling_and_retention()
+    test_one_profile_at_a_time()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test the per-route rate and concurrency limiting middleware on a bare ASGI app
+"""
+import sys
+import os
+import json
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.route_limiter import RouteLimit, RouteLimitMiddleware
+
+class SlowApp:
+    """ASGI app whose responses wait until release is set; counts handler calls"""
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+    
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        if scope["path"].startswith("/slow"):
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+async def request(app, method, path, query="", client="10.0.0.1", body=b""):
+    """Run one request through the app, returning (status, headers, body)"""
+    messages = []
+    
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {"type": "http", "method": method, "path": path, "headers": [],
+             "query_string": query.encode(), "client": (client, 50000)}
+    await app(scope, receive, send)
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, body
+
+def test_rate_limit_per_key():
+    """Over-limit requests get 429 with Retry-After and never reach the handler"""
+    async def run():
+        inner = SlowApp()
+        app = RouteLimitMiddleware(inner, [RouteLimit("POST", "/api/posts/{post_id}/react", max_requests=3)])
+        
+        statuses = [(await request(app, "POST", "/api/posts/p1/react"))[0] for _ in range(3)]
+        assert statuses == [200, 200, 200]
+        status, headers, body = await request(app, "POST", "/api/posts/p2/react")
+        assert status == 429
+        assert int(headers["retry-after"]) > 0 and headers["ratelimit-remaining"] == "0"
+        assert json.loads(body)["detail"]["error"] == "Rate limit exceeded"
+        assert inner.calls == 3
+        
+        # Another client, another method or an unlimited route are unaffected
+        assert (await request(app, "POST", "/api/posts/p1/react", client="10.0.0.2"))[0] == 200
+        assert (await request(app, "POST", "/api/posts/p1/react", query="user_id=bob"))[0] == 200
+        assert (await request(app, "GET", "/api/posts/p1/react"))[0] == 200
+        status, headers, _ = await request(app, "GET", "/api/posts")
+        assert status == 200 and "ratelimit-limit" not in headers
+    asyncio.run(run())
+
+def test_admitted_requests_get_ratelimit_headers():
+    async def run():
+        app = RouteLimitMiddleware(SlowApp(), [RouteLimit("POST", "/api/tips", max_requests=5)])
+        _, headers, _ = await request(app, "POST", "/api/tips")
+        assert headers["ratelimit-limit"] == "5" and headers["ratelimit-remaining"] == "4"
+        assert headers["content-type"] == "text/plain"
+    asyncio.run(run())
+
+def test_concurrency_caps_shed_before_the_handler():
+    """A saturated slow route sheds extra requests at once while other routes keep answering"""
+    async def run():
+        inner = SlowApp()
+        limit = RouteLimit("POST", "/slow", max_in_flight=3, max_in_flight_per_key=2)
+        app = RouteLimitMiddleware(inner, [limit])
+        
+        held = [asyncio.create_task(request(app, "POST", "/slow", client=f"10.0.0.{i % 2}")) for i in range(3)]
+        await asyncio.sleep(0)
+        assert limit.in_flight == 3 and inner.calls == 3
+        
+        # Route-wide cap: 503
+        status, headers, _ = await request(app, "POST", "/slow", client="10.0.0.9")
+        assert status == 503 and headers["retry-after"] == "1"
+        assert inner.calls == 3
+        
+        # Cheap routes are not held up behind the slow ones
+        assert (await request(app, "GET", "/api/tips"))[0] == 200
+        
+        inner.release.set()
+        assert [result[0] for result in await asyncio.gather(*held)] == [200, 200, 200]
+        assert limit.in_flight == 0 and limit.in_flight_by_key == {}
+        
+        # Per-key cap: 429 for one client while another still gets through
+        inner.release.clear()
+        held = [asyncio.create_task(request(app, "POST", "/slow")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert (await request(app, "POST", "/slow"))[0] == 429
+        inner.release.set()
+        await asyncio.gather(*held)
+        
+        stats = limit.get_stats()
+        assert stats['admitted'] == 5 and stats['shed_in_flight'] == 2 and stats['in_flight'] == 0
+    asyncio.run(run())
+
+def test_in_flight_released_when_handler_fails():
+    async def run():
+        async def broken(scope, receive, send):
+            raise RuntimeError("boom")
+        limit = RouteLimit("POST", "/api/posts", max_in_flight=1)
+        app = RouteLimitMiddleware(broken, [limit])
+        for _ in range(2):
+            try:
+                await request(app, "POST", "/api/posts")
+            except RuntimeError:
+                pass
+        assert limit.in_flight == 0 and limit.admitted == 2
+    asyncio.run(run())
+
+def test_key_from_json_body():
+    """Body-keyed routes limit each user_id separately even behind one proxy address"""
+    async def run():
+        received = []
+        
+        async def echo(scope, receive, send):
+            received.append((await receive())["body"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+        app = RouteLimitMiddleware(echo, [RouteLimit("POST", "/api/posts/analyze", max_requests=1,
+                                                     key_from_body=True)])
+        alice = json.dumps({"content": "hi", "user_id": "alice"}).encode()
+        bob = json.dumps({"content": "hi", "user_id": "bob"}).encode()
+        assert (await request(app, "POST", "/api/posts/analyze", body=alice))[0] == 200
+        assert (await request(app, "POST", "/api/posts/analyze", body=bob))[0] == 200
+        assert (await request(app, "POST", "/api/posts/analyze", body=alice))[0] == 429
+        # The app still gets the body that was read for the key
+        assert received == [alice, bob]
+        
+        # Without a user_id in the body, fall back to the client address
+        assert (await request(app, "POST", "/api/posts/analyze", body=b"not json"))[0] == 200
+        assert (await request(app, "POST", "/api/posts/analyze", body=b"{}"))[0] == 429
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_rate_limit_per_key()
+    test_admitted_requests_get_ratelimit_headers()
+    test_concurrency_caps_shed_before_the_handler()
+    test_in_flight_released_when_handler_fails()
+    test_key_from_json_body()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the cross-process rate limiter: same answers as the in-process one,
+and one global limit when several processes share the file
+"""
+import sys
+import os
+import random
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.rate_limiter import RateLimiter, SharedRateLimiter
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+def hammer(path, keys, checks, start, results):
+    """Worker process: open the shared table and check keys as fast as possible"""
+    limiter = SharedRateLimiter(path, max_requests=1000, window_seconds=3600, clock=FakeClock(1800.0))
+    start.wait()
+    allowed = dict.fromkeys(keys, 0)
+    for i in range(checks):
+        key = keys[i % len(keys)]
+        allowed[key] += limiter.check(key)['allowed']
+    limiter.close()
+    results.put(allowed)
+
+def test_matches_in_process_limiter():
+    """Every check() result is identical to RateLimiter's for the same sequence"""
+    rng = random.Random(7)
+    clock = FakeClock(0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = SharedRateLimiter(os.path.join(tmp, "limits"), max_requests=5, window_seconds=10, clock=clock)
+        local = RateLimiter(max_requests=5, window_seconds=10, clock=clock)
+        for _ in range(3000):
+            clock.now += rng.choice([0.0, 0.3, 1.7, 6.0, 25.0])
+            key = f"user-{rng.randrange(20)}"
+            cost = rng.choice([1, 1, 1, 2])
+            assert shared.check(key, cost) == local.check(key, cost)
+            assert shared.get_remaining_requests(key) == local.get_remaining_requests(key)
+        shared.close()
+
+def test_global_limit_across_processes():
+    """Four processes checking the same keys are allowed max_requests in total per key"""
+    keys = ["alice", "bob", "carol"]
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits")
+        start, results = context.Event(), context.Queue()
+        workers = [context.Process(target=hammer, args=(path, keys, 3000, start, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        start.set()
+        per_worker = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+        
+        for key in keys:
+            assert sum(allowed[key] for allowed in per_worker) == 1000
+        
+        # A limiter opened afterwards sees the counts the workers left behind
+        limiter = SharedRateLimiter(path, max_requests=1000, window_seconds=3600, clock=FakeClock(1800.0))
+        assert limiter.get_remaining_requests("alice") == 0
+        assert limiter.get_remaining_requests("dave") == 1000
+        limiter.close()
+
+def test_idle_slots_are_reused():
+    """The table never grows: keys idle for two windows give their slots to new keys"""
+    clock = FakeClock(0.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits")
+        limiter = SharedRateLimiter(path, max_requests=5, window_seconds=60, num_slots=16, clock=clock)
+        size = os.path.getsize(path)
+        for i in range(16):
+            limiter.check(f"user-{i}")
+        assert limiter.get_stats()['live_keys'] == 16
+        
+        clock.now = 121.0
+        assert limiter.get_stats()['live_keys'] == 0
+        for i in range(16, 32):
+            assert limiter.check(f"user-{i}")['remaining'] == 4
+        assert limiter.get_stats()['live_keys'] == 16
+        assert limiter.overflows == 0
+        assert os.path.getsize(path) == size
+        
+        # With every slot live, a new key overwrites one instead of failing
+        assert limiter.check("user-99")['allowed']
+        assert limiter.overflows == 1
+        limiter.close()
+
+def test_mismatched_table_is_rejected():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "limits")
+        SharedRateLimiter(path, window_seconds=60).close()
+        try:
+            SharedRateLimiter(path, window_seconds=30)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("opening with a different window should fail")
+
+if __name__ == "__main__":
+    test_matches_in_process_limiter()
+    test_global_limit_across_processes()
+    test_idle_slots_are_reused()
+    test_mismatched_table_is_rejected()
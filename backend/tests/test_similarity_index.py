@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate rewrite reuse
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from data.similarity_index import SimilarityIndex
+from llm_stub import StubGroqClient
+
+ORIGINAL = "I feel like such a failure because I skipped my workout again and I hate myself for it"
+
+def test_near_duplicate_is_reused():
+    """A one-word tweak finds the stored rewrite; unrelated text does not"""
+    index = SimilarityIndex(threshold=0.8)
+    index.add(ORIGINAL, "kind rewrite")
+    
+    assert index.lookup(ORIGINAL) == ("kind rewrite", 1.0)
+    reused = index.lookup(ORIGINAL.replace("again", "again today"))
+    assert reused and reused[0] == "kind rewrite"
+    assert index.lookup("My room is a mess and I feel lazy about cleaning it") is None
+
+def test_meaning_changing_edits_are_not_reused():
+    """A near-identical text that adds a negation, number or name needs its own rewrite"""
+    index = SimilarityIndex(threshold=0.8)
+    index.add(ORIGINAL, "kind rewrite")
+    
+    negated = ORIGINAL.replace("I hate myself", "I do not hate myself")
+    assert index.lookup(negated) is None
+    assert index.lookup(ORIGINAL.replace("for it", "for it 3 times")) is None
+    assert index.lookup(ORIGINAL.replace("my workout", "my workout with Sam")) is None
+    assert index.get_stats()['rejected_edits'] == 3
+    
+    # The same applies the other way round, when the stored text had the negation
+    index.add("I do not think I am good enough to finish this course and it hurts", "other rewrite")
+    assert index.lookup("I do think I am good enough to finish this course and it hurts") is None
+
+def test_oldest_entries_are_evicted():
+    """The index never grows past max_entries"""
+    index = SimilarityIndex(max_entries=2)
+    index.add("first text about being lazy", "one")
+    index.add("second text about being useless", "two")
+    index.add("third text about being hopeless", "three")
+    
+    assert index.get_stats()['entries'] == 2
+    assert index.lookup("first text about being lazy") is None
+    assert index.lookup("third text about being hopeless")[0] == "three"
+
+def test_rewriter_skips_llm_for_near_duplicates():
+    """Re-running analysis on a slightly edited text doesn't call Groq again"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient()
+    
+    first = rewriter.rewrite_compassionate(ORIGINAL, "user-a")
+    second = rewriter.rewrite_compassionate(ORIGINAL.replace("skipped", "totally skipped"), "user-a")
+    
+    assert first == second
+    assert rewriter.client.calls == 1
+    assert rewriter.get_stats()['similarity_reuse']['hits'] == 1
+
+def test_rewrites_are_not_shared_between_users():
+    """Another user's near-identical text, or one without a user, goes to the LLM"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient()
+    
+    rewriter.rewrite_compassionate(ORIGINAL, "user-a")
+    rewriter.rewrite_compassionate(ORIGINAL, "user-b")
+    rewriter.rewrite_compassionate(ORIGINAL)
+    rewriter.rewrite_compassionate(ORIGINAL.replace("I hate myself", "I don't hate myself"), "user-a")
+    
+    assert rewriter.client.calls == 4
+    assert rewriter.get_stats()['similarity_reuse']['hits'] == 0
+
+if __name__ == "__main__":
+    test_near_duplicate_is_reused()
+    test_oldest_entries_are_evicted()
+    test_meaning_changing_edits_are_not_reused()
+    test_rewriter_skips_llm_for_near_duplicates()
+    test_rewrites_are_not_shared_between_users()
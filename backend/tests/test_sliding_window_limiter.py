@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test the sliding-window-counter rate limiter with a fake clock
+"""
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.rate_limiter import RateLimiter
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+def test_limit_within_a_window():
+    """max_requests are allowed, the next one is limited with a Retry-After"""
+    clock = FakeClock(1000.0)
+    limiter = RateLimiter(max_requests=3, window_seconds=60, clock=clock)
+    
+    results = [limiter.check("alice") for _ in range(4)]
+    assert [r['allowed'] for r in results] == [True, True, True, False]
+    assert [r['remaining'] for r in results[:3]] == [2, 1, 0]
+    
+    headers = RateLimiter.headers(results[3])
+    assert headers['RateLimit-Limit'] == "3"
+    assert headers['RateLimit-Remaining'] == "0"
+    assert int(headers['Retry-After']) > 0
+    
+    # Other keys are independent
+    assert limiter.is_allowed("bob")
+
+def test_previous_window_decays():
+    """Requests from the previous window count in proportion to their overlap"""
+    clock = FakeClock(0.0)
+    limiter = RateLimiter(max_requests=10, window_seconds=60, clock=clock)
+    for _ in range(10):
+        assert limiter.is_allowed("alice")
+    
+    # 15s into the next window, 75% of the previous 10 still count
+    clock.now = 75.0
+    assert limiter.get_remaining_requests("alice") == 2
+    assert limiter.is_allowed("alice") and limiter.is_allowed("alice")
+    result = limiter.check("alice")
+    assert not result['allowed']
+    
+    # Retry-After is when the estimate first drops enough to allow one more
+    clock.now += result['retry_after_seconds']
+    assert limiter.is_allowed("alice")
+
+def test_retry_after_is_not_too_early():
+    """Waiting exactly Retry-After always lets the next request through"""
+    clock = FakeClock(0.0)
+    limiter = RateLimiter(max_requests=5, window_seconds=10, clock=clock)
+    for step in range(200):
+        clock.now = step * 0.7
+        result = limiter.check("alice")
+        if not result['allowed']:
+            saved = clock.now
+            clock.now += result['retry_after_seconds']
+            assert limiter.check("alice")['allowed']
+            clock.now = saved
+
+def test_idle_keys_are_evicted():
+    """Keys not seen for two windows are dropped when the window rolls over"""
+    clock = FakeClock(0.0)
+    limiter = RateLimiter(max_requests=5, window_seconds=60, clock=clock)
+    for i in range(100):
+        limiter.check(f"user-{i}")
+    assert limiter.get_stats()['keys_current_window'] == 100
+    
+    # One window later the counts still matter, as the previous window
+    clock.now = 61.0
+    limiter.check("user-0")
+    stats = limiter.get_stats()
+    assert stats['keys_current_window'] == 1 and stats['keys_previous_window'] == 100
+    
+    # Two windows later only keys seen in the last window are kept
+    clock.now = 121.0
+    limiter.evict_idle()
+    stats = limiter.get_stats()
+    assert stats['keys_current_window'] == 0 and stats['keys_previous_window'] == 1
+    # An evicted key starts over with a full quota
+    assert limiter.get_remaining_requests("user-5") == 5
+
+if __name__ == "__main__":
+    test_limit_within_a_window()
+    test_previous_window_decays()
+    test_retry_after_is_not_too_early()
+    test_idle_keys_are_evicted()
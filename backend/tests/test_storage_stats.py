@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test DataManager storage instrumentation and per-request attribution
+"""
+import sys
+import os
+import asyncio
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.data_manager import DataManager
+from data.storage_stats import StorageStats, StorageProfileMiddleware
+from temp_cwd import temp_cwd
+
+def make_data_manager():
+    """Counters start from zero after the data files are created"""
+    data_manager = DataManager()
+    data_manager.stats = StorageStats()
+    return data_manager
+
+def test_method_counters_match_the_files():
+    with temp_cwd():
+        data_manager = make_data_manager()
+        posts = data_manager.load_posts()
+        data_manager.save_post({**posts[0], 'content': "edited"})
+        stats = data_manager.stats.get_stats()['methods']
+        
+        # Bytes read and written are the file's size, records its entries
+        size = os.path.getsize(data_manager.posts_file)
+        assert stats['load_posts']['calls'] == 2  # once directly, once inside save_post
+        assert stats['load_posts']['records_scanned'] == 2 * len(posts)
+        assert stats['_save_posts']['bytes_written'] == size
+        assert stats['_save_posts']['records_written'] == len(posts)
+        
+        # I/O goes to the innermost method, so save_post itself did none
+        assert stats['save_post']['calls'] == 1
+        assert stats['save_post']['bytes_read'] == 0 and stats['save_post']['bytes_written'] == 0
+        assert stats['save_post']['seconds'] >= stats['_save_posts']['seconds']
+        
+        data_manager.save_task({'id': "t1", 'user_id': "alice", 'completion_history': {}})
+        list(data_manager.iter_tasks(chunk_size=16))
+        stats = data_manager.stats.get_stats()['methods']
+        tasks_size = os.path.getsize(data_manager.tasks_file)
+        assert stats['save_task']['bytes_written'] == tasks_size
+        assert stats['iter_tasks']['bytes_read'] == tasks_size
+        assert stats['iter_tasks']['records_scanned'] == stats['save_task']['records_written']
+
+def test_storage_attributed_to_each_request():
+    """Concurrent requests each see only their own storage, including work done in threads"""
+    with temp_cwd():
+        data_manager = make_data_manager()
+        posts_size = os.path.getsize(data_manager.posts_file)
+        tips_size = os.path.getsize(data_manager.tips_file)
+        responses = {}
+        
+        async def app(scope, receive, send):
+            if scope["path"] == "/posts":
+                data_manager.load_posts()
+                await asyncio.sleep(0)
+                await asyncio.to_thread(data_manager.load_posts)
+            else:
+                await asyncio.sleep(0)
+                data_manager.load_tips()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        
+        async def request(middleware, path):
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+            
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    responses[path] = dict(message["headers"])[b"server-timing"].decode()
+            
+            await middleware({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+        
+        async def run():
+            middleware = StorageProfileMiddleware(app, data_manager.stats, slow_seconds=0.0)
+            await asyncio.gather(request(middleware, "/posts"), request(middleware, "/tips"))
+        asyncio.run(run())
+        
+        assert f'desc="2 calls, {2 * posts_size} B read, 0 B written"' in responses["/posts"]
+        assert f'desc="1 calls, {tips_size} B read, 0 B written"' in responses["/tips"]
+        
+        # slow_seconds=0 puts every request in the slow log, with its breakdown
+        slow = {entry['path']: entry for entry in data_manager.stats.get_stats()['slow_requests']}
+        assert slow["/posts"]['storage']['by_method']['load_posts']['bytes_read'] == 2 * posts_size
+        assert list(slow["/tips"]['storage']['by_method']) == ['load_tips']
+        
+        # Outside a request nothing is attributed to one
+        data_manager.load_tips()
+        assert len(data_manager.stats.get_stats()['slow_requests']) == 2
+
+if __name__ == "__main__":
+    test_method_counters_match_the_files()
+    test_storage_attributed_to_each_request()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test incremental streak updates against a full recomputation
+"""
+import sys
+import os
+import copy
+import random
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.streak_manager import StreakManager
+from data.completion_bitmap import CompletionBitmap
+
+class InMemoryDataManager:
+    def __init__(self):
+        self.streaks = {}
+    
+    def load_streak(self, user_id):
+        return copy.deepcopy(self.streaks.get(user_id, {}))
+    
+    def save_streak(self, user_id, streak_data):
+        self.streaks[user_id] = copy.deepcopy(streak_data)
+
+def brute_force(dates):
+    """Current run ending at the latest date, and the longest run"""
+    ordered = sorted(set(dates))
+    runs = []
+    for d in ordered:
+        if runs and d - runs[-1][-1] == timedelta(days=1):
+            runs[-1].append(d)
+        else:
+            runs.append([d])
+    return len(runs[-1]), max(len(run) for run in runs)
+
+def test_appends_extend_current_run():
+    """Consecutive appends grow the run; a gap starts a new one"""
+    streak_manager = StreakManager(InMemoryDataManager())
+    today = date.today()
+    
+    for offset in (4, 3, 2):
+        streak_manager.update_streak_for_completion("user", today - timedelta(days=offset))
+    streak_data = streak_manager.update_streak_for_completion("user", today)
+    
+    assert streak_data['current_streak'] == 1
+    assert streak_data['longest_streak'] == 3
+    assert not streak_data['is_paused']
+    assert streak_data['last_completion_date'] == today
+
+def test_backfill_joins_current_run():
+    """Backfilling the missing day merges two runs into the current one"""
+    streak_manager = StreakManager(InMemoryDataManager())
+    today = date.today()
+    
+    for offset in (4, 3, 1, 0):
+        streak_manager.update_streak_for_completion("user", today - timedelta(days=offset))
+    streak_data = streak_manager.update_streak_for_completion("user", today - timedelta(days=2))
+    
+    assert streak_data['current_streak'] == 5
+    assert streak_data['longest_streak'] == 5
+    # Backfilling doesn't move the last completion date backwards
+    assert streak_data['last_completion_date'] == today
+
+def test_random_histories_match_full_recompute():
+    """Random order completions (with repeats) agree with a brute-force count"""
+    rng = random.Random(5)
+    start = date(2020, 1, 1)
+    for _ in range(30):
+        streak_manager = StreakManager(InMemoryDataManager())
+        days = [start + timedelta(days=rng.randrange(60)) for _ in range(rng.randint(1, 50))]
+        for d in days:
+            streak_data = streak_manager.update_streak_for_completion("user", d)
+        
+        current, longest = brute_force(days)
+        assert streak_data['current_streak'] == current
+        assert streak_data['longest_streak'] == longest
+        assert CompletionBitmap.from_json(streak_data['completion_bitmap']).dates() == sorted({d.isoformat() for d in days})
+
+def test_legacy_records_are_migrated():
+    """Records saved with a completion_dates list are converted to a bitmap"""
+    data_manager = InMemoryDataManager()
+    data_manager.streaks["user"] = {
+        "completion_dates": ["2024-03-03", "2024-03-01", "2024-03-02"],
+        "last_completion_date": "2024-03-02",
+        "current_streak": 1,
+        "longest_streak": 1,
+        "is_paused": True
+    }
+    streak_manager = StreakManager(data_manager)
+    streak_data = streak_manager.update_streak_for_completion("user", date(2024, 3, 4))
+    
+    assert streak_data['current_streak'] == 4
+    assert 'completion_dates' not in streak_data and 'run_start' not in streak_data
+    completions = CompletionBitmap.from_json(streak_data['completion_bitmap'])
+    assert completions.dates() == ["2024-03-01", "2024-03-02", "2024-03-03", "2024-03-04"]
+
+if __name__ == "__main__":
+    test_appends_extend_current_run()
+    test_backfill_joins_current_run()
+    test_random_histories_match_full_recompute()
+    test_legacy_records_are_migrated()
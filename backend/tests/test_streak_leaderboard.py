@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the incrementally maintained streak leaderboard
+"""
+import sys
+import os
+import copy
+import random
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.streak_leaderboard import StreakLeaderboard
+from data.streak_manager import StreakManager
+
+class InMemoryDataManager:
+    def __init__(self):
+        self.streaks = {}
+    
+    def load_streak(self, user_id):
+        return copy.deepcopy(self.streaks.get(user_id, {}))
+    
+    def save_streak(self, user_id, streak_data):
+        self.streaks[user_id] = copy.deepcopy(streak_data)
+
+def test_random_updates_match_a_full_sort():
+    """After many updates, top-N, ranks and stats agree with sorting everything"""
+    rng = random.Random(11)
+    leaderboard = StreakLeaderboard()
+    leaderboard.load({f"user-{i}": {'current_streak': rng.randrange(10), 'longest_streak': 10} for i in range(50)})
+    truth = {user_id: leaderboard.scores['current_streak'][user_id] for user_id in leaderboard.scores['current_streak']}
+    
+    for _ in range(500):
+        user_id = f"user-{rng.randrange(80)}"
+        truth[user_id] = rng.randrange(40)
+        leaderboard.update(user_id, {'current_streak': truth[user_id], 'longest_streak': 40})
+    
+    expected = sorted(truth.items(), key=lambda item: (-item[1], item[0]))
+    top = leaderboard.top('current_streak', 15)
+    assert [(e['user_id'], e['current_streak']) for e in top] == expected[:15]
+    
+    for user_id, score in truth.items():
+        standing = leaderboard.standing(user_id)
+        assert standing['rank'] == 1 + sum(1 for s in truth.values() if s > score)
+        assert standing['percentile'] == round(100 * sum(1 for s in truth.values() if s <= score) / len(truth), 2)
+    
+    stats = leaderboard.stats('current_streak')
+    assert stats['total_users'] == len(truth)
+    assert stats['max'] == max(truth.values())
+    assert stats['mean'] == round(sum(truth.values()) / len(truth), 2)
+    assert sum(bucket['users'] for bucket in stats['histogram']) == len(truth)
+    assert leaderboard.stats('longest_streak')['max'] == 40
+
+def test_ties_share_a_rank():
+    """Users with the same streak get the same rank"""
+    leaderboard = StreakLeaderboard()
+    leaderboard.load({'a': {'current_streak': 5}, 'b': {'current_streak': 5}, 'c': {'current_streak': 2}})
+    assert [e['rank'] for e in leaderboard.top()] == [1, 1, 3]
+    assert leaderboard.standing('c')['percentile'] == round(100 / 3, 2)
+    assert leaderboard.standing('missing') is None
+
+def test_streak_manager_keeps_leaderboard_current():
+    """Completions recorded through StreakManager re-rank the user"""
+    leaderboard = StreakLeaderboard()
+    streak_manager = StreakManager(InMemoryDataManager(), leaderboard)
+    today = date.today()
+    
+    for offset in range(3):
+        streak_manager.update_streak_for_completion('alice', today - timedelta(days=offset))
+    streak_manager.update_streak_for_completion('bob', today)
+    
+    assert [(e['user_id'], e['current_streak']) for e in leaderboard.top()] == [('alice', 3), ('bob', 1)]
+    assert leaderboard.standing('bob', 'longest_streak')['rank'] == 2
+
+def test_unknown_metric_is_rejected():
+    try:
+        StreakLeaderboard().top('total_completion_days')
+    except ValueError:
+        return
+    assert False, "expected ValueError"
+
+def test_refresh_picks_up_other_workers_writes():
+    """A changed store is reloaded once the index is older than max_age, not before"""
+    store = {"alice": {'current_streak': 3, 'longest_streak': 3}}
+    leaderboard = StreakLeaderboard(max_age=0)
+    leaderboard.load(copy.deepcopy(store), version=1)
+    assert not leaderboard.refresh(1, lambda: copy.deepcopy(store))
+    
+    # Another worker saved bob's streak
+    store["bob"] = {'current_streak': 5, 'longest_streak': 5}
+    assert leaderboard.refresh(2, lambda: copy.deepcopy(store))
+    assert [entry['user_id'] for entry in leaderboard.top()] == ["bob", "alice"]
+    
+    leaderboard.max_age = 60
+    store["carol"] = {'current_streak': 9, 'longest_streak': 9}
+    assert not leaderboard.refresh(3, lambda: copy.deepcopy(store))
+    assert leaderboard.standing("carol") is None
+
+if __name__ == "__main__":
+    test_random_updates_match_a_full_sort()
+    test_ties_share_a_rank()
+    test_streak_manager_keeps_leaderboard_current()
+    test_unknown_metric_is_rejected()
+    test_refresh_picks_up_other_workers_writes()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test rebuilding streaks from task completion history
+"""
+import sys
+import os
+import json
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.data_manager import DataManager
+from data.streak_manager import StreakManager
+from data.streak_rebuild import rebuild_streaks
+from temp_cwd import temp_cwd
+
+TODAY = date(2024, 6, 10)
+
+def make_task(user_id, days, uncompleted=()):
+    history = {d.isoformat(): True for d in days}
+    history.update({d.isoformat(): False for d in uncompleted})
+    return {'id': f"{user_id}-{len(days)}", 'user_id': user_id, 'title': "Walk", 'description': "",
+            'completed': False, 'due_date': TODAY.isoformat(), 'completion_history': history}
+
+def make_data_manager(tasks):
+    """DataManager over the given tasks, in the current (temporary) directory"""
+    data_manager = DataManager()
+    data_manager._save_tasks(tasks)
+    return data_manager
+
+def test_iter_tasks_streams_across_chunk_boundaries():
+    """Tiny read chunks still decode every task exactly"""
+    with temp_cwd():
+        tasks = [make_task(f"user-{i}", [TODAY - timedelta(days=i)]) for i in range(30)]
+        data_manager = make_data_manager(tasks)
+        assert list(data_manager.iter_tasks(chunk_size=7)) == json.loads(json.dumps(tasks))
+
+def test_dry_run_reports_drift_without_writing():
+    """An un-completed day shows up in the diff but streak.json is untouched"""
+    with temp_cwd():
+        days = [TODAY - timedelta(days=offset) for offset in range(3)]
+        data_manager = make_data_manager([
+            make_task('alice', days[1:], uncompleted=[days[0]]),
+            make_task('alice', [TODAY - timedelta(days=10)]),
+        ])
+        streak_manager = StreakManager(data_manager)
+        for d in days:
+            streak_manager.update_streak_for_completion('alice', d)
+        data_manager.save_streak('bob', {'current_streak': 9, 'longest_streak': 9})
+        before = open(data_manager.streak_file).read()
+        
+        report = rebuild_streaks(data_manager, dry_run=True, workers=1, today=TODAY)
+        
+        assert report['tasks_scanned'] == 2
+        assert report['users_rebuilt'] == 1 and report['users_without_tasks'] == 1
+        assert report['changes']['alice'] == {
+            'current_streak': [3, 2],
+            'longest_streak': [3, 2],
+            'last_completion_date': [TODAY.isoformat(), days[1].isoformat()]
+        }
+        assert not report['written']
+        assert open(data_manager.streak_file).read() == before
+
+def test_rebuild_writes_with_process_pool():
+    """Rebuilt records match a fresh StreakManager and untouched users are kept"""
+    with temp_cwd():
+        tasks = []
+        for i in range(40):
+            days = [TODAY - timedelta(days=offset) for offset in range(i % 5) if offset != 2]
+            tasks.append(make_task(f"user-{i}", days))
+        data_manager = make_data_manager(tasks)
+        data_manager.save_streak('bob', {'current_streak': 9, 'longest_streak': 9})
+        
+        report = rebuild_streaks(data_manager, workers=2, today=TODAY, chunk_size=8)
+        assert report['written']
+        
+        all_streaks = data_manager.load_all_streaks()
+        assert all_streaks['bob']['current_streak'] == 9
+        assert all_streaks['user-4']['current_streak'] == 2
+        assert all_streaks['user-4']['longest_streak'] == 2
+        assert all_streaks['user-4']['last_completion_date'] == TODAY
+        assert not all_streaks['user-4']['is_paused']
+        
+        # A second run finds nothing to change
+        assert rebuild_streaks(data_manager, workers=2, today=TODAY)['users_changed'] == 0
+
+def test_streak_saved_during_rebuild_is_kept():
+    """A record a request saves while the rebuild runs isn't replaced by the rebuilt one"""
+    with temp_cwd():
+        data_manager = make_data_manager([make_task('alice', [TODAY]), make_task('carol', [TODAY])])
+        data_manager.save_streak('alice', {'current_streak': 5, 'longest_streak': 5})
+        data_manager.save_streak('carol', {'current_streak': 5, 'longest_streak': 5})
+        update_all_streaks = data_manager.update_all_streaks
+        
+        def save_then_merge(update):
+            # Lands after the rebuild read streak.json, before it writes
+            data_manager.save_streak('alice', {'current_streak': 7, 'longest_streak': 7})
+            return update_all_streaks(update)
+        
+        data_manager.update_all_streaks = save_then_merge
+        report = rebuild_streaks(data_manager, today=TODAY)
+        assert report['users_changed'] == 2 and report['skipped_concurrent_updates'] == 1
+        
+        all_streaks = data_manager.load_all_streaks()
+        assert all_streaks['alice']['current_streak'] == 7
+        assert all_streaks['carol']['current_streak'] == 1
+
+if __name__ == "__main__":
+    test_iter_tasks_streams_across_chunk_boundaries()
+    test_dry_run_reports_drift_without_writing()
+    test_rebuild_writes_with_process_pool()
+    test_streak_saved_during_rebuild_is_kept()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the daily streak rollover (bulk job and lazy on-read path)
+"""
+import sys
+import os
+import asyncio
+import subprocess
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.data_manager import DataManager
+from data.streak_manager import StreakManager
+from data.streak_rollover import DailyRolloverJob
+from temp_cwd import temp_cwd
+
+def make_streak_manager(num_users=25):
+    """Streaks of one to four days ending yesterday, in the current (temporary) directory"""
+    data_manager = DataManager()
+    streak_manager = StreakManager(data_manager)
+    yesterday = date.today() - timedelta(days=1)
+    for i in range(num_users):
+        for offset in range(i % 4 + 1):
+            streak_manager.update_streak_for_completion(f"user-{i}", yesterday - timedelta(days=offset))
+    return data_manager, streak_manager
+
+def test_rollover_all_refreshes_every_record():
+    """A day later every record is paused and marked as rolled over"""
+    with temp_cwd():
+        data_manager, streak_manager = make_streak_manager()
+        tomorrow = date.today() + timedelta(days=1)
+        
+        assert streak_manager.rollover_all(today=tomorrow) == 25
+        all_streaks = data_manager.load_all_streaks()
+        assert all(s['rollover_date'] == tomorrow.isoformat() for s in all_streaks.values())
+        assert all(s['is_paused'] for s in all_streaks.values())
+        assert all_streaks['user-3']['current_streak'] == 4
+        
+        # Already rolled over: nothing to write
+        assert streak_manager.rollover_all(today=tomorrow) == 0
+
+def test_stale_record_is_rolled_over_on_read():
+    """Reads apply the rollover when the job hasn't run yet today"""
+    with temp_cwd():
+        data_manager, streak_manager = make_streak_manager(num_users=1)
+        today = date.today()
+        
+        all_streaks = data_manager.load_all_streaks()
+        all_streaks['user-0'].update({'is_paused': False, 'rollover_date': (today - timedelta(days=1)).isoformat()})
+        data_manager.save_all_streaks(all_streaks)
+        
+        summary = streak_manager.get_streak_summary('user-0')
+        assert summary['is_paused']
+        assert summary['days_since_last_completion'] == 1
+
+def test_legacy_records_are_converted_by_the_job():
+    """The sweep converts completion_dates lists and fixes longest_streak"""
+    with temp_cwd():
+        data_manager = make_streak_manager(num_users=0)[0]
+        data_manager.save_streak('legacy', {
+            'completion_dates': ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-10"],
+            'last_completion_date': "2024-01-10", 'current_streak': 1, 'longest_streak': 1, 'is_paused': True
+        })
+        
+        StreakManager(data_manager).rollover_all()
+        record = data_manager.load_all_streaks()['legacy']
+        assert 'completion_dates' not in record and 'completion_bitmap' in record
+        assert record['longest_streak'] == 3
+        assert record['current_streak'] == 1
+
+def test_completion_saved_during_rollover_is_kept():
+    """A request saving a streak while the job runs isn't overwritten by the job's write"""
+    with temp_cwd():
+        data_manager, streak_manager = make_streak_manager(num_users=3)
+        tomorrow = date.today() + timedelta(days=1)
+        update_all_streaks = data_manager.update_all_streaks
+        
+        def complete_then_merge(update):
+            # Lands after the job's snapshot, before its merge
+            streak_manager.update_streak_for_completion('user-1', date.today())
+            return update_all_streaks(update)
+        
+        data_manager.update_all_streaks = complete_then_merge
+        assert streak_manager.rollover_all(today=tomorrow) == 3
+        
+        record = data_manager.load_all_streaks()['user-1']
+        assert date.today() in streak_manager._load_completions(record)
+        assert record['current_streak'] == 3 and record['rollover_date'] == tomorrow.isoformat()
+        assert data_manager.load_all_streaks()['user-2']['rollover_date'] == tomorrow.isoformat()
+
+def test_save_from_another_worker_waits_for_the_merge():
+    """Another process's save blocks on the store lock instead of being overwritten"""
+    with temp_cwd():
+        data_manager, streak_manager = make_streak_manager(num_users=3)
+        tomorrow = date.today() + timedelta(days=1)
+        update_all_streaks = data_manager.update_all_streaks
+        script = (f"import sys; sys.path.insert(0, {BACKEND_DIR!r}); from data.data_manager import DataManager; "
+                  "DataManager().save_streak('other-worker', {'current_streak': 7})")
+        
+        def merge_while_another_worker_saves(update):
+            def merge(all_streaks):
+                worker = subprocess.Popen([sys.executable, "-c", script])
+                time.sleep(0.5)
+                assert worker.poll() is None
+                return update(all_streaks), worker
+            result, worker = update_all_streaks(merge)
+            assert worker.wait() == 0
+            return result
+        
+        data_manager.update_all_streaks = merge_while_another_worker_saves
+        assert streak_manager.rollover_all(today=tomorrow) == 3
+        
+        all_streaks = data_manager.load_all_streaks()
+        assert all_streaks['other-worker'] == {'current_streak': 7}
+        assert all(all_streaks[f"user-{i}"]['rollover_date'] == tomorrow.isoformat() for i in range(3))
+
+def test_seconds_until_next_run():
+    """The job wakes up at the next local midnight"""
+    from datetime import datetime
+    assert DailyRolloverJob.seconds_until_next_run(datetime(2024, 5, 1, 23, 59, 30)) == 30
+    assert DailyRolloverJob.seconds_until_next_run(datetime(2024, 5, 1, 0, 0)) == 86400
+
+def test_job_runs_on_start():
+    """Starting the job runs a catch-up rollover"""
+    with temp_cwd():
+        streak_manager = make_streak_manager(num_users=3)[1]
+        
+        async def run():
+            job = DailyRolloverJob(streak_manager)
+            await job.start()
+            for _ in range(200):
+                if job.runs:
+                    break
+                await asyncio.sleep(0.01)
+            await job.stop()
+            return job.get_stats()
+        
+        stats = asyncio.run(run())
+        assert stats['runs'] == 1
+        assert stats['last_error'] is None
+
+if __name__ == "__main__":
+    test_rollover_all_refreshes_every_record()
+    test_stale_record_is_rolled_over_on_read()
+    test_legacy_records_are_converted_by_the_job()
+    test_completion_saved_during_rollover_is_kept()
+    test_save_from_another_worker_waits_for_the_merge()
+    test_seconds_until_next_run()
+    test_job_runs_on_start()
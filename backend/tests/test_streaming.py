@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test streaming analysis and incremental label/explanation filtering
+"""
+import sys
+import os
+import time
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter, StreamingRewriteFilter
+from llm_stub import StubGroqClient
+
+class FailingStreamClient(StubGroqClient):
+    """Streams the first few words of the reply, then drops the connection"""
+    def _stream_reply(self):
+        for index, chunk in enumerate(super()._stream_reply()):
+            if index == 8:
+                raise ConnectionError("stream closed")
+            yield chunk
+
+def test_streaming_filter_matches_batch_extraction():
+    """Feeding a response in small chunks gives the same text as the batch extractor"""
+    rewriter = CompassionateRewriter()
+    raw = ("Here's a rewritten version:\n\n**I'm having a slow day.** That's okay! "
+           "I'll try again tomorrow.\n\nIn this rewritten version, I've aimed to be kinder.")
+    
+    stream_filter = StreamingRewriteFilter(rewriter.is_explanation_line)
+    streamed = ""
+    for i in range(0, len(raw), 3):
+        streamed += stream_filter.feed(raw[i:i + 3])
+    streamed += stream_filter.flush()
+    
+    print(f"Streamed: {streamed!r}")
+    assert streamed == rewriter.extract_rewritten_content(raw)
+    assert "rewritten version" not in streamed
+
+def test_stream_analysis_sends_analysis_first():
+    """The analysis event arrives before the LLM has answered"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(latency_seconds=0.3, reply="You are doing your best. Rest is okay.")
+    
+    start = time.perf_counter()
+    events = rewriter.stream_analysis("I feel so lazy\nI am a total failure")
+    first_event, first_data = next(events)
+    time_to_first_event = time.perf_counter() - start
+    remaining = list(events)
+    
+    assert first_event == 'analysis'
+    assert first_data['parts'] == ['title', 'content']
+    assert time_to_first_event < 0.05
+    
+    tokens = [data for event, data in remaining if event == 'token']
+    assert {token['part'] for token in tokens} == {'title', 'content'}
+    
+    done_event, result = remaining[-1]
+    assert done_event == 'done'
+    assert result['suggestion_available']
+    assert result['rewritten_text'] == "You are doing your best. Rest is okay.\n\nYou are doing your best. Rest is okay."
+
+def test_stream_analysis_without_negative_words():
+    """Positive text finishes right after the analysis event"""
+    rewriter = CompassionateRewriter()
+    events = list(rewriter.stream_analysis("What a lovely walk today"))
+    assert [event for event, _ in events] == ['analysis', 'done']
+    assert not events[-1][1]['contains_negative_words']
+
+def test_interrupted_stream_is_not_the_final_rewrite():
+    """Tokens sent before a failure are reset and the result is the rule-based rewrite"""
+    rewriter = CompassionateRewriter()
+    reply = "You are doing your best today. Rest is okay and you can try again tomorrow."
+    rewriter.client = FailingStreamClient(reply=reply)
+    
+    events = list(rewriter.stream_analysis("I feel so lazy"))
+    names = [event for event, _ in events]
+    assert names[0] == 'analysis' and 'token' in names
+    assert names.index('reset') > names.index('token')
+    assert events[names.index('reset')][1]['part'] == 'title'
+    
+    done = events[-1][1]
+    partial = "".join(data['text'] for event, data in events if event == 'token')
+    assert done['suggestion_available']
+    assert done['rewritten_text'].strip() == rewriter.fallback_rewriter.rewrite("I feel so lazy")
+    assert done['rewritten_text'].strip() != partial.strip()
+    assert rewriter.get_stats()['fallback_rewrites'] == 1
+
+def test_streamed_rewrites_are_reused():
+    """A stream stores its rewrite, and the same user's near-duplicate is served from it"""
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(reply="You are doing your best. Rest is okay.")
+    text = "I feel like such a failure because I skipped my workout again and I hate myself for it"
+    
+    first = list(rewriter.stream_analysis(text, "user-a"))[-1][1]
+    second = list(rewriter.stream_analysis(text.replace("skipped", "totally skipped"), "user-a"))[-1][1]
+    assert first['rewritten_text'] == second['rewritten_text']
+    assert rewriter.client.calls == 1
+    
+    # Plain analysis shares the same per-user index
+    rewriter.analyze_and_suggest_rewrite(text, "user-a")
+    assert rewriter.client.calls == 1
+
+def test_streams_do_not_starve_plain_rewrites():
+    """Open streams hold their own threads, so a non-streaming rewrite isn't queued behind them"""
+    rewriter = CompassionateRewriter(max_concurrent_rewrites=4)
+    rewriter.client = StubGroqClient(latency_seconds=0.5, reply="You are doing your best and rest is okay today.")
+    streams = [threading.Thread(target=list, args=(rewriter.stream_analysis(f"I feel so lazy {i}\nI am a failure {i}"),))
+               for i in range(3)]
+    for stream in streams:
+        stream.start()
+    time.sleep(0.1)
+    
+    # Six streamed parts would fill the four rewrite workers for the whole stream
+    start = time.perf_counter()
+    rewritten = rewriter.rewrite_parts({'title': "I feel so lazy", 'content': "I am a failure"})
+    elapsed = time.perf_counter() - start
+    for stream in streams:
+        stream.join()
+    
+    assert all(rewritten.values())
+    assert elapsed < 0.9
+
+if __name__ == "__main__":
+    test_streaming_filter_matches_batch_extraction()
+    test_stream_analysis_sends_analysis_first()
+    test_stream_analysis_without_negative_words()
+    test_interrupted_stream_is_not_the_final_rewrite()
+    test_streamed_rewrites_are_reused()
+    test_streams_do_not_starve_plain_rewrites()
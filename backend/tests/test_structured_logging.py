@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test structured logging: JSON records with request IDs, sampling and the non-blocking queue
+"""
+import sys
+import os
+import io
+import json
+import queue
+import random
+import asyncio
+import logging
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.structured_logging import (configure_logging, parse_settings, request_id, SamplingFilter,
+                                     RequestIdMiddleware, _QueueHandler)
+
+def unconfigure(listener):
+    listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+
+def test_json_records_carry_request_id_and_fields():
+    stream = io.StringIO()
+    listener = configure_logging(level="INFO", levels={"test.verbose": "DEBUG"}, stream=stream)
+    try:
+        token = request_id.set("req-1")
+        logging.getLogger("test.verbose").debug("Saved comment", extra={'comment_id': "c1", 'total_comments': 3})
+        request_id.reset(token)
+        logging.getLogger("test.quiet").debug("not shown")
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            logging.getLogger("test.quiet").exception("Failed %s", "job")
+    finally:
+        unconfigure(listener)
+    
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == 2
+    assert records[0]['message'] == "Saved comment" and records[0]['level'] == "DEBUG"
+    assert records[0]['request_id'] == "req-1"
+    assert records[0]['comment_id'] == "c1" and records[0]['total_comments'] == 3
+    assert records[1]['message'] == "Failed job" and 'request_id' not in records[1]
+    assert "ValueError: bad" in records[1]['exception']
+
+def test_debug_sampling():
+    """Only DEBUG is sampled, at the most specific logger's rate"""
+    sampler = SamplingFilter(0.1, rates={"data.data_manager": 0.5, "data.data_manager.io": 1.0},
+                             rng=random.Random(3))
+    
+    def kept(name, level, count=2000):
+        return sum(sampler.filter(logging.LogRecord(name, level, "", 0, "x", None, None)) for _ in range(count))
+    
+    assert 150 < kept("api", logging.DEBUG) < 250
+    assert 900 < kept("data.data_manager", logging.DEBUG) < 1100
+    assert kept("data.data_manager.io", logging.DEBUG) == 2000
+    assert kept("api", logging.INFO) == 2000
+    assert parse_settings("api=0.5, data.data_manager=DEBUG,") == {"api": "0.5", "data.data_manager": "DEBUG"}
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _QueueHandler(queue.Queue(maxsize=2))
+    logger = logging.getLogger("test.full_queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.warning("record %d", i)
+    finally:
+        logger.removeHandler(handler)
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+    assert handler.queue.get().msg == "record 0"
+
+def test_request_id_middleware():
+    seen = []
+    
+    async def app(scope, receive, send):
+        seen.append(request_id.get())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+    
+    async def run(headers):
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        await RequestIdMiddleware(app)({"type": "http", "headers": headers}, None, send)
+        return dict(sent[0]["headers"])[b"x-request-id"].decode()
+    
+    assert asyncio.run(run([(b"x-request-id", b"from-proxy")])) == "from-proxy"
+    generated = asyncio.run(run([]))
+    assert len(generated) == 32 and seen == ["from-proxy", generated]
+    assert request_id.get() is None
+
+if __name__ == "__main__":
+    test_json_records_carry_request_id_and_fields()
+    test_debug_sampling()
+    test_full_queue_drops_instead_of_blocking()
+    test_request_id_middleware()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test the synthetic dataset generator: determinism and consistency with what the app reads
+"""
+import sys
+import os
+import filecmp
+import tempfile
+from collections import Counter
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.data_manager import DataManager
+from data.streak_manager import StreakManager
+from data.streak_rebuild import rebuild_streaks
+from data.synthetic_data import SyntheticDataset, write_dataset
+from temp_cwd import temp_cwd
+
+TODAY = date(2024, 6, 10)
+FILES = ["tasks.json", "posts.json", "comments.json", "streak.json", "tips.json", "jobs.json"]
+
+def generate(directory, seed=3, **options):
+    """Write a small dataset to directory/database, returning the generator's report"""
+    config = dict(users=40, tasks_per_user=4, years=2, posts=60, comments_per_post=8, thread_depth=4,
+                  tips=10, today=TODAY)
+    config.update(options)
+    return write_dataset(SyntheticDataset(seed=seed, **config), os.path.join(directory, "database"))
+
+def test_same_seed_same_files():
+    with tempfile.TemporaryDirectory() as root:
+        first, second, other, more_posts = (os.path.join(root, name)
+                                            for name in ("first", "second", "other", "more_posts"))
+        generate(first)
+        generate(second)
+        generate(other, seed=4)
+        match, mismatch, errors = filecmp.cmpfiles(os.path.join(first, "database"), os.path.join(second, "database"),
+                                                   FILES, shallow=False)
+        assert match == FILES
+        assert not filecmp.cmp(os.path.join(first, "database", "tasks.json"),
+                               os.path.join(other, "database", "tasks.json"), shallow=False)
+    
+        # More posts don't change anyone's tasks
+        generate(more_posts, posts=90)
+        assert filecmp.cmp(os.path.join(first, "database", "tasks.json"),
+                           os.path.join(more_posts, "database", "tasks.json"), shallow=False)
+
+def test_dataset_is_consistent_with_the_app():
+    with temp_cwd() as directory:
+        # The dataset goes in ./database, where DataManager looks for it
+        report = generate(directory)
+        data_manager = DataManager()
+        
+        # Streak records match the task histories exactly
+        rebuilt = rebuild_streaks(data_manager, dry_run=True, workers=1, today=TODAY)
+        assert rebuilt['tasks_scanned'] == report['tasks'] and rebuilt['users_rebuilt'] == report['users'] == 40
+        assert rebuilt['users_changed'] == 0
+        
+        user_id = next(iter(data_manager.load_all_streaks()))
+        record = data_manager.load_streak(user_id)
+        assert record['longest_streak'] >= record['current_streak'] >= 1
+        assert len(StreakManager(data_manager)._load_completions(record)) >= record['longest_streak']
+        assert all(task['user_id'] == user_id and task['completion_history']
+                   for task in data_manager.load_tasks(user_id))
+        
+        # Counts on posts and comments agree with the comments themselves
+        posts = data_manager.load_posts()
+        comments = data_manager.load_comments()
+        assert len(posts) == report['posts'] and len(comments) == report['comments']
+        per_post = Counter(comment['post_id'] for comment in comments)
+        assert all(post['comments_count'] == per_post[post['id']] for post in posts)
+        by_id = {comment['id']: comment for comment in comments}
+        replies = Counter(comment['parent_id'] for comment in comments if comment['parent_id'])
+        assert all(comment['replies_count'] == replies[comment['id']] for comment in comments)
+        
+        # Threads are nested, but no deeper than thread_depth
+        def depth(comment):
+            return 0 if comment['parent_id'] is None else 1 + depth(by_id[comment['parent_id']])
+        depths = [depth(comment) for comment in comments]
+        assert 2 <= max(depths) <= 4
+        assert all(comment['created_at'] >= by_id[comment['parent_id']]['created_at']
+                   for comment in comments if comment['parent_id'])
+        assert len(data_manager.load_tips()) == 10 and data_manager.load_jobs() == []
+
+if __name__ == "__main__":
+    test_same_seed_same_files()
+    test_dataset_is_consistent_with_the_app()
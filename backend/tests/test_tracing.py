@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test request tracing: span nesting across threads, the slow request log and OTLP/JSON export
+"""
+import sys
+import os
+import asyncio
+import json
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from data.compassionate_rewriter import CompassionateRewriter
+from data.data_manager import DataManager
+from data.tracing import Tracer, FileSpanExporter, TracingMiddleware, start_span, NO_SPAN, SERVER, CLIENT
+from llm_stub import StubGroqClient
+from temp_cwd import temp_cwd
+
+def test_llm_calls_in_worker_threads_join_the_trace():
+    rewriter = CompassionateRewriter()
+    rewriter.client = StubGroqClient(latency_seconds=0.2)
+    tracer = Tracer(slow_seconds=0.15)
+    
+    root = tracer.start_trace("POST /api/posts/analyze")
+    with root:
+        rewriter.analyze_and_suggest_rewrite("I feel so lazy\nI am a total failure at this")
+    tracer.finish_trace(root)
+    
+    spans = root.trace.spans
+    llm_calls = [span for span in spans if span.name == "groq.chat.completions"]
+    assert len(llm_calls) == 2
+    assert all(span.kind == CLIENT and span.parent_id == root.span_id for span in llm_calls)
+    assert any(span.name == "CompassionateRewriter.match" for span in spans)
+    
+    # The LLM calls are over the threshold, so the trace is in the slow log as a tree
+    slow = tracer.get_stats()['recent_slow']
+    assert len(slow) == 1 and slow[0]['slowest_span'] in ("groq.chat.completions", root.name)
+    names = [child['name'] for child in slow[0]['spans']['children']]
+    assert names.count("groq.chat.completions") == 2
+
+def test_spans_outside_a_trace_are_free():
+    assert start_span("DataManager.load_posts") is NO_SPAN
+    with start_span("anything") as span:
+        span.set_attribute("ignored", True)
+
+def test_request_trace_exported_as_otlp_json():
+    with temp_cwd():
+        data_manager = DataManager()
+        path = os.path.join(os.getcwd(), "traces.jsonl")
+        tracer = Tracer(slow_seconds=60, exporter=FileSpanExporter(path), sample_rate=1.0)
+        
+        async def app(scope, receive, send):
+            data_manager.load_posts()
+            await asyncio.to_thread(data_manager.load_tips)
+            scope["endpoint"] = get_post
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        
+        def get_post():
+            pass
+        
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+        
+        async def send(message):
+            pass
+        
+        routes = [SimpleNamespace(path="/api/posts/{post_id}")]
+        scope = {"type": "http", "method": "GET", "path": "/api/posts/abc", "headers": [],
+                 "app": SimpleNamespace(routes=routes)}
+        asyncio.run(TracingMiddleware(app, tracer)(scope, receive, send))
+        tracer.exporter.close()
+        
+        with open(path) as f:
+            lines = f.readlines()
+        assert len(lines) == 1
+        request = json.loads(lines[0])
+        resource_spans = request['resourceSpans'][0]
+        assert resource_spans['resource']['attributes'][0] == {'key': 'service.name',
+                                                               'value': {'stringValue': 'tendril-api'}}
+        spans = {span['name']: span for span in resource_spans['scopeSpans'][0]['spans']}
+        assert set(spans) == {"GET /api/posts/{post_id}", "DataManager.load_posts", "DataManager.load_tips"}
+        
+        root = spans["GET /api/posts/{post_id}"]
+        assert root['kind'] == SERVER and root['parentSpanId'] == ""
+        assert len(root['traceId']) == 32 and len(root['spanId']) == 16
+        attributes = {attribute['key']: attribute['value'] for attribute in root['attributes']}
+        assert attributes['http.response.status_code'] == {'intValue': "200"}
+        assert attributes['code.function'] == {'stringValue': "get_post"}
+        
+        # Storage spans, including the one run in a thread, are children of the request
+        for name in ("DataManager.load_posts", "DataManager.load_tips"):
+            assert spans[name]['parentSpanId'] == root['spanId']
+            assert spans[name]['traceId'] == root['traceId']
+            assert int(spans[name]['startTimeUnixNano']) >= int(root['startTimeUnixNano'])
+
+if __name__ == "__main__":
+    test_llm_calls_in_worker_threads_join_the_trace()
+    test_spans_outside_a_trace_are_free()
+    test_request_trace_exported_as_otlp_json()